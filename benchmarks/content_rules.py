@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# benchmarks/content_rules.py
+
+"""
+Compares two ways of deciding a file's selective-map rule: the loop over every
+configured extension, filename pattern (fnmatch) and folder prefix that the
+selective map used before, and the compiled ContentRules. Reports the time per
+file of each and checks that both reach the same decision with the same rule.
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+# Make src_mapper and benchmarks importable when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic_repo import add_spec_arguments, generate_synthetic_repo, spec_from_args
+from src_mapper.custom_config_loader import get_config
+from src_mapper.utils import ContentRules, get_file_extension
+
+# (filename, extension, relative_path_posix)
+PathItem = Tuple[str, str, str]
+
+
+def _loop_classify(config_module) -> Callable[[str, str, str], Tuple[str, Optional[str]]]:
+    """The per-file rule loops the selective map ran before ContentRules."""
+    def classify(filename: str, extension: str, relative_path_posix: str) -> Tuple[str, Optional[str]]:
+        if extension.lower() in config_module.BINARY_FILE_EXTENSIONS:
+            return "binary", extension.lower()
+        if extension.lower() in config_module.EXCLUDE_CONTENT_FILE_EXTENSIONS:
+            if not any(fnmatch.fnmatch(filename, pattern) for pattern in config_module.ALWAYS_INCLUDE_CONTENT_PATTERNS):
+                return "excluded", extension.lower()
+        for pattern in config_module.ALWAYS_INCLUDE_CONTENT_PATTERNS:
+            if fnmatch.fnmatch(filename, pattern):
+                return "pattern", pattern
+        for folder_pattern in config_module.INCLUDE_CONTENT_IN_FOLDERS_PATTERNS:
+            if relative_path_posix.startswith(folder_pattern):
+                return "folder", folder_pattern
+        return "other", None
+    return classify
+
+
+def _path_items(repo_root_path: Path) -> List[PathItem]:
+    items = []
+    for path in sorted(repo_root_path.rglob("*")):
+        if path.is_file() and ".git" not in path.parts:
+            items.append((path.name, get_file_extension(path.name), path.relative_to(repo_root_path).as_posix()))
+    return items
+
+
+def _measure(classify: Callable[[str, str, str], Tuple[str, Optional[str]]], items: List[PathItem], repeat: int):
+    """Returns (decisions, best seconds per pass)."""
+    decisions = [tuple(classify(*item)) for item in items]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            classify(*item)
+        best = min(best, time.perf_counter() - start)
+    return decisions, best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the selective map's rule loops with the compiled ContentRules.")
+    parser.add_argument("--repo", help="Classify the files of this existing repository instead of a generated one.")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over all files; the fastest counts (default: 5).")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if args.repo:
+            repo_root_path = Path(args.repo).resolve()
+        else:
+            repo_root_path = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="repo-mapper-synth-"))) / "synthetic"
+            generate_synthetic_repo(repo_root_path, spec_from_args(args))
+        items = _path_items(repo_root_path)
+
+    cfg = get_config(announce=False)
+    start = time.perf_counter()
+    rules = ContentRules.from_config(cfg)
+    compile_seconds = time.perf_counter() - start
+    loop_decisions, loop_seconds = _measure(_loop_classify(cfg), items, max(1, args.repeat))
+    compiled_decisions, compiled_seconds = _measure(rules.classify, items, max(1, args.repeat))
+
+    files = max(len(items), 1)
+    print(f"{len(items)} files, rules compiled in {compile_seconds * 1000:.2f}ms")
+    print(f"{'method':<10}{'per file':>14}")
+    print(f"{'loops':<10}{loop_seconds / files * 1e6:>12.2f}us")
+    print(f"{'compiled':<10}{compiled_seconds / files * 1e6:>12.2f}us")
+    if compiled_seconds > 0:
+        print(f"Speedup: {loop_seconds / compiled_seconds:.1f}x")
+    if loop_decisions != compiled_decisions:
+        mismatches = sum(1 for before, after in zip(loop_decisions, compiled_decisions) if before != after)
+        print(f"Error: {mismatches} files got a different rule.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# benchmarks/head_read.py
+
+"""
+Compares the two ways the selective map gets the truncated content of a large
+file: decoding the whole file and cutting it with truncate_content_by_lines,
+and the memory-mapped head read (read_head_lines). Reports time and peak
+Python memory (tracemalloc) of each and checks that both give the same text.
+"""
+
+import argparse
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+# Make src_mapper and benchmarks importable when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.loc_counting import generate_sql_dump
+from src_mapper.utils import FileClassifier, read_file_content, read_head_lines, truncate_content_by_lines
+
+ENCODINGS = ['utf-8', 'latin-1']
+
+# Warmed up with the file's verdict first, as the scan leaves it for the generators
+_classifier = FileClassifier(ENCODINGS)
+
+
+def _full_read(file_path: Path, max_lines: int) -> str:
+    content, _, _ = read_file_content(file_path, ENCODINGS)
+    return truncate_content_by_lines(content, max_lines)[0]
+
+
+def _head_read(file_path: Path, max_lines: int) -> str:
+    return read_head_lines(file_path, max_lines, ENCODINGS, _classifier)[0]
+
+
+def _measure(read: Callable[[Path, int], str], file_path: Path, max_lines: int) -> Dict[str, Any]:
+    start = time.perf_counter()
+    content = read(file_path, max_lines)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    try:
+        read(file_path, max_lines)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"content": content, "seconds": seconds, "peak_kb": peak / 1024}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare head-only and full reads of a large file for truncation.")
+    parser.add_argument("--file", help="Read this existing file instead of generating one.")
+    parser.add_argument("--size-mb", type=int, default=200, help="Size of the generated file (default: 200).")
+    parser.add_argument("--lines", type=int, default=300, help="Lines to keep (default: 300).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="repo-mapper-head-") as temp_dir:
+        if args.file:
+            file_path = Path(args.file)
+        else:
+            file_path = Path(temp_dir) / "dump.sql"
+            generate_sql_dump(file_path, args.size_mb)
+        _classifier.read(file_path)
+
+        results = {
+            "full read": _measure(_full_read, file_path, args.lines),
+            "head read": _measure(_head_read, file_path, args.lines),
+        }
+
+    print(f"{'method':<12}{'time':>14}{'peak memory':>16}")
+    for name, result in results.items():
+        print(f"{name:<12}{result['seconds'] * 1000:>12.3f}ms{result['peak_kb']:>13.1f} KB")
+    if results["full read"]["content"] != results["head read"]["content"]:
+        print("Error: the truncated contents differ.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
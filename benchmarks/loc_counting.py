@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# benchmarks/loc_counting.py
+
+"""
+Compares the streaming line counter with the decode path it replaces
+(read_file_content + splitlines + strip) on one large generated text file:
+time and peak Python memory (tracemalloc) of each, and that both agree.
+"""
+
+import argparse
+import gc
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+# Make src_mapper importable when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src_mapper.utils import count_lines_streaming, read_file_content
+
+ENCODINGS = ['utf-8', 'latin-1']
+
+
+def _decode_and_count(file_path: Path) -> int:
+    """The line count as it was computed before the streaming counter."""
+    content, is_binary, _ = read_file_content(file_path, ENCODINGS)
+    if is_binary or content is None:
+        return 0
+    return sum(1 for line in content.splitlines() if line.strip())
+
+
+def _stream_and_count(file_path: Path) -> int:
+    return count_lines_streaming(file_path, ENCODINGS).loc
+
+
+def generate_sql_dump(file_path: Path, size_mb: int, seed: int = 0) -> None:
+    """Writes an SQL-dump-like file of roughly size_mb MB with blank and indented lines."""
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(file_path, 'w', encoding='utf-8', newline='\n') as f:
+        row = 0
+        while written < target:
+            if row % 50 == 0:
+                line = "\nINSERT INTO events (id, name, payload) VALUES\n"
+            else:
+                line = f"    ({row}, 'event_{rng.randrange(10**6)}', '{'x' * rng.randrange(20, 120)}'),\n"
+            f.write(line)
+            written += len(line)
+            row += 1
+
+
+def _measure(count: Callable[[Path], int], file_path: Path) -> Dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        loc = count(file_path)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"loc": loc, "seconds": round(elapsed, 4), "peak_mb": round(peak / (1024 * 1024), 1)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the streaming line counter with decoding the whole file.")
+    parser.add_argument("--file", help="Count this existing file instead of generating one.")
+    parser.add_argument("--size-mb", type=int, default=100, help="Size of the generated file (default: 100).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="repo-mapper-loc-") as temp_dir:
+        if args.file:
+            file_path = Path(args.file)
+        else:
+            file_path = Path(temp_dir) / "dump.sql"
+            generate_sql_dump(file_path, args.size_mb)
+
+        # Timing runs without tracemalloc, which slows allocation-heavy code down unevenly
+        results = {}
+        for name, count in (("decode", _decode_and_count), ("streaming", _stream_and_count)):
+            start = time.perf_counter()
+            count(file_path)
+            seconds = time.perf_counter() - start
+            results[name] = _measure(count, file_path)
+            results[name]["seconds"] = round(seconds, 4)
+
+    print(f"{'method':<12}{'LOC':>12}{'time':>12}{'peak memory':>14}")
+    for name, result in results.items():
+        print(f"{name:<12}{result['loc']:>12}{result['seconds']:>11.3f}s{result['peak_mb']:>11.1f} MB")
+    if results["decode"]["loc"] != results["streaming"]["loc"]:
+        print("Error: the counts differ.", file=sys.stderr)
+        return 1
+    print(f"speedup: {results['decode']['seconds'] / max(results['streaming']['seconds'], 1e-9):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
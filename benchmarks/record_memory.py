@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# benchmarks/record_memory.py
+
+"""
+Measures the memory held by the scan results: FileRecord objects versus the
+per-file dicts the scan used to build (two Path objects, formatted timestamp
+strings and nine other keys per file). Both are built from the same walk of
+the same repository, and tracemalloc measures the retained allocations.
+"""
+
+import argparse
+import contextlib
+import gc
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+# Make src_mapper and benchmarks importable when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic_repo import add_spec_arguments, generate_synthetic_repo, spec_from_args
+from src_mapper.utils import (
+    FileRecord, GitignoreMatcher, format_file_timestamps, get_file_extension, walk_repository
+)
+
+
+def _legacy_record(repo_root: str, absolute_path: str, relative_path_posix: str, stat_result, loc: int) -> Dict[str, Any]:
+    """The per-file dict built by earlier versions of the scan."""
+    absolute = Path(absolute_path)
+    relative = Path(relative_path_posix)
+    timestamp_created, timestamp_modified = format_file_timestamps(stat_result)
+    return {
+        'name': absolute.name,
+        'absolute_path': absolute,
+        'relative_path': relative,
+        'relative_path_posix': relative.as_posix(),
+        'parent_dir_relative_posix': str(relative.parent),
+        'extension': get_file_extension(absolute.name),
+        'size_bytes': stat_result.st_size,
+        'loc': loc,
+        'timestamp_created': timestamp_created,
+        'timestamp_modified': timestamp_modified,
+        'content_sha256': None,
+        'git_info': None,
+    }
+
+
+def _compact_record(repo_root: str, absolute_path: str, relative_path_posix: str, stat_result, loc: int) -> FileRecord:
+    directory, _, name = relative_path_posix.rpartition('/')
+    return FileRecord(
+        repo_root, directory, name, get_file_extension(name),
+        stat_result.st_size, loc, stat_result.st_ctime, stat_result.st_mtime
+    )
+
+
+def _retained_bytes(build: Callable[[], List[Any]]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        records = build()
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del records
+    return retained
+
+
+def measure(repo_root_path: Path) -> Dict[str, Any]:
+    repo_root = str(repo_root_path)
+    # Walk once up front so both measurements see identical inputs and only the records differ
+    walked = [
+        (absolute_path, relative_path_posix, stat_result)
+        for absolute_path, relative_path_posix, stat_result in walk_repository(
+            repo_root_path, GitignoreMatcher(repo_root_path), frozenset()
+        )
+        if stat_result is not None
+    ]
+    # A LOC above the small-int cache, as most source files have
+    loc = 1000
+
+    legacy = _retained_bytes(lambda: [_legacy_record(repo_root, *item, loc) for item in walked])
+    compact = _retained_bytes(lambda: [_compact_record(repo_root, *item, loc) for item in walked])
+    files = len(walked)
+    return {
+        "files": files,
+        "dict_records_bytes": legacy,
+        "file_records_bytes": compact,
+        "dict_bytes_per_file": round(legacy / files, 1) if files else 0.0,
+        "file_record_bytes_per_file": round(compact / files, 1) if files else 0.0,
+        "reduction": round(legacy / compact, 2) if compact else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare scan result memory of FileRecord and the old per-file dicts.")
+    parser.add_argument("--repo", help="Measure this existing repository instead of generating one.")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if args.repo:
+            repo_root_path = Path(args.repo).resolve()
+        else:
+            repo_root_path = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="repo-mapper-synth-"))) / "synthetic"
+            generate_synthetic_repo(repo_root_path, spec_from_args(args))
+        result = measure(repo_root_path)
+
+    print(f"{result['files']} files")
+    print(f"  per-file dicts: {result['dict_bytes_per_file']:>8.1f} bytes/file")
+    print(f"  FileRecord:     {result['file_record_bytes_per_file']:>8.1f} bytes/file")
+    print(f"  reduction:      {result['reduction']:>8.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# benchmarks/run_benchmarks.py
+
+"""
+Times each phase of a mapper run (ignore rule compilation, scan, git info, tree index) and each
+generator on a synthetic or existing repository, and writes the results as JSON.
+Two result files can be compared with --compare.
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Optional
+
+# Make src_mapper and benchmarks importable when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic_repo import add_spec_arguments, generate_synthetic_repo, spec_from_args
+
+RESULTS_SCHEMA_VERSION = 1
+DEFAULT_RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def _timed(phase_timings: Dict[str, List[float]], phase: str, function: Callable, *args, **kwargs):
+    """Runs function with its console output suppressed and records the wall time under phase."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args, **kwargs)
+    phase_timings.setdefault(phase, []).append(time.perf_counter() - start)
+    return result
+
+
+def _run_once(repo_root_path: Path, output_dir: Path, include_git_info: bool, jobs: int,
+              parallel_generators: Optional[str], phase_timings: Dict[str, List[float]]) -> Dict[str, int]:
+    """Performs one full mapper run, timing each phase. Returns counts for the report."""
+    from src_mapper import repo_mapper
+    from src_mapper.custom_config_loader import get_config
+    from src_mapper.utils import GitignoreMatcher, FileContentCache, TreeIndex
+    from src_mapper.generators import (
+        generate_html_map, generate_json_structure, generate_text_tree, generate_selective_map_and_report,
+        GeneratorTask, Shared, run_generators
+    )
+    cfg = get_config(announce=False)
+    repo_name = repo_root_path.name
+    include_git_info = include_git_info and repo_mapper.is_git_repository(repo_root_path)
+    run_start = time.perf_counter()
+
+    gitignore_matcher = _timed(phase_timings, "ignore_rules", GitignoreMatcher, repo_root_path)
+    content_cache = FileContentCache.from_config(cfg)
+    try:
+        # Git info is collected separately below so the walk and the history walk are timed apart
+        file_info_list = _timed(
+            phase_timings, "scan", repo_mapper._collect_all_file_info,
+            cfg, repo_root_path, gitignore_matcher, False, content_cache, jobs
+        )
+        if include_git_info:
+            git_info_by_path = _timed(
+                phase_timings, "git_info", repo_mapper.get_last_commit_info_bulk,
+                [file_info.relative_path_posix for file_info in file_info_list], repo_root_path,
+                getattr(cfg, 'GIT_BULK_LOG_TIMEOUT_SECONDS', 300)
+            )
+            for file_info in file_info_list:
+                file_info.git_info = git_info_by_path.get(file_info.relative_path_posix)
+
+        tree_index = _timed(phase_timings, "tree_index", TreeIndex, file_info_list)
+
+        output_path = output_dir / repo_name
+        index = {'tree_index': Shared.TREE_INDEX}
+        tasks = [
+            GeneratorTask("html", generate_html_map,
+                          (Shared.FILE_RECORDS, repo_root_path, repo_name, Path(f"{output_path}-mapper.html"),
+                           Shared.CONFIG, Shared.CONTENT_CACHE), index),
+            GeneratorTask("json_structure", generate_json_structure,
+                          (Shared.FILE_RECORDS, repo_root_path, repo_name, Path(f"{output_path}-structure.json"),
+                           Shared.CONFIG), index),
+            GeneratorTask("text_tree", generate_text_tree,
+                          (Shared.FILE_RECORDS, repo_root_path, repo_name, Path(f"{output_path}-structure.txt"),
+                           Shared.CONFIG), index),
+            GeneratorTask("selective", generate_selective_map_and_report,
+                          (Shared.FILE_RECORDS, repo_root_path, repo_name, Path(f"{output_path}-selective_map.json"),
+                           Path(f"{output_path}-scan_report.csv"), Shared.CONFIG, include_git_info,
+                           Shared.CONTENT_CACHE), index),
+        ]
+        # "generators" is the wall time of all four, which is less than their sum when they run concurrently
+        outcomes = _timed(phase_timings, "generators", run_generators,
+                          tasks, tree_index.records, cfg, content_cache, parallel_generators, tree_index)
+        for outcome in outcomes:
+            if outcome.error is not None:
+                raise RuntimeError(f"Generator '{outcome.name}' failed:\n{outcome.error}")
+            phase_timings.setdefault(f"generator.{outcome.name}", []).append(outcome.seconds)
+    finally:
+        content_cache.close()
+    phase_timings.setdefault("total", []).append(time.perf_counter() - run_start)
+
+    return {
+        "files": len(file_info_list),
+        "bytes": sum(file_info.size_bytes for file_info in file_info_list),
+        "output_bytes": sum(path.stat().st_size for path in output_dir.iterdir() if path.is_file()),
+    }
+
+
+def _summarize(samples: List[float]) -> Dict[str, Any]:
+    return {
+        "min_s": round(min(samples), 6),
+        "median_s": round(statistics.median(samples), 6),
+        "max_s": round(max(samples), 6),
+        "runs_s": [round(sample, 6) for sample in samples],
+    }
+
+
+def run_benchmarks(repo_root_path: Path, repeat: int, include_git_info: bool, jobs: int,
+                   repo_description: Dict[str, Any], parallel_generators: Optional[str] = None) -> Dict[str, Any]:
+    """Maps repo_root_path repeat times and returns the results document."""
+    phase_timings: Dict[str, List[float]] = {}
+    counts: Dict[str, int] = {}
+    with tempfile.TemporaryDirectory(prefix="repo-mapper-bench-") as output_dir:
+        for _ in range(repeat):
+            counts = _run_once(
+                repo_root_path, Path(output_dir), include_git_info, jobs, parallel_generators, phase_timings
+            )
+
+    return {
+        "schema_version": RESULTS_SCHEMA_VERSION,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "repository": repo_description,
+        "settings": {
+            "repeat": repeat, "include_git_info": include_git_info, "jobs": jobs,
+            "parallel_generators": parallel_generators,
+        },
+        "counts": counts,
+        "phases": {phase: _summarize(samples) for phase, samples in phase_timings.items()},
+    }
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> bool:
+    """
+    Prints median time per phase for two result documents.
+    Returns False if any phase got slower by more than threshold (a fraction).
+    """
+    ok = True
+    print(f"{'phase':<28}{'baseline':>12}{'current':>12}{'change':>12}")
+    for phase in sorted(set(baseline["phases"]) | set(current["phases"])):
+        before = baseline["phases"].get(phase, {}).get("median_s")
+        after = current["phases"].get(phase, {}).get("median_s")
+        if before is None or after is None:
+            print(f"{phase:<28}{before if before is not None else '-':>12}{after if after is not None else '-':>12}")
+            continue
+        change = (after - before) / before if before > 0 else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+            ok = False
+        print(f"{phase:<28}{before:>12.4f}{after:>12.4f}{change:>+12.1%}{flag}")
+    if baseline.get("repository") != current.get("repository"):
+        print("Note: the two runs used different repositories; the comparison may not be meaningful.", file=sys.stderr)
+    return ok
+
+
+def _setup_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Benchmark repo mapper phases and generators on a synthetic (or given) repository."
+    )
+    parser.add_argument("--repo", help="Benchmark this existing repository instead of generating one.")
+    parser.add_argument("--repo-dir", help="Where to generate the synthetic repository (default: a temporary directory).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (default: 3).")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker threads for the scan, as in the mapper's --jobs.")
+    parser.add_argument("--parallel-generators", nargs="?", const="auto", choices=["auto", "threads", "processes"],
+                        help="Run the generators concurrently, as in the mapper's --parallel-generators.")
+    parser.add_argument("--no-git-info", action="store_true", help="Do not time git info collection.")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>.json).")
+    parser.add_argument("--compare", metavar="BASELINE_JSON",
+                        help="Compare the results with an earlier results file.")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="With --compare, exit non-zero if a phase is this much slower (default: 0.10).")
+    add_spec_arguments(parser)
+    return parser
+
+
+def main() -> int:
+    args = _setup_arg_parser().parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if args.repo:
+            repo_root_path = Path(args.repo).resolve()
+            repo_description = {"path": str(repo_root_path)}
+        else:
+            spec = spec_from_args(args)
+            if args.repo_dir:
+                repo_root_path = Path(args.repo_dir).resolve()
+            else:
+                repo_root_path = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="repo-mapper-synth-"))) / "synthetic"
+            print(f"Generating synthetic repository ({spec.files} files) in {repo_root_path}...")
+            repo_description = generate_synthetic_repo(repo_root_path, spec)
+
+        print(f"Running {args.repeat} benchmark run(s) on {repo_root_path}...")
+        results = run_benchmarks(
+            repo_root_path, max(1, args.repeat), not args.no_git_info, max(1, args.jobs), repo_description,
+            args.parallel_generators
+        )
+
+    output_path = Path(args.output) if args.output else DEFAULT_RESULTS_DIR / f"{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+    for phase, summary in results["phases"].items():
+        print(f"  {phase:<28}{summary['median_s']:>10.4f}s (median)")
+    print(f"Results saved to: {output_path}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if not compare_results(baseline, results, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# benchmarks/startup_time.py
+
+"""
+Times the command line from process start to exit on a small repository, where
+startup is most of the latency: the bare interpreter, importing the CLI, and
+full runs with --text-tree and --all. Also checks with -X importtime that a
+--text-tree run imports no other generator. Results use the phases layout of
+run_benchmarks.py, so they can be compared with --compare.
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+
+# Make src_mapper and benchmarks importable when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.run_benchmarks import DEFAULT_RESULTS_DIR, RESULTS_SCHEMA_VERSION, _summarize, compare_results
+from benchmarks.synthetic_repo import add_spec_arguments, generate_synthetic_repo, spec_from_args
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+MAIN_SCRIPT = PACKAGE_ROOT / "src_mapper" / "main_orchestrator.py"
+
+# Generator modules a --text-tree run may import
+TEXT_TREE_GENERATOR_MODULES = {"src_mapper.generators.runner", "src_mapper.generators.text_tree_generator"}
+
+# Bytecode is written by the warm-up run, as in an installed copy; without it every run would compile the sources
+_ENVIRONMENT = {name: value for name, value in os.environ.items() if name != "PYTHONDONTWRITEBYTECODE"}
+
+
+def _commands(repo_root_path: Path, output_dir: Path) -> Dict[str, List[str]]:
+    mapper = [sys.executable, str(MAIN_SCRIPT), str(repo_root_path), "--output-dir", str(output_dir)]
+    return {
+        "interpreter": [sys.executable, "-c", "pass"],
+        "import": [sys.executable, "-c", "import src_mapper.main_orchestrator"],
+        "text_tree": mapper + ["--text-tree"],
+        "all": mapper + ["--all"],
+    }
+
+
+def _run(command: List[str]) -> float:
+    """Runs command from the package root with its output discarded and returns the wall time."""
+    start = time.perf_counter()
+    subprocess.run(
+        command, cwd=PACKAGE_ROOT, env=_ENVIRONMENT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True
+    )
+    return time.perf_counter() - start
+
+
+def import_profile(command: List[str]) -> Tuple[float, Set[str]]:
+    """Runs command with -X importtime. Returns the total import time and the src_mapper modules imported."""
+    completed = subprocess.run(
+        [command[0], "-X", "importtime", *command[1:]], cwd=PACKAGE_ROOT, env=_ENVIRONMENT,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+    )
+    total_us = 0
+    modules = set()
+    # Lines look like "import time:  self [us] | cumulative |  [indent]package"
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue # Header line
+        total_us += int(fields[0])
+        module = fields[2].strip()
+        if module.startswith("src_mapper"):
+            modules.add(module)
+    return total_us / 1e6, modules
+
+
+def run_startup_benchmarks(repo_root_path: Path, repeat: int, repo_description: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs every command repeat times (after one warm-up run) and returns the results document."""
+    phase_timings: Dict[str, List[float]] = {}
+    with tempfile.TemporaryDirectory(prefix="repo-mapper-startup-") as output_dir:
+        commands = _commands(repo_root_path, Path(output_dir))
+        for phase, command in commands.items():
+            _run(command) # Warm-up: writes bytecode caches and fills the page cache
+            phase_timings[phase] = [_run(command) for _ in range(repeat)]
+        import_seconds, modules = import_profile(commands["text_tree"])
+
+    return {
+        "schema_version": RESULTS_SCHEMA_VERSION,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "repository": repo_description,
+        "settings": {"repeat": repeat},
+        "text_tree_modules": sorted(modules),
+        "phases": {
+            **{phase: _summarize(samples) for phase, samples in phase_timings.items()},
+            "text_tree.imports": _summarize([import_seconds]),
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time command line startup on a small synthetic (or given) repository.")
+    parser.add_argument("--repo", help="Run on this existing repository instead of generating one.")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per command (default: 10).")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/startup-<timestamp>.json).")
+    parser.add_argument("--compare", metavar="BASELINE_JSON",
+                        help="Compare the results with an earlier startup results file.")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="With --compare, exit non-zero if a phase is this much slower (default: 0.10).")
+    add_spec_arguments(parser)
+    parser.set_defaults(files=40) # Small enough that startup dominates
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if args.repo:
+            repo_root_path = Path(args.repo).resolve()
+            repo_description = {"path": str(repo_root_path)}
+        else:
+            repo_root_path = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="repo-mapper-synth-"))) / "synthetic"
+            repo_description = generate_synthetic_repo(repo_root_path, spec_from_args(args))
+        results = run_startup_benchmarks(repo_root_path, max(1, args.repeat), repo_description)
+
+    output_path = Path(args.output) if args.output else DEFAULT_RESULTS_DIR / f"startup-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+    for phase, summary in results["phases"].items():
+        print(f"  {phase:<28}{summary['median_s'] * 1000:>10.1f}ms (median)")
+    print(f"Results saved to: {output_path}")
+
+    ok = True
+    extra_generators = sorted(
+        module for module in results["text_tree_modules"]
+        if module.startswith("src_mapper.generators.") and module not in TEXT_TREE_GENERATOR_MODULES
+    )
+    if extra_generators:
+        print(f"Error: --text-tree imported other generators: {', '.join(extra_generators)}", file=sys.stderr)
+        ok = False
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        ok = compare_results(baseline, results, args.threshold) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
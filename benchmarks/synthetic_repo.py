@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# benchmarks/synthetic_repo.py
+
+"""
+Deterministic synthetic repository generator for the benchmark suite.
+The same parameters and seed always produce the same tree, file contents,
+ignore rules and (optionally) git history, so timings are comparable between runs.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Any, List
+
+# Extensions for generated text files, roughly in the proportions of a typical project
+TEXT_EXTENSIONS = [".py"] * 6 + [".js"] * 3 + [".md"] * 2 + [".json", ".yaml", ".txt", ".cfg", ".html", ".css"]
+BINARY_EXTENSIONS = [".png", ".jpg", ".zip", ".pyc", ".dat"]
+
+# Written at the root of every generated repository; only such a directory is replaced without --force
+MARKER_FILE = ".synthetic_repo"
+
+_WORDS = [
+    "config", "value", "result", "items", "index", "path", "node", "buffer", "count", "name",
+    "data", "parser", "handler", "request", "response", "cache", "token", "stream", "entry", "state",
+]
+
+
+@dataclass
+class SyntheticRepoSpec:
+    """Parameters of a synthetic repository. Sizes are in bytes."""
+    files: int = 2000
+    depth: int = 4                 # Maximum directory nesting below the root
+    fanout: int = 6                # Subdirectories per directory
+    median_size: int = 4096        # Median text file size (sizes are log-normal)
+    size_sigma: float = 1.2        # Spread of the log-normal size distribution
+    max_size: int = 2 * 1024 * 1024
+    binary_ratio: float = 0.05     # Share of files with binary content
+    gitignore_rules: int = 20      # Rules in the root .gitignore
+    nested_gitignores: int = 5     # Directories with their own .gitignore
+    ignored_ratio: float = 0.1     # Share of extra files that the ignore rules exclude
+    git_commits: int = 0           # 0 = no git repository
+    seed: int = 1
+
+
+# Named presets for the benchmark runner
+PRESETS: Dict[str, SyntheticRepoSpec] = {
+    "small": SyntheticRepoSpec(files=300, depth=3, fanout=4),
+    "medium": SyntheticRepoSpec(files=3000, depth=4, fanout=6, git_commits=20),
+    "large": SyntheticRepoSpec(files=30000, depth=6, fanout=8, git_commits=50),
+}
+
+
+def _text_content(rng: random.Random, extension: str, size: int) -> str:
+    """Builds source-like text of about size bytes, with some blank lines."""
+    lines = []
+    written = 0
+    while written < size:
+        indent = "    " * rng.randint(0, 3)
+        if rng.random() < 0.1:
+            line = ""
+        elif extension == ".md":
+            line = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 14)))
+        else:
+            name = rng.choice(_WORDS)
+            line = f"{indent}{name}_{rng.randint(0, 999)} = {rng.choice(_WORDS)}({rng.randint(0, 99999)})"
+        lines.append(line)
+        written += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def _binary_content(rng: random.Random, size: int) -> bytes:
+    # Null bytes early on, as in real binaries, so content sniffing sees them
+    return b"\x89BIN\x00\x00" + rng.randbytes(max(size - 6, 0))
+
+
+def _directory_tree(rng: random.Random, spec: SyntheticRepoSpec) -> List[str]:
+    """Returns relative directory paths, the root ("") first."""
+    directories = [""]
+    frontier = [""]
+    for level in range(spec.depth):
+        next_frontier = []
+        for parent in frontier:
+            for i in range(rng.randint(max(spec.fanout // 2, 1), spec.fanout)):
+                name = f"{rng.choice(_WORDS)}_{level}_{i}"
+                path = f"{parent}/{name}" if parent else name
+                directories.append(path)
+                next_frontier.append(path)
+        frontier = next_frontier
+        # Enough directories for the requested file count, keep the tree from exploding
+        if len(directories) * 8 >= spec.files:
+            break
+    return directories
+
+
+def _gitignore_rules(rng: random.Random, count: int) -> List[str]:
+    """Produces a mix of the rule kinds the matcher handles differently."""
+    kinds = [
+        lambda i: f"*.tmp{i}",
+        lambda i: f"build_{i}/",
+        lambda i: f"**/cache_{i}/*.bin",
+        lambda i: f"/generated_{i}.py",
+        lambda i: f"logs_{i}/**/*.log",
+        lambda i: f"[ab]_{i}_*.out",
+        lambda i: f"!keep_{i}.tmp{i}",
+    ]
+    return [rng.choice(kinds)(i) for i in range(count)]
+
+
+def generate_synthetic_repo(target_dir: Path, spec: SyntheticRepoSpec, force: bool = False) -> Dict[str, Any]:
+    """
+    Creates a synthetic repository at target_dir. An existing synthetic repository there
+    (one with a MARKER_FILE) or an empty directory is replaced; any other existing
+    directory only with force, so a real checkout is never deleted by mistake.
+
+    Returns:
+        Summary dict with the spec and the number of files and bytes written
+    """
+    rng = random.Random(spec.seed)
+    if target_dir.exists():
+        if not force and not (target_dir / MARKER_FILE).exists() and any(target_dir.iterdir()):
+            raise FileExistsError(
+                f"{target_dir} exists and is not a synthetic repository (no {MARKER_FILE}); use --force to replace it"
+            )
+        shutil.rmtree(target_dir)
+    target_dir.mkdir(parents=True)
+    (target_dir / MARKER_FILE).write_text("Generated by benchmarks/synthetic_repo.py\n", encoding="utf-8")
+
+    directories = _directory_tree(rng, spec)
+    for directory in directories[1:]:
+        (target_dir / directory).mkdir(parents=True, exist_ok=True)
+
+    total_bytes = 0
+    written_files = []
+    for index in range(spec.files):
+        directory = rng.choice(directories)
+        size = min(int(rng.lognormvariate(0, spec.size_sigma) * spec.median_size), spec.max_size)
+        if rng.random() < spec.binary_ratio:
+            filename = f"asset_{index}{rng.choice(BINARY_EXTENSIONS)}"
+            data = _binary_content(rng, size)
+        else:
+            extension = rng.choice(TEXT_EXTENSIONS)
+            filename = f"{rng.choice(_WORDS)}_{index}{extension}"
+            data = _text_content(rng, extension, size).encode("utf-8")
+        relative_path = f"{directory}/{filename}" if directory else filename
+        (target_dir / relative_path).write_bytes(data)
+        total_bytes += len(data)
+        written_files.append(relative_path)
+
+    # Ignore rules, plus files for them to match
+    root_rules = _gitignore_rules(rng, spec.gitignore_rules)
+    (target_dir / ".gitignore").write_text(
+        "# Synthetic ignore rules\n" + "\n".join([MARKER_FILE, *root_rules]) + "\n", encoding="utf-8"
+    )
+    for directory in rng.sample(directories[1:], min(spec.nested_gitignores, len(directories) - 1)):
+        nested_rules = _gitignore_rules(rng, max(spec.gitignore_rules // 4, 1))
+        (target_dir / directory / ".gitignore").write_text("\n".join(nested_rules) + "\n", encoding="utf-8")
+
+    for index in range(int(spec.files * spec.ignored_ratio)):
+        directory = rng.choice(directories)
+        build_dir = target_dir / directory / f"build_{index % max(spec.gitignore_rules, 1)}"
+        build_dir.mkdir(parents=True, exist_ok=True)
+        (build_dir / f"output_{index}.tmp{index % 7}").write_text("ignored\n", encoding="utf-8")
+
+    if spec.git_commits > 0:
+        _create_git_history(target_dir, rng, written_files, spec.git_commits)
+
+    return {"spec": asdict(spec), "files_written": len(written_files), "bytes_written": total_bytes}
+
+
+def _create_git_history(target_dir: Path, rng: random.Random, files: List[str], commits: int) -> None:
+    """Commits the files over several commits with fixed identities and dates."""
+    if shutil.which("git") is None:
+        print("Warning: git not found, synthetic repository has no history.", file=sys.stderr)
+        return
+
+    env = dict(os.environ)
+    env.update({
+        "GIT_AUTHOR_NAME": "Bench Author", "GIT_AUTHOR_EMAIL": "bench@example.com",
+        "GIT_COMMITTER_NAME": "Bench Author", "GIT_COMMITTER_EMAIL": "bench@example.com",
+        "GIT_CONFIG_NOSYSTEM": "1", "HOME": str(target_dir),  # Ignore the user's git config
+    })
+
+    def git(*args: str) -> None:
+        subprocess.run(["git", *args], cwd=target_dir, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    git("init", "-q")
+    # First commit adds everything; later ones touch a random sample so files have different last commits
+    for number in range(commits):
+        env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = f"{1577836800 + number * 86400} +0000"
+        if number == 0:
+            git("add", "-A")
+        else:
+            touched = rng.sample(files, max(len(files) // commits, 1))
+            for relative_path in touched:
+                with open(target_dir / relative_path, "ab") as f:
+                    f.write(f"# revision {number}\n".encode("utf-8"))
+            git("add", "--", *touched)
+        git("commit", "-q", "--no-verify", "-m", f"Synthetic commit {number}")
+
+
+def spec_from_args(args: argparse.Namespace) -> SyntheticRepoSpec:
+    """Starts from the named preset and applies any explicitly given overrides."""
+    spec = SyntheticRepoSpec(**asdict(PRESETS[args.preset]))
+    for field_name in asdict(spec):
+        value = getattr(args, field_name, None)
+        if value is not None:
+            setattr(spec, field_name, value)
+    return spec
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds --preset and one override option per SyntheticRepoSpec field."""
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small",
+                        help="Base repository shape (default: small). Other options override it.")
+    for field_name, default in asdict(SyntheticRepoSpec()).items():
+        parser.add_argument(f"--{field_name.replace('_', '-')}", dest=field_name, type=type(default), default=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic repository for benchmarking.")
+    parser.add_argument("target_dir", help="Directory to create (an earlier synthetic repository there is replaced)")
+    parser.add_argument("--force", action="store_true",
+                        help="Replace target_dir even if it is a non-empty directory not created by this script.")
+    add_spec_arguments(parser)
+    arguments = parser.parse_args()
+    try:
+        summary = generate_synthetic_repo(Path(arguments.target_dir), spec_from_args(arguments), arguments.force)
+    except FileExistsError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# benchmarks/walker_syscalls.py
+
+"""
+Compares the scan walkers (SCAN_WALKER "scandir" and "os_walk") by the number of
+stat-family calls made per file and by scan time.
+
+Calls are counted by wrapping os.stat, os.lstat and os.scandir (including
+DirEntry.stat) for the duration of the scan, which covers pathlib and os.path
+helpers too. DirEntry.is_dir()/is_file() are not counted: on Linux they use the
+file type returned by the directory listing and make no syscall.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any
+
+# Make src_mapper and benchmarks importable when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic_repo import add_spec_arguments, generate_synthetic_repo, spec_from_args
+
+
+class _CountingDirEntry:
+    """Wraps an os.DirEntry to count the stat calls made through it."""
+
+    def __init__(self, entry: os.DirEntry, counts: Counter):
+        self._entry = entry
+        self._counts = counts
+
+    def stat(self, *args, **kwargs):
+        self._counts["direntry_stat"] += 1
+        return self._entry.stat(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        return self._entry.path
+
+
+class _CountingScandirIterator:
+    def __init__(self, iterator, counts: Counter):
+        self._iterator = iterator
+        self._counts = counts
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return _CountingDirEntry(next(self._iterator), self._counts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._iterator.close()
+
+
+@contextlib.contextmanager
+def count_stat_calls(counts: Counter):
+    """Counts os.stat, os.lstat, os.scandir and DirEntry.stat calls while active."""
+    real_stat, real_lstat, real_scandir = os.stat, os.lstat, os.scandir
+
+    def counting_stat(*args, **kwargs):
+        counts["stat"] += 1
+        return real_stat(*args, **kwargs)
+
+    def counting_lstat(*args, **kwargs):
+        counts["lstat"] += 1
+        return real_lstat(*args, **kwargs)
+
+    def counting_scandir(*args, **kwargs):
+        counts["scandir"] += 1
+        return _CountingScandirIterator(real_scandir(*args, **kwargs), counts)
+
+    os.stat, os.lstat, os.scandir = counting_stat, counting_lstat, counting_scandir
+    try:
+        yield counts
+    finally:
+        os.stat, os.lstat, os.scandir = real_stat, real_lstat, real_scandir
+
+
+def measure_walker(repo_root_path: Path, walker: str) -> Dict[str, Any]:
+    """Runs the scan once with the given walker and returns call counts and time."""
+    from src_mapper import repo_mapper
+    from src_mapper.custom_config_loader import get_config
+    from src_mapper.utils import GitignoreMatcher, FileContentCache
+    cfg = get_config(announce=False)
+    previous_walker = getattr(cfg, 'SCAN_WALKER', 'scandir')
+    cfg.SCAN_WALKER = walker
+    content_cache = FileContentCache(cfg.ENCODINGS_TO_TRY, 256 * 1024 * 1024, False)
+    counts: Counter = Counter()
+    try:
+        gitignore_matcher = GitignoreMatcher(repo_root_path)
+        with contextlib.redirect_stdout(io.StringIO()), count_stat_calls(counts):
+            start = time.perf_counter()
+            file_info_list = repo_mapper._collect_all_file_info(
+                cfg, repo_root_path, gitignore_matcher, False, content_cache
+            )
+            elapsed = time.perf_counter() - start
+    finally:
+        cfg.SCAN_WALKER = previous_walker
+        content_cache.close()
+
+    files = len(file_info_list)
+    stat_calls = counts["stat"] + counts["lstat"] + counts["direntry_stat"]
+    return {
+        "walker": walker,
+        "files": files,
+        "calls": dict(sorted(counts.items())),
+        "stat_calls_per_file": round(stat_calls / files, 3) if files else 0.0,
+        "scan_s": round(elapsed, 6),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Count stat calls per file for each scan walker.")
+    parser.add_argument("--repo", help="Measure this existing repository instead of generating one.")
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if args.repo:
+            repo_root_path = Path(args.repo).resolve()
+        else:
+            repo_root_path = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="repo-mapper-synth-"))) / "synthetic"
+            generate_synthetic_repo(repo_root_path, spec_from_args(args))
+
+        # os_walk first, so the scandir run is not the one paying for a cold page cache
+        results = [measure_walker(repo_root_path, walker) for walker in ("os_walk", "scandir")]
+
+    print(f"{'walker':<10}{'files':>8}{'stat calls/file':>18}{'scan':>12}")
+    for result in results:
+        print(f"{result['walker']:<10}{result['files']:>8}{result['stat_calls_per_file']:>18.3f}{result['scan_s']:>11.3f}s")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,6 +24,10 @@ import sys
 import requests
 from pathlib import Path
 
+# Artifacts may be compressed (--compress); src_mapper reads them either way
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src_mapper.utils.output_files import find_artifact, open_artifact, uncompressed_path
+
 # Load environment variables from .env file if present
 try:
     from dotenv import load_dotenv
@@ -36,9 +40,39 @@ except ImportError:
     pass
 
 
+def _merge_map_trees(target, source):
+    """Merges one selective map tree into another (directories are dicts without a _status key)."""
+    for name, value in source.items():
+        if name in target and "_status" not in value:
+            _merge_map_trees(target[name], value)
+        else:
+            target[name] = value
+
+
+def load_selective_map(map_path):
+    """
+    Loads a selective map. A map written with --selective-shards is an index of shard
+    files in <name>_shards/; all shards are loaded and merged into one map.
+    """
+    with open_artifact(map_path) as f:
+        selective_map = json.load(f)
+    if "sharded_by" not in selective_map or "shards" not in selective_map:
+        return selective_map
+
+    index_path = uncompressed_path(map_path)
+    shard_dir = index_path.with_name(index_path.stem + "_shards")
+    merged = {}
+    for shard in selective_map["shards"]:
+        with open_artifact(shard_dir / shard["file"]) as f:
+            _merge_map_trees(merged, json.load(f))
+    return merged
+
+
 def load_repository_data(repo_name, output_dir, target_repo_path):
     """
     Load the repo-mapper outputs for sending to an AI model.
+    Artifacts written with --compress (.gz, .zst, .xz) are found and decompressed transparently,
+    and a sharded selective map (--selective-shards) is merged back into one.
     
     Args:
         repo_name: Name of the repository
@@ -61,25 +95,27 @@ def load_repository_data(repo_name, output_dir, target_repo_path):
     
     # Load the structure text file
     structure_path = output_path / f"{repo_name}-structure.txt"
-    if structure_path.exists():
-        with open(structure_path, 'r') as f:
+    found_path = find_artifact(structure_path)
+    if found_path is not None:
+        with open_artifact(found_path) as f:
             data["structure"] = f.read()
     else:
         print(f"Warning: Structure file not found at {structure_path}")
     
     # Load the scan report CSV
     scan_path = output_path / f"{repo_name}-scan_report.csv"
-    if scan_path.exists():
-        with open(scan_path, 'r') as f:
+    found_path = find_artifact(scan_path)
+    if found_path is not None:
+        with open_artifact(found_path) as f:
             data["scan_report"] = f.read()
     else:
         print(f"Warning: Scan report not found at {scan_path}")
     
     # Load the selective map JSON
     map_path = output_path / f"{repo_name}-selective_map.json"
-    if map_path.exists():
-        with open(map_path, 'r') as f:
-            data["content"] = json.load(f)
+    found_path = find_artifact(map_path)
+    if found_path is not None:
+        data["content"] = load_selective_map(found_path)
     else:
         print(f"Warning: Selective map not found at {map_path}")
     
@@ -241,6 +277,21 @@ def send_to_ai_model(formatted_prompt, repo_name, repo_path, provider="ollama",
                     "stream": False
                 }
             )
+
+            # Check if request was successful
+            if response.status_code == 200:
+                # Parse the JSON response
+                result = response.json()
+                print("Successfully received response from Ollama")
+                return result["message"]["content"]
+            else:
+                error_msg = f"Error from Ollama API: {response.status_code} - {response.text}"
+                print(error_msg)
+                return error_msg
+        except Exception as e:
+            error_msg = f"Exception while calling Ollama: {str(e)}"
+            print(error_msg)
+            return error_msg
             
     elif provider.lower() == "openai":
         # Default model selection
@@ -366,23 +417,6 @@ def send_to_ai_model(formatted_prompt, repo_name, repo_path, provider="ollama",
             
     else:
         return f"Error: Unsupported provider '{provider}'. Choose from: ollama, openai, anthropic, or google"
-    
-    # For Ollama, we need to process the response
-    if provider.lower() == "ollama":
-        # Check if request was successful
-        if response.status_code == 200:
-            # Parse the JSON response
-            result = response.json()
-            print("Successfully received response from Ollama")
-            return result["message"]["content"]
-        else:
-            error_msg = f"Error from Ollama API: {response.status_code} - {response.text}"
-            print(error_msg)
-            return error_msg
-    except Exception as e:
-        error_msg = f"Exception while calling Ollama: {str(e)}"
-        print(error_msg)
-        return error_msg
 
 
 def save_analysis(analysis, output_file):
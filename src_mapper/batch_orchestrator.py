@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# src_mapper/batch_orchestrator.py
+
+"""
+Maps many repositories in one run.
+
+Repositories are given as paths or glob patterns, or listed in a file (one per
+line), and mapped concurrently on a bounded pool of worker processes. Each worker
+starts once and receives the configuration and folder exclusions once (inherited
+without copying where processes are forked), then maps one repository after
+another, so interpreter startup and imports are paid per worker rather than per
+repository. Each repository's artifacts go to its own subdirectory of the output
+directory, and batch_index.json there summarizes the run.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+# Adjust import paths
+# This allows importing src_mapper as a package even if not installed
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src_mapper.custom_config_loader import get_config, config_snapshot
+from src_mapper.repo_mapper import RepoMapper, MapperError
+from src_mapper.main_orchestrator import (
+    _add_artifact_arguments,
+    _add_output_format_arguments,
+    _create_output_directory,
+    _selected_artifacts
+)
+from src_mapper.utils import resolve_compression
+
+BATCH_INDEX_NAME = "batch_index.json"
+DEFAULT_BATCH_DIR_NAME = "batch" # Under DEFAULT_OUTPUT_DIR_NAME
+
+
+class BatchJob(NamedTuple):
+    repo_root_path: Path
+    output_dir: Path
+
+
+class BatchOptions(NamedTuple):
+    """Mapping options shared by all repositories of a batch."""
+    artifacts: Sequence[str]
+    include_git_info: bool
+    jobs: int
+    incremental: bool
+    compression: Optional[str]
+    compact_json: bool
+    html_lazy: bool
+    selective_shards: Optional[str] = None
+
+
+def _setup_arg_parser(config_module) -> argparse.ArgumentParser:
+    """Sets up the command-line argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Repo Mapper batch mode: map many repositories concurrently and write a summary index.",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "repos",
+        nargs="*",
+        help="Repository paths or glob patterns (e.g. 'checkouts/*'). Quote patterns to expand them here"\
+             " instead of in the shell."
+    )
+    parser.add_argument(
+        "--from-file",
+        metavar="PATH",
+        help="File listing repository paths or glob patterns, one per line. Blank lines and lines starting"\
+             " with # are skipped; relative paths are relative to the file."
+    )
+    _add_artifact_arguments(parser)
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        help=f"Directory for the per-repository output directories and {BATCH_INDEX_NAME} (defaults to"\
+             f" {config_module.DEFAULT_OUTPUT_DIR_NAME}/{DEFAULT_BATCH_DIR_NAME}/)."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        metavar="N",
+        help="Number of repositories mapped at the same time, each in its own worker process"\
+             " (default: number of CPUs)."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Worker threads for per-file metadata extraction within each repository (default: 1)."
+    )
+    parser.add_argument(
+        "--include-git-info",
+        action="store_true",
+        help="Include last Git commit information in the CSV reports. Requires git command."
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep a scan manifest in each repository's output directory and only re-read changed files."
+    )
+    _add_output_format_arguments(parser)
+    return parser
+
+
+def _expand_pattern(pattern: str, base_dir: Optional[Path] = None) -> Tuple[List[Path], Optional[str]]:
+    """
+    Returns the directories a path or glob pattern names (in sorted order for patterns),
+    and an error message if it names none.
+    """
+    pattern = os.path.expanduser(pattern)
+    if base_dir is not None and not os.path.isabs(pattern):
+        pattern = str(base_dir / pattern)
+    if glob.has_magic(pattern):
+        matches = [Path(match) for match in sorted(glob.glob(pattern)) if os.path.isdir(match)]
+        if not matches:
+            return [], f"No directories match '{pattern}'"
+        return matches, None
+    if not os.path.isdir(pattern):
+        return [], f"{pattern} is not a directory"
+    return [Path(pattern)], None
+
+
+def _collect_repositories(patterns: Sequence[str], list_file: Optional[str]) -> Tuple[List[Path], List[Tuple[str, str]]]:
+    """
+    Returns the resolved repository roots named on the command line and in list_file,
+    without duplicates, and (pattern, error message) for each entry that names no directory.
+    """
+    repo_paths: List[Path] = []
+    unmatched: List[Tuple[str, str]] = []
+
+    def add(pattern: str, base_dir: Optional[Path] = None) -> None:
+        matches, error = _expand_pattern(pattern, base_dir)
+        if error is not None:
+            print(f"Error: {error}.", file=sys.stderr)
+            unmatched.append((pattern, error))
+        repo_paths.extend(matches)
+
+    for pattern in patterns:
+        add(pattern)
+    if list_file:
+        list_path = Path(list_file)
+        try:
+            lines = list_path.read_text(encoding='utf-8').splitlines()
+        except OSError as e:
+            print(f"Error: Could not read repository list {list_path}: {e}", file=sys.stderr)
+            sys.exit(1)
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                add(line, list_path.parent)
+
+    unique_paths = {}
+    for repo_path in repo_paths:
+        unique_paths.setdefault(repo_path.resolve(), None)
+    return list(unique_paths), unmatched
+
+
+def _plan_jobs(repo_paths: Sequence[Path], output_dir: Path) -> List[BatchJob]:
+    """
+    Gives every repository an output directory named after it (name-2, name-3... for
+    repeated names, skipping suffixed names that another repository already uses).
+    """
+    jobs = []
+    used_names: Set[str] = set()
+    for repo_root_path in repo_paths:
+        base_name = repo_root_path.name or "root"
+        name = base_name
+        suffix = 1
+        while name in used_names:
+            suffix += 1
+            name = f"{base_name}-{suffix}"
+        used_names.add(name)
+        jobs.append(BatchJob(repo_root_path, output_dir / name))
+    return jobs
+
+
+# State of a worker process, set once by _init_worker
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(config, excluded_folders: FrozenSet[str], options: BatchOptions) -> None:
+    _worker_state['config'] = config
+    _worker_state['excluded_folders'] = excluded_folders
+    _worker_state['options'] = options
+
+
+def _map_repository(job: BatchJob) -> Dict[str, Any]:
+    """Maps one repository with the worker's configuration. Returns its entry for the batch index."""
+    options: BatchOptions = _worker_state['options']
+    start = time.perf_counter()
+    entry: Dict[str, Any] = {
+        "repo_path": str(job.repo_root_path),
+        "repo_name": job.repo_root_path.name,
+        "output_dir": job.output_dir.name,
+        "status": "ok",
+        "files": 0,
+        "artifacts": [],
+        "errors": [],
+    }
+    try:
+        job.output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = job.output_dir / f"{job.repo_root_path.name}-scan_manifest.json" if options.incremental else None
+        with RepoMapper(
+            job.repo_root_path,
+            _worker_state['config'],
+            include_git_info=options.include_git_info,
+            jobs=options.jobs,
+            manifest_path=manifest_path,
+            excluded_folders=_worker_state['excluded_folders']
+        ) as mapper:
+            entry["files"] = len(mapper.scan())
+            outcomes = mapper.write(
+                job.output_dir, options.artifacts, options.compression, options.compact_json, options.html_lazy,
+                selective_shards=options.selective_shards
+            )
+        # Only what this run wrote; a reused output directory may hold files of earlier runs
+        written = [manifest_path] if manifest_path is not None and manifest_path.exists() else []
+        for outcome in outcomes:
+            if outcome.error is not None:
+                entry["errors"].append(f"{outcome.name}: {outcome.error.rstrip().splitlines()[-1]}")
+            else:
+                written.extend(path for path in outcome.outputs if path.exists())
+        entry["artifacts"] = sorted(path.name for path in written)
+    except MapperError as e:
+        entry["errors"].append(str(e))
+    except Exception:
+        entry["errors"].append(traceback.format_exc().rstrip().splitlines()[-1])
+    if entry["errors"]:
+        entry["status"] = "failed"
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    sys.stdout.flush()
+    return entry
+
+
+def _report(entry: Dict[str, Any], done: int, total: int) -> None:
+    prefix = f"[{done}/{total}] {entry['repo_path']}"
+    if entry["status"] == "ok":
+        print(f"{prefix}: {entry['files']} files in {entry['seconds']:.2f}s")
+    else:
+        print(f"{prefix}: failed: {'; '.join(entry['errors'])}", file=sys.stderr)
+
+
+def _unmatched_entry(pattern: str, error: str) -> Dict[str, Any]:
+    """Batch index entry of a path or pattern that named no repository."""
+    return {
+        "repo_path": pattern,
+        "repo_name": None,
+        "output_dir": None,
+        "status": "failed",
+        "files": 0,
+        "artifacts": [],
+        "errors": [error],
+        "seconds": 0.0,
+    }
+
+
+def _failed_entry(job: BatchJob, error: str) -> Dict[str, Any]:
+    return {
+        "repo_path": str(job.repo_root_path),
+        "repo_name": job.repo_root_path.name,
+        "output_dir": job.output_dir.name,
+        "status": "failed",
+        "files": 0,
+        "artifacts": [],
+        "errors": [error],
+        "seconds": 0.0,
+    }
+
+
+def map_repositories(
+    jobs: Sequence[BatchJob],
+    config_module,
+    options: BatchOptions,
+    workers: int,
+    excluded_folders: Optional[FrozenSet[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Maps the repositories of jobs on up to workers processes (in this process if workers
+    is 1) and returns their batch index entries in job order. A repository that fails
+    does not stop the others.
+    """
+    config = config_snapshot(config_module) # Picklable and handed to each worker once
+    if excluded_folders is None:
+        excluded_folders = frozenset(config.EXCLUDE_ENTIRELY_FOLDERS)
+    entries: Dict[int, Dict[str, Any]] = {}
+    total = len(jobs)
+
+    if workers <= 1 or total < 2:
+        _init_worker(config, excluded_folders, options)
+        for position, job in enumerate(jobs):
+            entries[position] = _map_repository(job)
+            _report(entries[position], position + 1, total)
+        return [entries[position] for position in range(total)]
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, total),
+        initializer=_init_worker,
+        initargs=(config, excluded_folders, options)
+    ) as executor:
+        futures = {executor.submit(_map_repository, job): position for position, job in enumerate(jobs)}
+        try:
+            for future in as_completed(futures):
+                position = futures[future]
+                try:
+                    entries[position] = future.result()
+                except BrokenProcessPool as e:
+                    entries[position] = _failed_entry(jobs[position], f"Worker process died: {e}")
+                _report(entries[position], len(entries), total)
+        except KeyboardInterrupt:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+    return [entries[position] for position in range(total)]
+
+
+def _write_index(index_path: Path, entries: List[Dict[str, Any]], workers: int, seconds: float) -> None:
+    index = {
+        "summary": {
+            "repositories": len(entries),
+            "failed": sum(1 for entry in entries if entry["status"] != "ok"),
+            "files": sum(entry["files"] for entry in entries),
+            "workers": workers,
+            "seconds": round(seconds, 3),
+        },
+        "repositories": entries,
+    }
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        print(f"Error writing batch index {index_path}: {e}", file=sys.stderr)
+
+
+def run_batch(args: argparse.Namespace, config_module=None) -> None:
+    """Maps every repository selected by args. Exits with status 1 if any of them failed."""
+    cfg = config_module if config_module is not None else get_config()
+    artifacts = _selected_artifacts(args)
+    if not artifacts:
+        print("Error: No output format selected. Use --html, --json-structure, --text-tree, --selective, or --all.", file=sys.stderr)
+        sys.exit(1)
+    repo_paths, unmatched = _collect_repositories(args.repos, args.from_file)
+    if not repo_paths and not unmatched:
+        print("Error: No repositories to map. Give paths or patterns, or --from-file.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output_dir:
+        output_dir = Path(args.output_dir).resolve()
+    else:
+        output_dir = Path(__file__).parent.parent / cfg.DEFAULT_OUTPUT_DIR_NAME / DEFAULT_BATCH_DIR_NAME
+    output_dir = _create_output_directory(output_dir)
+
+    options = BatchOptions(
+        artifacts=tuple(artifacts),
+        include_git_info=args.include_git_info,
+        jobs=max(1, args.jobs),
+        incremental=args.incremental,
+        compression=resolve_compression(args.compress),
+        compact_json=args.compact_json,
+        html_lazy=args.html_lazy,
+        selective_shards=args.selective_shards
+    )
+    workers = max(1, args.workers)
+    jobs = _plan_jobs(repo_paths, output_dir)
+    print(f"Mapping {len(jobs)} repositories with {min(workers, len(jobs))} workers into {output_dir}")
+
+    start = time.perf_counter()
+    entries = map_repositories(jobs, cfg, options, workers)
+    # Entries that named no repository fail the batch like a failed map
+    entries.extend(_unmatched_entry(pattern, error) for pattern, error in unmatched)
+    seconds = time.perf_counter() - start
+    index_path = output_dir / BATCH_INDEX_NAME
+    _write_index(index_path, entries, workers, seconds)
+
+    failed = [entry for entry in entries if entry["status"] != "ok"]
+    print(f"\nMapped {len(entries) - len(failed)} of {len(entries)} repositories"
+          f" ({sum(entry['files'] for entry in entries)} files) in {seconds:.2f}s.")
+    print(f"Batch index saved to: {index_path}")
+    if failed:
+        print(f"Batch mapping finished with errors in: {', '.join(entry['repo_path'] for entry in failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+def main() -> None:
+    cfg = get_config()
+    parser = _setup_arg_parser(cfg)
+    arguments = parser.parse_args()
+    try:
+        run_batch(arguments, cfg)
+    except KeyboardInterrupt:
+        print("\nBatch mapping interrupted.", file=sys.stderr)
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
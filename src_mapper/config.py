@@ -117,5 +117,43 @@ TRUNCATE_LINES_DEFAULT: int = 150         # Default truncation for "uncertain" f
 TRUNCATE_LINES_FOR_INCLUDED: int = 300    # Truncation for high-priority files if they exceed LARGE_FILE_THRESHOLD_LINES
 MAX_TOTAL_EMBEDDED_CONTENT_KB: int = 1024 # 1MB budget for all embedded content in selective_map.json
 
+# How the embedding budget is spent across files
+SELECTIVE_PACKING_STRATEGY: str = "value_density" # "value_density" (score all files, best value per budget unit first) or "first_come" (walk order)
+SELECTIVE_BUDGET_UNIT: str = "bytes"      # "bytes" (uses MAX_TOTAL_EMBEDDED_CONTENT_KB) or "tokens" (uses MAX_TOTAL_EMBEDDED_TOKENS)
+MAX_TOTAL_EMBEDDED_TOKENS: int = 250000   # Token budget when SELECTIVE_BUDGET_UNIT is "tokens"
+TOKEN_ESTIMATOR = None                    # None (~4 chars per token), a callable(str) -> int, or "module:function"
+# Relative value of a file's content by why it was selected; recency adds up to 50% on top
+SELECTIVE_PRIORITY_WEIGHTS: dict = {
+    "pattern": 20.0,  # Matched ALWAYS_INCLUDE_CONTENT_PATTERNS
+    "folder": 5.0,    # Inside INCLUDE_CONTENT_IN_FOLDERS_PATTERNS
+    "other": 1.0,
+}
+# Files with identical content (same SHA-256 of their bytes, hashed during the scan) are embedded
+# once in the selective map and HTML map; later copies reference the first and cost no budget
+DEDUPLICATE_CONTENT: bool = True
+DEDUP_MIN_BYTES: int = 128 # Smaller (and empty) files are not deduplicated; a reference would be longer than them
+# --selective-shards size: target size of each selective map shard (a shard is closed once it reaches this)
+SELECTIVE_SHARD_KB: int = 1024
+
 # --- Git Utility Configuration (if git_utils is used) ---
-GIT_COMMAND_TIMEOUT_SECONDS: int = 10 # Timeout for git commands
\ No newline at end of file
+GIT_COMMAND_TIMEOUT_SECONDS: int = 10 # Timeout for git commands
+GIT_BULK_LOG_TIMEOUT_SECONDS: int = 300 # Timeout for the single history walk that collects commit info for all files
+
+# --- Performance Tuning ---
+SCAN_WALKER: str = "scandir" # "scandir" (one stat per file, reused for size and timestamps) or "os_walk" (previous traversal)
+CLASSIFIER_SAMPLE_BYTES: int = 8192 # Head sample read to classify a file as binary or text and pick its encoding
+BINARY_CONTROL_CHAR_RATIO: float = 0.3 # Files whose sample has a larger share of control characters count as binary
+LOC_STREAMING_MIN_KB: int = 256 # Files at least this large have their lines counted on raw bytes in chunks, without decoding or caching them
+CONTENT_MMAP_MIN_KB: int = 1024 # Files at least this large that the selective map truncates are memory-mapped and only their head is decoded
+CONTENT_CACHE_MAX_MB: int = 256 # In-memory budget for file content shared by the scan and all generators in one run (memory of the decoded strings)
+CONTENT_CACHE_SPILL_TO_DISK: bool = True # Spill content evicted from memory to a temporary file instead of re-reading it
+HTML_LAZY_SHARD_KB: int = 512 # Target size of each sidecar content chunk written by --html-lazy (before HTML_LAZY_COMPRESS_SHARDS)
+HTML_LAZY_COMPRESS_SHARDS: bool = False # gzip+base64 the chunks (needs a browser with DecompressionStream)
+GZIP_COMPRESS_LEVEL: int = 6 # --compress gzip: 1 (fastest) to 9 (smallest)
+ZSTD_COMPRESS_LEVEL: int = 3 # --compress zstd-if-available: 1 (fastest) to 19 (smallest)
+XZ_PRESET: int = 6 # --compress xz: 0 (fastest) to 9 (smallest)
+PROFILE_SLOW_FILE_MS: int = 50 # With --profile, files whose scan takes longer than this are listed in the profile
+WATCH_BACKEND: str = "auto" # --watch change detection: "auto" (inotify on Linux, else polling), "inotify" or "poll"
+WATCH_POLL_INTERVAL_MS: int = 500 # How often the polling backend stats the walked directories and files
+WATCH_DEBOUNCE_MS: int = 100 # --watch updates once no further change arrived for this long...
+WATCH_MAX_DELAY_MS: int = 1000 # ...or at the latest this long after the first change of a batch
\ No newline at end of file
@@ -7,37 +7,98 @@ This allows users to create a custom_config.py file with their own settings
 without modifying the original config.py file.
 """
 
-import importlib.util
 import sys
 from pathlib import Path
+from types import SimpleNamespace
 
+# Configuration of this process, loaded by the first get_config() call
+_loaded_config = None
+_custom_config_used = False
 
-def get_config():
+
+def get_config(announce: bool = True):
     """
     Attempts to load custom configuration if available, 
     otherwise falls back to the default configuration.
+    The configuration is loaded and validated once per process; later calls return the same object.
+    
+    Args:
+        announce: Print a note to stdout when custom_config.py is used
     
     Returns:
-        module: The loaded configuration module
+        The default config module, or the default settings overlaid with the
+        (validated) settings of custom_config.py
     """
+    global _loaded_config, _custom_config_used
+    if _loaded_config is None:
+        _loaded_config, _custom_config_used = _load_config()
+    if announce and _custom_config_used:
+        print("Using custom configuration from custom_config.py")
+    return _loaded_config
+
+
+def _load_config():
+    """Returns (configuration, whether custom_config.py was used)."""
+    from . import config
+
     # Try to load custom_config.py if it exists
     custom_config_path = Path(__file__).parent / "custom_config.py"
     
     if custom_config_path.exists():
         try:
-            # Load the custom config as a module
+            # Load the custom config as a module (its bytecode is cached in __pycache__ like any import)
+            import importlib.util
             spec = importlib.util.spec_from_file_location("custom_config", custom_config_path)
             custom_config = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(custom_config)
-            print("Using custom configuration from custom_config.py")
-            return custom_config
+            return validate_config(custom_config, config), True
         except Exception as e:
             print(f"Error loading custom configuration: {e}", file=sys.stderr)
             print("Falling back to default configuration", file=sys.stderr)
     
     # Fall back to default config
-    from . import config
-    return config
+    return config, False
+
+
+def validate_config(custom_config, default_config) -> SimpleNamespace:
+    """
+    Returns the settings (UPPER_CASE names) of default_config overlaid with those of
+    custom_config. A custom value whose type does not match the default's is reported
+    on stderr and replaced by the default; settings unknown to default_config are kept.
+    """
+    settings = {name: value for name, value in vars(default_config).items() if name.isupper()}
+    for name, value in vars(custom_config).items():
+        if not name.isupper():
+            continue
+        if name in settings and not _same_kind(value, settings[name]):
+            print(
+                f"Warning: {name} in custom_config.py should be of type {type(settings[name]).__name__},"
+                f" not {type(value).__name__}. Using the default: {settings[name]!r}",
+                file=sys.stderr
+            )
+            continue
+        settings[name] = value
+    return SimpleNamespace(**settings)
+
+
+def _same_kind(value, default) -> bool:
+    """Whether value can stand in for default: same type, an int for a float, any sequence for a list."""
+    if default is None:
+        return True # Optional settings take any value
+    if isinstance(default, bool) or isinstance(value, bool):
+        return isinstance(value, bool) and isinstance(default, bool)
+    if isinstance(default, float):
+        return isinstance(value, (int, float))
+    if isinstance(default, (list, tuple, set, frozenset)):
+        return isinstance(value, (list, tuple, set, frozenset))
+    return isinstance(value, type(default))
+
+
+def config_snapshot(config_module) -> SimpleNamespace:
+    """Picklable copy of the configuration constants (UPPER_CASE names) of config_module, for worker processes."""
+    return SimpleNamespace(**{
+        name: value for name, value in vars(config_module).items() if name.isupper()
+    })
 
 
 if __name__ == "__main__":
@@ -1,12 +1,38 @@
 # src_mapper/generators/__init__.py
-from .html_generator import generate_html_map
-from .json_structure_generator import generate_json_structure
-from .text_tree_generator import generate_text_tree
-from .selective_content_generator import generate_selective_map_and_report
-
-__all__ = [
-    "generate_html_map",
-    "generate_json_structure",
-    "generate_text_tree",
-    "generate_selective_map_and_report",
-]
\ No newline at end of file
+
+"""
+Artifact generators and the runner that schedules them.
+
+Each name is imported from its module the first time it is used, so selecting
+one artifact does not load the others' generators.
+"""
+
+import importlib
+
+# Exported name -> module of this package that defines it
+_EXPORTS = {
+    "generate_html_map": "html_generator",
+    "generate_json_structure": "json_structure_generator",
+    "generate_text_tree": "text_tree_generator",
+    "generate_selective_map_and_report": "selective_content_generator",
+    "GeneratorTask": "runner",
+    "GeneratorOutcome": "runner",
+    "Shared": "runner",
+    "run_generators": "runner",
+    "GENERATOR_MODES": "runner",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,49 +1,35 @@
 # src_mapper/generators/html_generator.py
 
+import base64
+import gzip
 import os
 import json
+from collections import Counter
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, List, Optional, TextIO, Tuple, Union
 
-from ..utils import read_file_content
+from ..utils import read_file_content, output_stream, is_stream, uncompressed_path, FileContentCache, FileRecord, TreeIndex, TreeNode, dedup_digest
 
-def _build_html_content_tree(file_info_list: List[Dict[str, Any]], repo_root_path: Path, config_module) -> Dict[str, Any]:
+def _load_content_display(file_path: Path, config_module, content_cache: Optional[FileContentCache]) -> str:
     """
-    Builds a nested dictionary representing the file tree with content.
-    File nodes contain actual content or placeholders for binary/error files.
+    Returns the text to show for a file: its content, or a placeholder for binary/error files.
+    Content is taken from content_cache when given, otherwise read from disk.
     """
-    content_tree = {}
-    
-    for file_info in file_info_list:
-        relative_path_parts = file_info['relative_path_posix'].split('/')
-        
-        # Navigate to the right spot in the tree
-        current_level = content_tree
-        for i, part in enumerate(relative_path_parts[:-1]):  # All parts except the filename
-            if part not in current_level:
-                current_level[part] = {}  # Create directory node if it doesn't exist
-            current_level = current_level[part]
-        
-        # Handle the file (last part)
-        filename = relative_path_parts[-1]
-        
-        # Try to read the file content
+    # Try to read the file content
+    if content_cache is not None:
+        content, is_binary, error_msg = content_cache.get(file_path)
+    else:
         content, is_binary, error_msg = read_file_content(
-            file_info['absolute_path'],
+            file_path,
             config_module.ENCODINGS_TO_TRY
         )
-        
-        # Store appropriate content in the tree
-        if is_binary:
-            content_display = f"[Binary File: {error_msg or 'Cannot display content'}]"
-        elif content is None:
-            content_display = f"[Error: {error_msg or 'Unknown error reading file'}]"
-        else:
-            content_display = content
-        
-        current_level[filename] = content_display
     
-    return content_tree
+    # Return appropriate content for display
+    if is_binary:
+        return f"[Binary File: {error_msg or 'Cannot display content'}]"
+    elif content is None:
+        return f"[Error: {error_msg or 'Unknown error reading file'}]"
+    return content
 
 def _determine_language_class(file_path: str) -> str:
     """
@@ -112,62 +98,183 @@ def _determine_language_class(file_path: str) -> str:
     
     return language_map.get(ext, '')
 
-def _generate_html_fragment_recursive(tree_level_data: Dict[str, Any], current_path_parts: Optional[List[str]] = None) -> str:
+class _ContentShardWriter:
+    """
+    Collects file content for the lazy HTML map into sidecar chunk scripts.
+
+    Each chunk is a small script calling repoMapperChunkLoaded(chunkId, payload, compressed)
+    with a {content_id: text} object (or its gzip+base64 form), so the map also works when
+    opened from disk, where fetch() of local files is blocked. Chunks are flushed once they
+    reach roughly max_shard_bytes, which bounds memory while writing. Content added with a
+    SHA-256 is stored once; identical files get the ids of the first copy.
+    """
+
+    def __init__(self, content_dir: Path, max_shard_bytes: int, compress: bool, deduplicate: bool = True):
+        self._content_dir = content_dir
+        self._deduplicate = deduplicate
+        self._max_shard_bytes = max_shard_bytes
+        self._compress = compress
+        self._next_content_id = 0
+        self._chunk_id = 0
+        self._entries: List[str] = [] # '"content_id": <JSON string>' members of the chunk's payload
+        self._entries_bytes = 0 # Size of the members; the payload is ASCII, so characters are bytes
+        self._ids_by_sha256: Dict[str, Tuple[int, int]] = {}
+
+        content_dir.mkdir(parents=True, exist_ok=True)
+        # Remove chunks from a previous run so stale content is never served
+        for old_chunk in content_dir.glob('chunk-*.js'):
+            old_chunk.unlink()
+
+    def find(self, sha256: Optional[str]) -> Optional[Tuple[int, int]]:
+        """Returns (chunk_id, content_id) of content already stored for sha256, if any."""
+        return self._ids_by_sha256.get(sha256) if sha256 is not None else None
+
+    def add(self, content: str, sha256: Optional[str] = None) -> Tuple[int, int]:
+        """Stores content and returns (chunk_id, content_id) for the HTML node."""
+        content_id = self._next_content_id
+        self._next_content_id += 1
+        chunk_id = self._chunk_id
+
+        # Encoded now so the chunk is flushed by its written size, not its character count
+        entry = f'"{content_id}": {json.dumps(content)}'
+        self._entries.append(entry)
+        self._entries_bytes += len(entry)
+        if sha256 is not None and self._deduplicate:
+            self._ids_by_sha256[sha256] = (chunk_id, content_id)
+        if self._entries_bytes >= self._max_shard_bytes:
+            self._flush()
+        return chunk_id, content_id
+
+    def close(self) -> None:
+        self._flush()
+
+    def _flush(self) -> None:
+        if not self._entries:
+            return
+        payload = "{" + ", ".join(self._entries) + "}" # As json.dumps of the {content_id: text} object
+        if self._compress:
+            compressed = base64.b64encode(gzip.compress(payload.encode('utf-8'))).decode('ascii')
+            script = f"repoMapperChunkLoaded({self._chunk_id}, \"{compressed}\", true);\n"
+        else:
+            script = f"repoMapperChunkLoaded({self._chunk_id}, {payload}, false);\n"
+
+        with open(self._content_dir / f"chunk-{self._chunk_id:05d}.js", 'w', encoding='utf-8') as f:
+            f.write(script)
+
+        self._chunk_id += 1
+        self._entries = []
+        self._entries_bytes = 0
+
+class _InlineContentTable:
     """
-    Recursively generates HTML fragments for the tree structure.
+    Shares the content of identical files in an inline HTML map. The first copy in
+    display order is written with an element id on its <code>; later copies stay
+    empty and reference that id, and a script fills them in when they are opened.
+    """
+
+    def __init__(self, tree_index: TreeIndex, config_module):
+        counts = Counter(dedup_digest(record, config_module) for record in tree_index.records)
+        self._shared = {sha256 for sha256, count in counts.items() if count > 1 and sha256 is not None}
+        self._element_ids: Dict[str, str] = {}
+        self.reference_count = 0
+
+    def find(self, sha256: Optional[str]) -> Optional[str]:
+        """Returns the element id of a written copy of sha256's content, if any."""
+        element_id = self._element_ids.get(sha256) if sha256 is not None else None
+        if element_id is not None:
+            self.reference_count += 1
+        return element_id
+
+    def add(self, sha256: Optional[str]) -> Optional[str]:
+        """Returns the element id to give the content being written, if other files share it."""
+        if sha256 not in self._shared:
+            return None
+        element_id = f"content-{len(self._element_ids)}"
+        self._element_ids[sha256] = element_id
+        return element_id
+
+def _write_file_node(
+    out: TextIO,
+    name: str,
+    details_attributes: str,
+    content_display: str,
+    is_binary_or_error: bool,
+    code_id: Optional[str] = None
+) -> None:
+    """Writes a file's <details> node; content_display is escaped and written unless it is ""."""
+    language_class = _determine_language_class(name)
+    out.write(f'<details{details_attributes}><summary class="file-name">{name}</summary>')
+
+    # Add "Copy" button for text files
+    if not is_binary_or_error:
+        out.write('<button class="copy-button" onclick="copyToClipboard(this)">Copy</button>')
+
+    # Handle content display with appropriate language class for highlighting
+    pre_class = "binary-content" if is_binary_or_error else ""
+    code_attributes = f' id="{code_id}"' if code_id is not None else ''
+    if language_class and not is_binary_or_error:
+        code_attributes += f' class="{language_class}"'
+    escaped_content = _escape_html(content_display) if content_display else ''
+    out.write(f'<pre class="{pre_class}"><code{code_attributes}>{escaped_content}</code></pre>')
+
+    out.write('</details>')
+
+def _write_html_fragment_recursive(
+    out: TextIO,
+    directory: TreeNode,
+    config_module,
+    content_cache: Optional[FileContentCache] = None,
+    shard_writer: Optional[_ContentShardWriter] = None,
+    content_table: Optional[_InlineContentTable] = None
+) -> None:
+    """
+    Recursively writes HTML fragments for the tree structure to out.
     Uses <details> for directories and <pre><code> for file content.
+    With a shard_writer, text content goes to sidecar chunks and the <details>
+    node only carries the chunk/content ids to load it from.
+    Files whose content was already written for an identical file (shard_writer or
+    content_table) are not read again and reference that copy.
+    Children are written directories first, then files, both alphabetically.
     """
-    if current_path_parts is None:
-        current_path_parts = []
-    
-    # Sort items: directories first, then files, both alphabetically
-    sorted_items = sorted(
-        tree_level_data.items(),
-        key=lambda x: (not isinstance(x[1], dict), x[0].lower())
-    )
-    
-    html_parts = []
-    
-    for name, content_or_dir in sorted_items:
-        is_directory = isinstance(content_or_dir, dict)
-        current_full_path = '/'.join(current_path_parts + [name])
+    for child in directory.sorted_children:
+        name = child.name
         
-        if is_directory:
+        if child.is_dir:
             # It's a directory
-            html_parts.append(f'<details><summary class="dir-name">{name}/</summary>')
-            # Recursively process subdirectory, building upon the path parts
-            html_parts.append(_generate_html_fragment_recursive(
-                content_or_dir, 
-                current_path_parts + [name]
-            ))
-            html_parts.append('</details>')
+            out.write(f'<details><summary class="dir-name">{name}/</summary>')
+            # Recursively process subdirectory
+            _write_html_fragment_recursive(out, child, config_module, content_cache, shard_writer, content_table)
+            out.write('</details>')
+            continue
+
+        sha256 = dedup_digest(child.record, config_module) # None for files too small to share
+        if shard_writer is not None:
+            ids = shard_writer.find(sha256)
+            if ids is not None:
+                _write_file_node(out, name, f' data-chunk="{ids[0]}" data-content-id="{ids[1]}"', "", False)
+                continue
+        elif content_table is not None:
+            element_id = content_table.find(sha256)
+            if element_id is not None:
+                _write_file_node(out, name, f' data-same-as="{element_id}"', "", False)
+                continue
+
+        # It's a file; its content is read now, so only one file's content is in memory at a time
+        content_display = _load_content_display(child.record.absolute_path, config_module, content_cache)
+        
+        # Use JavaScript .toLowerCase() for case-insensitive comparison
+        is_binary_or_error = (
+            content_display.startswith('[Binary File:') or 
+            content_display.startswith('[Error:')
+        )
+        
+        # Placeholders are tiny, so they always stay inline
+        if shard_writer is not None and not is_binary_or_error:
+            chunk_id, content_id = shard_writer.add(content_display, sha256)
+            _write_file_node(out, name, f' data-chunk="{chunk_id}" data-content-id="{content_id}"', "", False)
         else:
-            # It's a file
-            language_class = _determine_language_class(name)
-            
-            # Use JavaScript .toLowerCase() for case-insensitive comparison
-            is_binary_or_error = (
-                isinstance(content_or_dir, str) and 
-                (content_or_dir.startswith('[Binary File:') or 
-                 content_or_dir.startswith('[Error:'))
-            )
-            
-            html_parts.append(f'<details><summary class="file-name">{name}</summary>')
-            
-            # Add "Copy" button for text files
-            if not is_binary_or_error:
-                html_parts.append('<button class="copy-button" onclick="copyToClipboard(this)">Copy</button>')
-            
-            # Handle content display with appropriate language class for highlighting
-            pre_class = "binary-content" if is_binary_or_error else ""
-            if language_class and not is_binary_or_error:
-                html_parts.append(f'<pre class="{pre_class}"><code class="{language_class}">{_escape_html(content_or_dir)}</code></pre>')
-            else:
-                html_parts.append(f'<pre class="{pre_class}"><code>{_escape_html(content_or_dir)}</code></pre>')
-            
-            html_parts.append('</details>')
-    
-    return ''.join(html_parts)
+            code_id = content_table.add(sha256) if content_table is not None and not is_binary_or_error else None
+            _write_file_node(out, name, "", content_display, is_binary_or_error, code_id)
 
 def _escape_html(text: str) -> str:
     """
@@ -183,34 +290,8 @@ def _escape_html(text: str) -> str:
             .replace('"', '&quot;')
             .replace("'", '&#39;'))
 
-def generate_html_map(
-    file_info_list: List[Dict[str, Any]],
-    repo_root_path: Path,
-    repo_name: str,
-    output_file_path: Path,
-    config_module
-) -> None:
-    """
-    Generates an interactive HTML map of the repository.
-    
-    Args:
-        file_info_list: List of dictionaries containing file metadata
-        repo_root_path: Path to repository root
-        repo_name: Name of the repository
-        output_file_path: Path to write the HTML output file
-        config_module: Configuration module with constants
-    """
-    # Build the nested tree with file content
-    content_tree = _build_html_content_tree(file_info_list, repo_root_path, config_module)
-    
-    # Generate the HTML tree structure
-    html_tree = _generate_html_fragment_recursive(content_tree)
-    
-    # Count the number of files for statistics
-    file_count = len(file_info_list)
-    
-    # Construct the complete HTML document
-    html = f"""<!DOCTYPE html>
+# The HTML document around the tree. Written with str.format, so literal braces are doubled.
+_HTML_DOCUMENT_HEAD = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -339,7 +420,9 @@ def generate_html_map(
     <div class="repository-container">
         <details open class="root-details">
             <summary class="dir-name">{repo_name}/</summary>
-            {html_tree}
+            """
+
+_HTML_DOCUMENT_TAIL = """
         </details>
     </div>
     
@@ -381,9 +464,135 @@ def generate_html_map(
             document.body.removeChild(textArea);
         }}
     </script>
-</body>
+{scripts}</body>
 </html>"""
+
+# Added to lazy maps only: loads a file's chunk script the first time its node is expanded
+_LAZY_LOADER_SCRIPT = """    <script>
+        const CONTENT_DIR = {content_dir};
+        const chunkPromises = {{}};
+        const chunkResolvers = {{}};
+
+        // Called by each chunk script once it has loaded
+        function repoMapperChunkLoaded(chunkId, payload, compressed) {{
+            decodeChunk(payload, compressed).then(chunkResolvers[chunkId]);
+        }}
+
+        async function decodeChunk(payload, compressed) {{
+            if (!compressed) return payload;
+            const bytes = Uint8Array.from(atob(payload), c => c.charCodeAt(0));
+            const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+            return JSON.parse(await new Response(stream).text());
+        }}
+
+        function loadChunk(chunkId) {{
+            if (!chunkPromises[chunkId]) {{
+                chunkPromises[chunkId] = new Promise((resolve, reject) => {{
+                    chunkResolvers[chunkId] = resolve;
+                    const script = document.createElement('script');
+                    script.src = CONTENT_DIR + '/chunk-' + String(chunkId).padStart(5, '0') + '.js';
+                    script.onerror = () => {{
+                        delete chunkPromises[chunkId];
+                        reject(new Error('Could not load ' + script.src));
+                    }};
+                    document.head.appendChild(script);
+                }});
+            }}
+            return chunkPromises[chunkId];
+        }}
+
+        // 'toggle' does not bubble, so listen in the capture phase
+        document.addEventListener('toggle', (event) => {{
+            const node = event.target;
+            if (!node.open || !node.dataset || node.dataset.contentId === undefined || node.dataset.loaded) return;
+            node.dataset.loaded = 'true';
+            const codeElem = node.querySelector(':scope > pre > code');
+            codeElem.textContent = 'Loading...';
+            loadChunk(node.dataset.chunk).then((chunk) => {{
+                codeElem.textContent = chunk[node.dataset.contentId];
+                if (window.Prism) Prism.highlightElement(codeElem);
+            }}).catch((err) => {{
+                codeElem.textContent = '[Error: ' + err.message + ']';
+                delete node.dataset.loaded;
+            }});
+        }}, true);
+    </script>
+"""
+
+# Added to inline maps with duplicate files only: fills in a duplicate's content from its first copy
+_INLINE_DUPLICATES_SCRIPT = """    <script>
+        document.addEventListener('toggle', (event) => {
+            const node = event.target;
+            if (!node.open || !node.dataset || node.dataset.sameAs === undefined || node.dataset.loaded) return;
+            node.dataset.loaded = 'true';
+            const codeElem = node.querySelector(':scope > pre > code');
+            codeElem.textContent = document.getElementById(node.dataset.sameAs).textContent;
+            if (window.Prism) Prism.highlightElement(codeElem);
+        }, true);
+    </script>
+"""
+
+def generate_html_map(
+    file_info_list: List[FileRecord],
+    repo_root_path: Path,
+    repo_name: str,
+    output_file_path: Union[Path, TextIO],
+    config_module,
+    content_cache: Optional[FileContentCache] = None,
+    lazy_content: bool = False,
+    tree_index: Optional[TreeIndex] = None
+) -> None:
+    """
+    Generates an interactive HTML map of the repository.
+    The document is streamed to disk one file at a time. With DEDUPLICATE_CONTENT,
+    the content of identical files is written (or stored in a chunk) only once. A path
+    ending in .gz, .zst or .xz is compressed while it is written; lazy content chunks
+    are not, as browsers load them directly.
     
-    # Write the HTML to the output file
-    with open(output_file_path, 'w', encoding='utf-8') as f:
-        f.write(html)
\ No newline at end of file
+    Args:
+        file_info_list: FileRecord per file
+        repo_root_path: Path to repository root
+        repo_name: Name of the repository
+        output_file_path: Path to write the HTML output file, or an open text stream
+            (not with lazy_content, whose chunks are placed next to the file)
+        config_module: Configuration module with constants
+        content_cache: Optional shared content store filled during the scan
+        lazy_content: Write only the tree inline and store file content in sidecar chunks
+            next to the HTML file (`<name>_content/`), loaded when a file node is expanded
+        tree_index: Shared tree index of file_info_list; built here if not given
+    """
+    if tree_index is None:
+        tree_index = TreeIndex(file_info_list)
+    
+    # Count the number of files for statistics
+    file_count = tree_index.root.file_count
+
+    deduplicate = getattr(config_module, 'DEDUPLICATE_CONTENT', True)
+    shard_writer = None
+    content_table = None
+    scripts = ""
+    if lazy_content:
+        if is_stream(output_file_path):
+            raise ValueError("lazy_content needs an output file path for its content chunks")
+        html_path = uncompressed_path(output_file_path)
+        content_dir = html_path.with_name(html_path.stem + "_content")
+        shard_writer = _ContentShardWriter(
+            content_dir,
+            getattr(config_module, 'HTML_LAZY_SHARD_KB', 512) * 1024,
+            getattr(config_module, 'HTML_LAZY_COMPRESS_SHARDS', False),
+            deduplicate
+        )
+        scripts = _LAZY_LOADER_SCRIPT.format(content_dir=json.dumps(content_dir.name))
+    elif deduplicate:
+        content_table = _InlineContentTable(tree_index, config_module)
+    
+    # Write the HTML document: head, tree fragments, tail
+    with output_stream(output_file_path, config_module) as f:
+        f.write(_HTML_DOCUMENT_HEAD.format(repo_name=repo_name, file_count=file_count))
+        _write_html_fragment_recursive(f, tree_index.root, config_module, content_cache, shard_writer, content_table)
+        if content_table is not None and content_table.reference_count:
+            scripts += _INLINE_DUPLICATES_SCRIPT
+        f.write(_HTML_DOCUMENT_TAIL.format(scripts=scripts))
+
+    if shard_writer is not None:
+        shard_writer.close()
@@ -2,54 +2,55 @@
 
 import json
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, TextIO, Union
 
-def _build_json_structure_tree(file_info_list: List[Dict[str, Any]], repo_root_path: Path) -> Dict[str, Any]:
+from ..utils import FileRecord, TreeIndex, TreeNode, output_stream
+
+def _build_json_structure_tree(directory: TreeNode) -> Dict[str, Any]:
     """
-    Builds a nested dictionary representing the file tree structure (no content).
+    Builds a nested dictionary representing the file tree structure (no content)
+    below a directory of the tree index, in scan order.
     File nodes are marked with None as value.
     """
-    structure_tree = {}
-    
-    for file_info in file_info_list:
-        relative_path_parts = file_info['relative_path_posix'].split('/')
-        
-        # Navigate to the right spot in the tree
-        current_level = structure_tree
-        for i, part in enumerate(relative_path_parts[:-1]):  # All parts except the filename
-            if part not in current_level:
-                current_level[part] = {}  # Create directory node if it doesn't exist
-            current_level = current_level[part]
-        
-        # Add the file (last part) with None value to indicate it's a file
-        filename = relative_path_parts[-1]
-        current_level[filename] = None
-    
-    return structure_tree
+    return {
+        child.name: _build_json_structure_tree(child) if child.is_dir else None
+        for child in directory.children
+    }
 
 def generate_json_structure(
-    file_info_list: List[Dict[str, Any]],
+    file_info_list: List[FileRecord],
     repo_root_path: Path,
     repo_name: str,
-    output_file_path: Path,
-    config_module
+    output_file_path: Union[Path, TextIO],
+    config_module,
+    tree_index: Optional[TreeIndex] = None,
+    compact_json: bool = False
 ) -> None:
     """
     Generates a JSON file containing only the repository's structure (no file content).
+    A path ending in .gz, .zst or .xz is compressed while it is written.
     
     Args:
-        file_info_list: List of dictionaries containing file metadata
+        file_info_list: FileRecord per file
         repo_root_path: Path to repository root
         repo_name: Name of the repository
-        output_file_path: Path to write the JSON output file
+        output_file_path: Path to write the JSON output file, or an open text stream
         config_module: Configuration module with constants
+        tree_index: Shared tree index of file_info_list; built here if not given
+        compact_json: Write the JSON without indentation or line breaks
     """
+    if tree_index is None:
+        tree_index = TreeIndex(file_info_list)
+
     # Build the structure tree
-    structure_tree = _build_json_structure_tree(file_info_list, repo_root_path)
+    structure_tree = _build_json_structure_tree(tree_index.root)
     
     # Create the final JSON object with repo name as the root key
     json_data = {repo_name: structure_tree}
     
     # Write the JSON to the output file
-    with open(output_file_path, 'w', encoding='utf-8') as f:
-        json.dump(json_data, f, indent=2)
\ No newline at end of file
+    with output_stream(output_file_path, config_module) as f:
+        if compact_json:
+            json.dump(json_data, f, separators=(',', ':'))
+        else:
+            json.dump(json_data, f, indent=2)
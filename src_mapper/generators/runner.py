@@ -0,0 +1,219 @@
+# src_mapper/generators/runner.py
+
+"""
+Runs the selected generators one after another or concurrently.
+
+Generators only read the scan results, so they can run side by side. In
+"auto" mode, tasks marked cpu_bound run in worker processes and the rest in
+threads of this process; only generators that read no file content should be
+marked, since a worker cannot use the scan's content cache. Worker processes get
+a read-only snapshot of the file records, tree index and configuration once,
+when they start (inherited without copying where processes are forked), and build
+their own content cache, so generators that read content read files again there. A generator that raises does not stop the others;
+its error is returned in its GeneratorOutcome.
+"""
+
+import os
+import sys
+import time
+import traceback
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..custom_config_loader import config_snapshot
+from ..utils import FileContentCache, FileRecord, Profiler, TreeIndex, get_profiler, set_profiler
+
+GENERATOR_MODES = ("auto", "threads", "processes")
+
+
+class Shared(Enum):
+    """Placeholders in GeneratorTask arguments for the objects the runner provides."""
+    FILE_RECORDS = "file_records"
+    CONFIG = "config"
+    CONTENT_CACHE = "content_cache"
+    TREE_INDEX = "tree_index"
+
+
+class GeneratorTask(NamedTuple):
+    name: str # Profile phase is "generator.<name>"
+    function: Callable[..., Any] # Must be a module-level function to run in a worker process
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    cpu_bound: bool = False # Runs in a worker process in "auto" mode; only for tasks that read no file content
+    start_message: str = ""
+    done_messages: Tuple[str, ...] = ()
+    outputs: Tuple[Path, ...] = () # Files and directories the generator writes
+
+
+class GeneratorOutcome(NamedTuple):
+    name: str
+    seconds: float
+    error: Optional[str] # Formatted traceback if the generator failed
+    outputs: Tuple[Path, ...] = () # The task's outputs
+
+
+def run_generators(
+    tasks: Sequence[GeneratorTask],
+    file_records: Sequence[FileRecord],
+    config_module,
+    content_cache: Optional[FileContentCache],
+    mode: Optional[str] = None,
+    tree_index: Optional[TreeIndex] = None
+) -> List[GeneratorOutcome]:
+    """
+    Runs the tasks and returns their outcomes in task order.
+
+    Args:
+        tasks: Generators to run
+        file_records: Scan results, not modified by any generator
+        config_module: Configuration module with constants
+        content_cache: Shared content store for generators running in this process
+        mode: None to run the tasks in order in this thread; "auto" (CPU-bound tasks in
+            processes, others in threads; in order on a single CPU), "threads" or "processes"
+            to run them concurrently
+        tree_index: Tree index of file_records; built here if a task needs one and none is given
+    """
+    file_records = tuple(file_records)
+    if tree_index is None and any(
+        value is Shared.TREE_INDEX for task in tasks for value in (*task.args, *task.kwargs.values())
+    ):
+        with get_profiler().phase("tree_index"):
+            tree_index = TreeIndex(file_records)
+    shared = _SharedObjects(file_records, config_module, content_cache, tree_index)
+    if mode == "auto" and (os.cpu_count() or 1) < 2:
+        mode = None # Nothing to overlap with; concurrency would only add contention
+    if mode is None or len(tasks) < 2:
+        outcomes = []
+        for task in tasks:
+            _print_messages(task.start_message)
+            outcome = _run_in_thread(task, shared)
+            _report(task, outcome)
+            outcomes.append(outcome)
+        return outcomes
+
+    # Pools are imported here: a sequential run (the common single-artifact case) never needs them
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+    from concurrent.futures.process import BrokenProcessPool
+
+    in_process = [
+        task for task in tasks
+        if mode == "processes" or (mode == "auto" and task.cpu_bound)
+    ]
+    in_thread = [task for task in tasks if not any(task is other for other in in_process)]
+
+    for task in tasks:
+        _print_messages(task.start_message)
+    outcomes: Dict[str, GeneratorOutcome] = {}
+    profiler = get_profiler()
+    process_pool = None
+    thread_pool = None
+    futures = {}
+    try:
+        # Processes are started first, while no generator threads are running yet
+        if in_process:
+            process_pool = ProcessPoolExecutor(
+                max_workers=len(in_process),
+                initializer=_init_worker,
+                initargs=(file_records, tree_index, config_snapshot(config_module), profiler.enabled)
+            )
+            for task in in_process:
+                futures[process_pool.submit(_run_in_worker, task)] = (task, time.perf_counter())
+        if in_thread:
+            thread_pool = ThreadPoolExecutor(max_workers=len(in_thread), thread_name_prefix="generator")
+            for task in in_thread:
+                future = thread_pool.submit(_run_in_thread, task, shared)
+                futures[future] = (task, None)
+
+        for future in as_completed(futures):
+            task, submitted = futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool as e:
+                outcome = GeneratorOutcome(task.name, 0.0, f"Worker process died: {e}", task.outputs)
+            else:
+                if submitted is None:
+                    outcome = result
+                else:
+                    outcome, worker_profile = result
+                    if worker_profile is not None:
+                        profiler.merge(worker_profile)
+                        profiler.add_phase(f"generator.{task.name}", submitted, outcome.seconds)
+            _report(task, outcome)
+            outcomes[task.name] = outcome
+    finally:
+        if process_pool is not None:
+            process_pool.shutdown(wait=True)
+        if thread_pool is not None:
+            thread_pool.shutdown(wait=True)
+    return [outcomes[task.name] for task in tasks]
+
+
+class _SharedObjects(NamedTuple):
+    file_records: Tuple[FileRecord, ...]
+    config: Any
+    content_cache: Optional[FileContentCache]
+    tree_index: Optional[TreeIndex]
+
+
+def _resolve(value: Any, shared: _SharedObjects) -> Any:
+    if isinstance(value, Shared):
+        return getattr(shared, value.value)
+    return value
+
+
+def _call(task: GeneratorTask, shared: _SharedObjects) -> GeneratorOutcome:
+    args = [_resolve(arg, shared) for arg in task.args]
+    kwargs = {key: _resolve(value, shared) for key, value in task.kwargs.items()}
+    start = time.perf_counter()
+    try:
+        task.function(*args, **kwargs)
+    except Exception:
+        return GeneratorOutcome(task.name, time.perf_counter() - start, traceback.format_exc(), task.outputs)
+    return GeneratorOutcome(task.name, time.perf_counter() - start, None, task.outputs)
+
+
+def _run_in_thread(task: GeneratorTask, shared: _SharedObjects) -> GeneratorOutcome:
+    with get_profiler().phase(f"generator.{task.name}"):
+        return _call(task, shared)
+
+
+# State of a worker process, set once by _init_worker
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(file_records, tree_index: Optional[TreeIndex], config, profile: bool) -> None:
+    _worker_state['file_records'] = file_records
+    _worker_state['tree_index'] = tree_index
+    _worker_state['config'] = config
+    _worker_state['profile'] = profile
+
+
+def _run_in_worker(task: GeneratorTask) -> Tuple[GeneratorOutcome, Optional[Dict[str, Any]]]:
+    """Runs a task in a worker process; returns its outcome and the worker's profile if profiling."""
+    config_module = _worker_state['config']
+    profiler = Profiler(enabled=_worker_state['profile'])
+    set_profiler(profiler)
+    content_cache = FileContentCache.from_config(config_module)
+    try:
+        outcome = _call(task, _SharedObjects(
+            _worker_state['file_records'], config_module, content_cache, _worker_state['tree_index']
+        ))
+    finally:
+        content_cache.close()
+        set_profiler(None)
+        sys.stdout.flush()
+    return outcome, profiler.to_dict() if profiler.enabled else None
+
+
+def _print_messages(*messages: str) -> None:
+    for message in messages:
+        if message:
+            print(message)
+
+
+def _report(task: GeneratorTask, outcome: GeneratorOutcome) -> None:
+    if outcome.error is None:
+        _print_messages(*task.done_messages)
+    else:
+        print(f"Error: Generator '{task.name}' failed:\n{outcome.error.rstrip()}", file=sys.stderr)
@@ -1,128 +1,202 @@
 # src_mapper/generators/selective_content_generator.py
 
+import contextlib
 import csv
-import fnmatch
 import json
 import os
 import sys
 from pathlib import Path
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, List, NamedTuple, Set, TextIO, Tuple, Optional, Union
 
 # Import necessary utils functions
 from ..utils import (
     read_file_content,
     truncate_content_by_lines,
     get_file_extension,
-    get_file_timestamps # Import get_file_timestamps
+    get_file_timestamps, # Import get_file_timestamps
+    FileContentCache,
+    FileRecord,
+    TreeIndex,
+    dedup_digest,
+    read_head_lines,
+    ContentRules,
+    open_output_file,
+    uncompressed_path,
+    estimate_tokens_from_bytes,
+    get_token_estimator,
+    output_stream,
+    is_stream
 )
 # Import git_utils functions conditionally based on include_git_info flag
 # from ..utils import get_last_commit_info, is_git_repository # Will import inside the function
 
+# Values of shard_by (--selective-shards)
+SHARD_MODES = ("directory", "size")
 
-def _determine_file_processing_action(
-    file_info: Dict[str, Any], 
-    config_module, 
-    current_total_embedded_bytes: int
-) -> Dict[str, Any]:
+
+class _SelectiveBudget:
     """
-    Determines how to process a file for the selective map based on heuristics.
-    
-    Args:
-        file_info: Dictionary with file metadata (must include 'absolute_path', 'relative_path_posix', 'name', 'extension', 'loc', 'size_bytes')
-        config_module: Configuration module with constants
-        current_total_embedded_bytes: Current total bytes embedded so far
-        
+    The content budget of the selective map, measured in bytes or estimated tokens
+    according to SELECTIVE_BUDGET_UNIT.
+    """
+
+    def __init__(self, config_module):
+        self.unit = getattr(config_module, 'SELECTIVE_BUDGET_UNIT', 'bytes')
+        if self.unit not in ("bytes", "tokens"):
+            print(f"Warning: Unknown SELECTIVE_BUDGET_UNIT '{self.unit}', using 'bytes'.", file=sys.stderr)
+            self.unit = "bytes"
+        if self.unit == "tokens":
+            self.limit = getattr(config_module, 'MAX_TOTAL_EMBEDDED_TOKENS', 250000)
+            self._estimate_tokens = get_token_estimator(config_module)
+        else:
+            self.limit = config_module.MAX_TOTAL_EMBEDDED_CONTENT_KB * 1024
+
+    def cost(self, text: str) -> int:
+        """Returns what embedding text costs in budget units."""
+        if self.unit == "tokens":
+            return self._estimate_tokens(text)
+        return len(text.encode('utf-8'))
+
+    def estimate_cost(self, size_bytes: int) -> int:
+        """Returns the expected cost of embedding size_bytes of file content, without reading it."""
+        if self.unit == "tokens":
+            return estimate_tokens_from_bytes(size_bytes)
+        return size_bytes
+
+    def exceeded_note(self) -> str:
+        if self.unit == "tokens":
+            return f"Budget limit reached ({self.limit} tokens max)"
+        return f"Budget limit reached ({self.limit / 1024:.1f}KB max)"
+
+
+def _classify_file(file_info: FileRecord, rules: ContentRules) -> Dict[str, Any]:
+    """
+    Applies the extension and priority heuristics to a file without reading it.
+
     Returns:
         Dictionary with:
-            - content_status_detail: Status string with details on why/how content was processed
-            - content_to_embed: Content string or None
-            - processing_notes: Notes on processing decisions
-            - embedded_chars_count: Length of content_to_embed if any
-            - bytes_added_to_budget: Size of content_to_embed in bytes
+            - omitted_status: Status string if the file's content is never embedded, else None
+            - processing_notes: Notes on the decision so far
+            - is_high_priority: Whether the file matched a priority pattern or folder
+            - priority_tier: "pattern", "folder" or "other" (keys of SELECTIVE_PRIORITY_WEIGHTS)
+    """
+    classification = {
+        'omitted_status': None,
+        'processing_notes': "",
+        'is_high_priority': False,
+        'priority_tier': "other",
+    }
+
+    decision, rule = rules.classify(file_info.name, file_info.extension, file_info.relative_path_posix)
+    if decision == "binary":
+        classification['omitted_status'] = "Omitted (Binary)"
+        classification['processing_notes'] = f"Binary extension: {file_info.extension}"
+    elif decision == "excluded":
+        classification['omitted_status'] = "Omitted (Excluded Type)"
+        classification['processing_notes'] = f"Excluded extension: {file_info.extension}"
+    elif decision == "pattern":
+        classification['is_high_priority'] = True
+        classification['priority_tier'] = "pattern"
+        classification['processing_notes'] = f"High priority file (matched pattern: {rule})"
+    elif decision == "folder":
+        classification['is_high_priority'] = True
+        classification['priority_tier'] = "folder"
+        classification['processing_notes'] = f"High priority directory (matched: {rule})"
+    return classification
+
+
+def _truncate_lines_for(file_info: FileRecord, classification: Dict[str, Any], config_module) -> Optional[int]:
+    """Number of lines a large file's content is cut to, or None if it is embedded in full."""
+    if file_info.loc <= config_module.LARGE_FILE_THRESHOLD_LINES:
+        return None
+    if classification['is_high_priority']:
+        return config_module.TRUNCATE_LINES_FOR_INCLUDED
+    return config_module.TRUNCATE_LINES_DEFAULT
+
+
+# Identifies content that is embedded identically: the file's SHA-256 and the lines it is cut to
+_DedupKey = Tuple[str, Optional[int]]
+
+
+class _EmbeddedCopy(NamedTuple):
+    """The file that holds the embedded content shared by its duplicates."""
+    path: str
+    status: str
+    embedded_bytes: int
+
+
+def _dedup_key(file_info: FileRecord, classification: Dict[str, Any], config_module) -> Optional[_DedupKey]:
+    """Key under which identical files share one embedded copy, or None if the file is not deduplicated."""
+    sha256 = dedup_digest(file_info, config_module)
+    if sha256 is None:
+        return None
+    return sha256, _truncate_lines_for(file_info, classification, config_module)
+
+
+def _read_for_embedding(
+    file_info: FileRecord,
+    classification: Dict[str, Any],
+    config_module,
+    content_cache: Optional[FileContentCache]
+) -> Tuple[Optional[str], bool, Optional[str], Optional[bool]]:
+    """
+    Reads a file's content through the shared cache when there is one.
+
+    Files of at least CONTENT_MMAP_MIN_KB that will be truncated are memory-mapped
+    and only their head is decoded; the content returned is then already truncated.
+
+    Returns:
+        Tuple (content_or_none, is_binary_or_unreadable_error, error_message_or_none,
+        was_truncated: None for full content, else whether the head-only read cut the file)
+    """
+    truncate_lines = _truncate_lines_for(file_info, classification, config_module)
+    if (truncate_lines is not None
+            and file_info.size_bytes >= getattr(config_module, 'CONTENT_MMAP_MIN_KB', 1024) * 1024):
+        head = read_head_lines(
+            file_info.absolute_path, truncate_lines, config_module.ENCODINGS_TO_TRY,
+            content_cache.classifier if content_cache is not None else None
+        )
+        if head is not None:
+            content, was_truncated, is_binary, error_msg = head
+            return content, is_binary, error_msg, was_truncated
+    if content_cache is not None:
+        return content_cache.get(file_info.absolute_path) + (None,)
+    return read_file_content(file_info.absolute_path, config_module.ENCODINGS_TO_TRY) + (None,)
+
+
+def _build_embedding_result(
+    file_info: FileRecord,
+    classification: Dict[str, Any],
+    content: str,
+    config_module,
+    budget: _SelectiveBudget,
+    was_truncated: Optional[bool] = None
+) -> Dict[str, Any]:
+    """
+    Decides between full and truncated content for a readable file that fits the budget.
+    was_truncated is given when content has already been truncated (see _read_for_embedding).
     """
     result = {
         'content_status_detail': "",
         'content_to_embed': None,
-        'processing_notes': "",
+        'processing_notes': classification['processing_notes'],
         'embedded_chars_count': 0,
         'bytes_added_to_budget': 0,
+        'budget_units_added': 0,
+        'duplicate_of': None,
     }
-    
-    # Get file path info from file_info dict
-    file_path = file_info['absolute_path']
-    relative_path_posix = file_info['relative_path_posix']
-    filename = file_info['name']
-    extension = file_info.get('extension', '')
-    loc = file_info.get('loc', 0)
-    size_bytes = file_info.get('size_bytes', 0)
-    
-    # Check if this is a binary file extension
-    if extension.lower() in config_module.BINARY_FILE_EXTENSIONS:
-        result['content_status_detail'] = "Omitted (Binary)"
-        result['processing_notes'] = f"Binary extension: {extension}"
-        return result
-    
-    # Check if this is an extension whose content we generally exclude
-    if extension.lower() in config_module.EXCLUDE_CONTENT_FILE_EXTENSIONS:
-        # Check if it's *also* in the always include list (override exclusion)
-        is_in_always_include = False
-        for pattern in config_module.ALWAYS_INCLUDE_CONTENT_PATTERNS:
-            if fnmatch.fnmatch(filename, pattern):
-                is_in_always_include = True
-                break
-        
-        if not is_in_always_include:
-            result['content_status_detail'] = "Omitted (Excluded Type)"
-            result['processing_notes'] = f"Excluded extension: {extension}"
-            return result
-    
-    # Determine if this file is high priority based on patterns
-    is_high_priority = False
-    
-    # Check against ALWAYS_INCLUDE_CONTENT_PATTERNS
-    for pattern in config_module.ALWAYS_INCLUDE_CONTENT_PATTERNS:
-        if fnmatch.fnmatch(filename, pattern):
-            is_high_priority = True
-            # Add note about why it's high priority, but don't overwrite existing notes if any
-            if not result['processing_notes']:
-                 result['processing_notes'] = f"High priority file (matched pattern: {pattern})"
-            break
-    
-    # Check against INCLUDE_CONTENT_IN_FOLDERS_PATTERNS
-    if not is_high_priority:
-        for folder_pattern in config_module.INCLUDE_CONTENT_IN_FOLDERS_PATTERNS:
-            if relative_path_posix.startswith(folder_pattern):
-                is_high_priority = True
-                if not result['processing_notes']:
-                    result['processing_notes'] = f"High priority directory (matched: {folder_pattern})"
-                break
-    
-    # Read file content (only if it's not already marked as omitted for binary/error)
-    content, is_binary_read_error, error_msg = read_file_content(file_path, config_module.ENCODINGS_TO_TRY)
-    
-    # Handle binary or unreadable files detected during read
-    if is_binary_read_error or content is None:
-        result['content_status_detail'] = "Omitted (Binary/Read Error)"
-        if error_msg:
-            result['processing_notes'] = error_msg
-        return result
-    
-    # Check for budget constraints *before* deciding on truncation/full inclusion
-    max_budget_bytes = config_module.MAX_TOTAL_EMBEDDED_CONTENT_KB * 1024
-    content_bytes = len(content.encode('utf-8'))
-    
-    if current_total_embedded_bytes + content_bytes > max_budget_bytes:
-        result['content_status_detail'] = "Omitted (Budget Exceeded)"
-        result['processing_notes'] = f"Budget limit reached ({max_budget_bytes / 1024:.1f}KB max)"
-        # No content embedded
-        return result
-    
+    loc = file_info.loc
+    is_high_priority = classification['is_high_priority']
+
     # Determine if we need to truncate based on file size (LOC)
     if loc > config_module.LARGE_FILE_THRESHOLD_LINES:
         if is_high_priority:
             # Truncate high priority files to the high priority truncation length
             truncate_lines = config_module.TRUNCATE_LINES_FOR_INCLUDED
-            truncated_content, was_truncated = truncate_content_by_lines(content, truncate_lines)
+            if was_truncated is None:
+                truncated_content, was_truncated = truncate_content_by_lines(content, truncate_lines)
+            else:
+                truncated_content = content
             
             result['content_to_embed'] = truncated_content
             if was_truncated:
@@ -136,7 +210,10 @@ def _determine_file_processing_action(
         else:
             # Truncate non-priority large files to the default truncation length
             truncate_lines = config_module.TRUNCATE_LINES_DEFAULT
-            truncated_content, was_truncated = truncate_content_by_lines(content, truncate_lines)
+            if was_truncated is None:
+                truncated_content, was_truncated = truncate_content_by_lines(content, truncate_lines)
+            else:
+                truncated_content = content
             
             result['content_to_embed'] = truncated_content
             if was_truncated:
@@ -156,36 +233,430 @@ def _determine_file_processing_action(
             result['content_status_detail'] = "Full (Uncertain/Small)"
         # No truncation note needed
 
-    # Clean up processing notes if it only contains the high priority reason and no truncation/error
-    if result['processing_notes'].startswith("High priority") and "Truncated" not in result['processing_notes'] and "Error" not in result['processing_notes']:
-         result['processing_notes'] = result['processing_notes'].strip() # Keep the high priority note
-    else:
-         result['processing_notes'] = result['processing_notes'].strip() # Clean up any leading/trailing space
-
+    # Clean up any leading/trailing space in the notes
+    result['processing_notes'] = result['processing_notes'].strip()
 
     # Calculate embedded content statistics *after* potential truncation
-    if result['content_to_embed'] is not None:
-        result['embedded_chars_count'] = len(result['content_to_embed'])
-        result['bytes_added_to_budget'] = len(result['content_to_embed'].encode('utf-8'))
+    result['embedded_chars_count'] = len(result['content_to_embed'])
+    result['bytes_added_to_budget'] = len(result['content_to_embed'].encode('utf-8'))
+    result['budget_units_added'] = (
+        result['bytes_added_to_budget'] if budget.unit == "bytes" else budget.cost(result['content_to_embed'])
+    )
+    return result
+
+
+def _omitted_result(status: str, notes: str) -> Dict[str, Any]:
+    return {
+        'content_status_detail': status,
+        'content_to_embed': None,
+        'processing_notes': notes or "",
+        'embedded_chars_count': 0,
+        'bytes_added_to_budget': 0,
+        'budget_units_added': 0,
+        'duplicate_of': None,
+    }
+
+
+def _duplicate_result(classification: Dict[str, Any], copy: _EmbeddedCopy) -> Dict[str, Any]:
+    """
+    Result for a file whose content is already embedded for another file; it costs no budget.
+    The status keeps the file's own priority; the content is included by reference to copy.
+    """
+    tier = "High Priority" if classification['is_high_priority'] else "Uncertain"
+    if copy.status.startswith("Truncated"):
+        tier += "/Truncated"
+    notes = f"{classification['processing_notes']} Same content as {copy.path}".strip()
+    result = _omitted_result(f"Duplicate ({tier})", notes)
+    result['duplicate_of'] = copy
+    return result
+
+
+def _determine_file_processing_action(
+    file_info: FileRecord, 
+    config_module, 
+    current_budget_used: int,
+    content_cache: Optional[FileContentCache] = None,
+    budget: Optional[_SelectiveBudget] = None,
+    budget_approved: Optional[bool] = None,
+    embedded_copies: Optional[Dict[_DedupKey, _EmbeddedCopy]] = None,
+    rules: Optional[ContentRules] = None
+) -> Dict[str, Any]:
+    """
+    Determines how to process a file for the selective map based on heuristics.
     
+    Args:
+        file_info: Scan record of the file
+        config_module: Configuration module with constants
+        current_budget_used: Budget spent so far, in the budget's unit
+        content_cache: Optional shared content store filled during the scan
+        budget: The content budget (built from config_module if omitted)
+        budget_approved: Decision of a budget plan made up front. If None, the file
+            gets content when its full content still fits the budget (walk-order packing).
+        embedded_copies: Content embedded so far, by dedup key. A file
+            whose key is in it is not read and references that path; files embedded
+            by this call are added to it. None disables deduplication.
+        rules: The compiled content rules (built from config_module if omitted)
+        
+    Returns:
+        Dictionary with:
+            - content_status_detail: Status string with details on why/how content was processed
+            - content_to_embed: Content string or None
+            - processing_notes: Notes on processing decisions
+            - embedded_chars_count: Length of content_to_embed if any
+            - bytes_added_to_budget: Size of content_to_embed in bytes
+            - budget_units_added: Cost of content_to_embed in the budget's unit
+            - duplicate_of: The _EmbeddedCopy whose content this file shares, or None
+    """
+    if budget is None:
+        budget = _SelectiveBudget(config_module)
+    if rules is None:
+        rules = ContentRules.from_config(config_module)
+
+    classification = _classify_file(file_info, rules)
+    if classification['omitted_status']:
+        return _omitted_result(classification['omitted_status'], classification['processing_notes'])
+
+    dedup_key = _dedup_key(file_info, classification, config_module) if embedded_copies is not None else None
+    if dedup_key is not None and dedup_key in embedded_copies:
+        return _duplicate_result(classification, embedded_copies[dedup_key])
+
+    if budget_approved is False:
+        return _omitted_result("Omitted (Budget Exceeded)", budget.exceeded_note())
+
+    # Read file content (only if it's not already marked as omitted for binary/error)
+    content, is_binary_read_error, error_msg, was_truncated = _read_for_embedding(
+        file_info, classification, config_module, content_cache
+    )
+    
+    # Handle binary or unreadable files detected during read
+    if is_binary_read_error or content is None:
+        return _omitted_result("Omitted (Binary/Read Error)", error_msg)
+    
+    # Check for budget constraints *before* deciding on truncation/full inclusion
+    if budget_approved is None:
+        # The full content of a head-only read is never decoded; its size stands in for it
+        full_cost = budget.cost(content) if was_truncated is None else budget.estimate_cost(file_info.size_bytes)
+        if current_budget_used + full_cost > budget.limit:
+            return _omitted_result("Omitted (Budget Exceeded)", budget.exceeded_note())
+
+    result = _build_embedding_result(file_info, classification, content, config_module, budget, was_truncated)
+    if dedup_key is not None:
+        embedded_copies[dedup_key] = _EmbeddedCopy(
+            file_info.relative_path_posix, result['content_status_detail'], result['bytes_added_to_budget']
+        )
     return result
 
 
+def _plan_budget_by_value_density(
+    file_info_list: List[FileRecord],
+    config_module,
+    budget: _SelectiveBudget,
+    content_cache: Optional[FileContentCache] = None,
+    rules: Optional[ContentRules] = None
+) -> Set[str]:
+    """
+    Chooses which files get content when the budget cannot hold everything.
+
+    Every candidate is scored as priority weight (SELECTIVE_PRIORITY_WEIGHTS, boosted
+    by up to 50% for recently modified files) per estimated budget unit, and files are
+    admitted best-first. Candidates whose size estimate does not fit the remaining
+    budget are rejected without being read. Once one of a set of identical files is
+    admitted, the others are admitted at no cost (see DEDUPLICATE_CONTENT).
+
+    Returns:
+        Set of relative_path_posix values whose content may be embedded
+    """
+    weights = getattr(config_module, 'SELECTIVE_PRIORITY_WEIGHTS', None) or {}
+    if rules is None:
+        rules = ContentRules.from_config(config_module)
+
+    candidates = []
+    for index, file_info in enumerate(file_info_list):
+        classification = _classify_file(file_info, rules)
+        if classification['omitted_status']:
+            continue
+        # Large files only cost their truncated part
+        size_bytes = file_info.size_bytes
+        loc = file_info.loc
+        truncate_lines = _truncate_lines_for(file_info, classification, config_module)
+        if truncate_lines is not None:
+            size_bytes = size_bytes * min(truncate_lines, loc) // loc
+        candidates.append((index, file_info, classification, budget.estimate_cost(size_bytes)))
+
+    # Recency as a 0..1 rank of the modification time
+    modified_order = sorted(range(len(candidates)), key=lambda i: candidates[i][1].mtime or 0.0)
+    recency = [0.0] * len(candidates)
+    for rank, i in enumerate(modified_order):
+        recency[i] = rank / max(len(candidates) - 1, 1)
+
+    scored = []
+    for i, (index, file_info, classification, estimated_cost) in enumerate(candidates):
+        value = float(weights.get(classification['priority_tier'], 1.0)) * (1.0 + 0.5 * recency[i])
+        scored.append((-value / max(estimated_cost, 1), index, file_info, classification, estimated_cost))
+    scored.sort(key=lambda item: (item[0], item[1]))
+
+    approved: Set[str] = set()
+    paid_keys: Set[_DedupKey] = set()
+    used = 0
+    for _, _, file_info, classification, estimated_cost in scored:
+        dedup_key = _dedup_key(file_info, classification, config_module)
+        if dedup_key is not None and dedup_key in paid_keys:
+            approved.add(file_info.relative_path_posix)
+            continue
+        if used + estimated_cost > budget.limit:
+            continue
+        content, is_binary_read_error, _, was_truncated = _read_for_embedding(
+            file_info, classification, config_module, content_cache
+        )
+        if is_binary_read_error or content is None:
+            # Reported as Binary/Read Error when the map is written; costs nothing
+            approved.add(file_info.relative_path_posix)
+            continue
+        cost = _build_embedding_result(
+            file_info, classification, content, config_module, budget, was_truncated
+        )['budget_units_added']
+        if used + cost <= budget.limit:
+            used += cost
+            approved.add(file_info.relative_path_posix)
+            if dedup_key is not None:
+                paid_keys.add(dedup_key)
+    return approved
+
+
+class _JsonTreeWriter:
+    """
+    Streams a {root_key: {dir: {...}, file: entry}} document to a file one file entry
+    at a time, producing exactly the layout of json.dump(..., indent=2), or with compact
+    that of json.dump(..., separators=(',', ':')).
+
+    Entries must arrive grouped by directory in pre-order (a directory's entries
+    contiguous, as os.walk yields them); only the open directory path is kept in memory.
+    Write errors are reported once and later writes are dropped, so the caller can
+    still finish its other outputs. bytes_written counts the UTF-8 bytes of the document.
+    """
+
+    def __init__(self, output_file, root_key: str, compact: bool = False):
+        self._file = output_file
+        self.failed = output_file is None
+        self.bytes_written = 0
+        self._compact = compact
+        self._colon = ':' if compact else ': '
+        self._open_dirs: List[str] = []
+        self._has_items: List[bool] = [False] # One flag per open object, root object included
+        self._write('{' + self._line_break(1) + json.dumps(root_key) + self._colon + '{')
+
+    def _line_break(self, depth: int) -> str:
+        return '' if self._compact else '\n' + '  ' * depth
+
+    def _write(self, text: str) -> None:
+        if self._file is None:
+            return
+        self.bytes_written += len(text) if text.isascii() else len(text.encode('utf-8'))
+        try:
+            self._file.write(text)
+        except Exception as e:
+            print(f"Error writing JSON map: {e}", file=sys.stderr)
+            self._file = None
+            self.failed = True
+
+    def _begin_item(self, key: str) -> None:
+        separator = ',' if self._has_items[-1] else ''
+        self._write(separator + self._line_break(len(self._has_items) + 1) + json.dumps(key) + self._colon)
+        self._has_items[-1] = True
+
+    def _close_object(self) -> None:
+        had_items = self._has_items.pop()
+        if had_items:
+            self._write(self._line_break(len(self._has_items) + 1) + '}')
+        else:
+            self._write('}')
+
+    def add_file(self, dir_parts: List[str], filename: str, entry: Dict[str, Any]) -> None:
+        # Close directories the new entry is not inside of, then open the missing ones
+        common = 0
+        while common < len(self._open_dirs) and common < len(dir_parts) and self._open_dirs[common] == dir_parts[common]:
+            common += 1
+        while len(self._open_dirs) > common:
+            self._open_dirs.pop()
+            self._close_object()
+        for part in dir_parts[common:]:
+            self._begin_item(part)
+            self._write('{')
+            self._open_dirs.append(part)
+            self._has_items.append(False)
+
+        self._begin_item(filename)
+        if self._compact:
+            self._write(json.dumps(entry, separators=(',', ':')))
+        else:
+            indent = '  ' * (len(self._has_items) + 1)
+            self._write(json.dumps(entry, indent=2).replace('\n', '\n' + indent))
+
+    def close(self) -> None:
+        while self._open_dirs:
+            self._open_dirs.pop()
+            self._close_object()
+        self._close_object() # Root object
+        self._write(self._line_break(0) + '}')
+
+
+class _ShardedMapWriter:
+    """
+    Splits the selective map into shard files, each a selective map of its own
+    ({root_key: tree}) holding part of the files, so consumers can load only the
+    parts they need. Shards hold one top-level directory each (shard_by="directory";
+    files in the repository root share one shard) or about max_shard_bytes of JSON
+    (shard_by="size"; a shard is closed once it reaches that size). On close, an
+    index is written to index_target with every shard's file, size and estimated
+    token count, and the shard of every file path.
+
+    Has the add_file/close/failed interface of _JsonTreeWriter.
+    """
+
+    def __init__(
+        self,
+        index_target: Path,
+        root_key: str,
+        shard_by: str,
+        max_shard_bytes: int,
+        config_module,
+        compact: bool = False
+    ):
+        self._index_target = index_target
+        index_path = uncompressed_path(index_target)
+        self.shard_dir = index_path.with_name(index_path.stem + "_shards")
+        self._shard_suffix = index_path.suffix + index_target.name[len(index_path.name):] # e.g. ".json.gz"
+        self._root_key = root_key
+        self._shard_by = shard_by
+        self._max_shard_bytes = max_shard_bytes
+        self._config_module = config_module
+        self._compact = compact
+        self.failed = False
+        self._shards: List[Dict[str, Any]] = []
+        self._shard_by_path: Dict[str, int] = {}
+        self._file = None
+        self._writer: Optional[_JsonTreeWriter] = None
+        self._directory: Optional[str] = None
+
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        # Remove shards of a previous run so the directory only holds what the index lists
+        for old_shard in self.shard_dir.glob('shard-*'):
+            old_shard.unlink()
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._shards)
+
+    def add_file(self, dir_parts: List[str], filename: str, entry: Dict[str, Any]) -> None:
+        directory = dir_parts[0] if dir_parts else "."
+        if self._writer is None:
+            self._open_shard(directory)
+        elif self._shard_by == "directory" and directory != self._directory:
+            self._close_shard()
+            self._open_shard(directory)
+        elif self._shard_by == "size" and self._writer.bytes_written >= self._max_shard_bytes:
+            self._close_shard()
+            self._open_shard(directory)
+        self._writer.add_file(dir_parts, filename, entry)
+        self._shards[-1]['files'] += 1
+        self._shard_by_path['/'.join(dir_parts + [filename])] = len(self._shards) - 1
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._close_shard()
+        index = {
+            "repository": self._root_key,
+            "sharded_by": self._shard_by,
+            "shards": self._shards,
+            "paths": self._shard_by_path,
+        }
+        try:
+            with output_stream(self._index_target, self._config_module) as f:
+                if self._compact:
+                    json.dump(index, f, separators=(',', ':'))
+                else:
+                    json.dump(index, f, indent=2)
+        except Exception as e:
+            print(f"Error writing JSON map index: {e}", file=sys.stderr)
+            self.failed = True
+
+    def _open_shard(self, directory: str) -> None:
+        shard_name = f"shard-{len(self._shards):05d}{self._shard_suffix}"
+        shard = {"file": shard_name}
+        if self._shard_by == "directory":
+            shard["directory"] = directory
+        shard.update({"files": 0, "bytes": 0, "tokens": 0})
+        self._shards.append(shard)
+        self._directory = directory
+        try:
+            self._file = open_output_file(self.shard_dir / shard_name, self._config_module)
+        except Exception as e:
+            print(f"Error writing JSON map shard {shard_name}: {e}", file=sys.stderr)
+            self._file = None
+        self._writer = _JsonTreeWriter(self._file, self._root_key, self._compact)
+
+    def _close_shard(self) -> None:
+        self._writer.close()
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception as e:
+                print(f"Error writing JSON map shard {self._shards[-1]['file']}: {e}", file=sys.stderr)
+                self.failed = True
+        self.failed = self.failed or self._writer.failed
+        # Sizes are of the JSON text, before any compression
+        self._shards[-1]['bytes'] = self._writer.bytes_written
+        self._shards[-1]['tokens'] = estimate_tokens_from_bytes(self._writer.bytes_written)
+        self._file = None
+        self._writer = None
+
+
+class _SelectiveMapResult(NamedTuple):
+    """What _build_selective_map_structure returns besides the streamed map."""
+    scan_report_rows: List[Dict[str, Any]]
+    total_embedded_bytes: int
+    total_budget_used: int # In the budget's unit
+    csv_fields: List[str]
+    duplicate_count: int
+    duplicate_bytes: int # Embedded content the duplicates would have repeated
+
+
 def _build_selective_map_structure(
-    file_info_list: List[Dict[str, Any]], 
+    file_info_list: List[FileRecord], 
     config_module, 
     include_git_info: bool, 
-    repo_root_path: Path # Need repo_root_path here for git_utils
-) -> Tuple[Dict[str, Any], List[Dict[str, Any]], int, List[str]]:
+    repo_root_path: Path, # Need repo_root_path here for git_utils
+    map_writer: Union[_JsonTreeWriter, _ShardedMapWriter],
+    tree_index: TreeIndex,
+    content_cache: Optional[FileContentCache] = None
+) -> _SelectiveMapResult:
     """
-    Builds the selective map structure and the scan report entries.
+    Builds the selective map and the scan report entries.
+    Files are taken from tree_index in pre-order, and each file entry is handed to
+    map_writer as soon as it is decided, so embedded content never accumulates in memory.
+    With DEDUPLICATE_CONTENT, a file identical to one already embedded gets no content;
+    its entry references that file by path and hash.
     
     Returns:
-        Tuple of (map_structure, scan_report_rows, total_embedded_bytes, csv_fields)
+        _SelectiveMapResult with the scan report rows and CSV fields and the content totals
     """
-    selective_map_data = {}
     scan_report_rows = []
     total_embedded_bytes = 0
+    total_budget_used = 0
+    budget = _SelectiveBudget(config_module)
+    rules = ContentRules.from_config(config_module) # Compiled once for all files
+    deduplicate = getattr(config_module, 'DEDUPLICATE_CONTENT', True)
+    embedded_copies: Optional[Dict[_DedupKey, _EmbeddedCopy]] = {} if deduplicate else None
+    duplicate_count = 0
+    duplicate_bytes = 0 # Embedded content the duplicates would have repeated
+
+    # Decide up front which files the budget is spent on, unless packing in walk order
+    packing_strategy = getattr(config_module, 'SELECTIVE_PACKING_STRATEGY', 'value_density')
+    approved_paths = None
+    if packing_strategy == "value_density":
+        approved_paths = _plan_budget_by_value_density(file_info_list, config_module, budget, content_cache, rules)
+    elif packing_strategy != "first_come":
+        print(f"Warning: Unknown SELECTIVE_PACKING_STRATEGY '{packing_strategy}', using 'first_come'.", file=sys.stderr)
     
     # Define CSV headers here to ensure correct order and inclusion of Git columns
     csv_fields = [
@@ -194,6 +665,8 @@ def _build_selective_map_structure(
         "Included", "Truncated", "Omitted", "Content Status Detail",
         "Embedded Chars", "Processing Notes"
     ]
+    if deduplicate:
+        csv_fields.append("Duplicate Of")
     
     if include_git_info:
         # Import git_utils only if needed
@@ -212,36 +685,31 @@ def _build_selective_map_structure(
              include_git_info = False
 
 
-    for file_info in file_info_list:
-        relative_path_posix = file_info['relative_path_posix']
-        relative_path = file_info['relative_path'] # Path object
-        filename = file_info['name']
+    for file_info in tree_index.iter_files():
+        relative_path_posix = file_info.relative_path_posix
+        filename = file_info.name
         
         # Determine how to process this file
         processing_result = _determine_file_processing_action(
             file_info, 
             config_module, 
-            total_embedded_bytes
+            total_budget_used,
+            content_cache,
+            budget,
+            None if approved_paths is None else relative_path_posix in approved_paths,
+            embedded_copies,
+            rules
         )
         
         # Update the total embedded bytes
         total_embedded_bytes += processing_result['bytes_added_to_budget']
-        
-        # Navigate to the right spot in the map
-        current_level = selective_map_data
-        # Handle root directory case
-        if relative_path_posix != filename: # If it's not a file directly in the root
-            relative_dir_path_parts = relative_path_posix.split('/')[:-1]
-            for part in relative_dir_path_parts:
-                if part not in current_level:
-                    current_level[part] = {}  # Create directory node if it doesn't exist
-                current_level = current_level[part]
+        total_budget_used += processing_result['budget_units_added']
         
         # Add the file with metadata
         # Prepare file entry with metadata
         file_entry = {
             "_status": processing_result['content_status_detail'],
-            "_loc": file_info.get('loc', 0),
+            "_loc": file_info.loc,
         }
         
         # Add notes if any
@@ -251,27 +719,38 @@ def _build_selective_map_structure(
         # Add content if available
         if processing_result['content_to_embed'] is not None:
             file_entry["_content"] = processing_result['content_to_embed']
+        elif processing_result['duplicate_of'] is not None:
+            file_entry["_duplicate_of"] = processing_result['duplicate_of'].path
+            file_entry["_sha256"] = file_info.content_sha256
+            duplicate_count += 1
+            duplicate_bytes += processing_result['duplicate_of'].embedded_bytes
         
-        # Add the file entry to the tree
-        current_level[filename] = file_entry
+        # Stream the file entry to its spot in the map
+        map_writer.add_file(relative_path_posix.split('/')[:-1], filename, file_entry)
         
         # Create a scan report row
         status_detail = processing_result['content_status_detail']
-        included = "Yes" if "Full" in status_detail else "No"
-        truncated = "Yes" if "Truncated" in status_detail else "No"
-        omitted = "Yes" if "Omitted" in status_detail or "Excluded" in status_detail else "No" # Omitted includes Excluded (.gitignore)
+        if processing_result['duplicate_of'] is not None:
+            # Included through the embedded copy it references; its own entry embeds nothing
+            included = "By Reference"
+            truncated = "Yes" if processing_result['duplicate_of'].status.startswith("Truncated") else "No"
+            omitted = "No"
+        else:
+            included = "Yes" if "Full" in status_detail else "No"
+            truncated = "Yes" if "Truncated" in status_detail else "No"
+            omitted = "Yes" if "Omitted" in status_detail or "Excluded" in status_detail else "No" # Omitted includes Excluded (.gitignore)
         
-        location_str = file_info['parent_dir_relative_posix']
+        location_str = file_info.parent_dir_relative_posix
         if location_str == ".": location_str = "/" # Represent root location as "/"
 
         scan_report_row = {
             "File Name": filename,
             "Location": location_str,
-            "Size (KB)": f"{file_info.get('size_bytes', 0) / 1024:.2f}",
-            "Lines of Code (LOC)": file_info.get('loc', 0),
-            "Date Created": file_info.get('timestamp_created', ''),
-            "Date Modified": file_info.get('timestamp_modified', ''),
-            "Extension": file_info.get('extension', ''),
+            "Size (KB)": f"{file_info.size_bytes / 1024:.2f}",
+            "Lines of Code (LOC)": file_info.loc,
+            "Date Created": file_info.timestamp_created,
+            "Date Modified": file_info.timestamp_modified,
+            "Extension": file_info.extension,
             "Included": included,
             "Truncated": truncated,
             "Omitted": omitted,
@@ -279,6 +758,8 @@ def _build_selective_map_structure(
             "Embedded Chars": processing_result['embedded_chars_count'],
             "Processing Notes": processing_result['processing_notes']
         }
+        if deduplicate:
+            scan_report_row["Duplicate Of"] = file_entry.get("_duplicate_of", "")
         
         # Add Git info if requested and available
         if include_git_info:
@@ -288,7 +769,7 @@ def _build_selective_map_structure(
              # A better design would be to collect git info *here* if needed, or ensure it's in file_info
              # Let's modify _collect_all_file_info to add git_info if include_git_info is true
              # And then access it here
-             git_info = file_info.get('git_info') # Assume git_info is added by _collect_all_file_info
+             git_info = file_info.git_info # Assume git_info is added by _collect_all_file_info
              if git_info:
                  scan_report_row["Last Commit Hash"] = git_info.get("hash", "")
                  scan_report_row["Last Commit Author"] = git_info.get("author_name", "")
@@ -303,64 +784,118 @@ def _build_selective_map_structure(
 
         scan_report_rows.append(scan_report_row)
     
-    return selective_map_data, scan_report_rows, total_embedded_bytes, csv_fields # Return csv_fields too
+    return _SelectiveMapResult(
+        scan_report_rows, total_embedded_bytes, total_budget_used, csv_fields, duplicate_count, duplicate_bytes
+    )
 
 
 def generate_selective_map_and_report(
-    file_info_list: List[Dict[str, Any]],
+    file_info_list: List[FileRecord],
     repo_root_path: Path,
     repo_name: str,
-    json_output_path: Path, 
-    csv_output_path: Path,
+    json_output_path: Optional[Union[Path, TextIO]],
+    csv_output_path: Optional[Union[Path, TextIO]],
     config_module,
-    include_git_info: bool = False
+    include_git_info: bool = False,
+    content_cache: Optional[FileContentCache] = None,
+    tree_index: Optional[TreeIndex] = None,
+    compact_json: bool = False,
+    verbose: bool = True,
+    shard_by: Optional[str] = None
 ) -> None:
     """
     Generates a selective content JSON map and CSV scan report.
+    Outputs whose path ends in .gz, .zst or .xz are compressed while they are written.
+    With shard_by, the map is split into shard files in `<name>_shards/` next to
+    json_output_path, and json_output_path gets the index of the shards.
     
     Args:
-        file_info_list: List of dictionaries containing file metadata (should include git_info if include_git_info is True)
+        file_info_list: FileRecord per file (with git_info filled in if include_git_info is True)
         repo_root_path: Path to repository root
         repo_name: Name of the repository
-        json_output_path: Path to write the JSON map output file
-        csv_output_path: Path to write the CSV report output file
+        json_output_path: Path to write the JSON map output file, an open text stream, or None to skip the map
+        csv_output_path: Path to write the CSV report output file, an open text stream, or None to skip the report
         config_module: Configuration module with constants
         include_git_info: Whether to include Git commit information (assumes it's in file_info_list if True)
+        content_cache: Optional shared content store filled during the scan
+        tree_index: Shared tree index of file_info_list; built here if not given
+        compact_json: Write the map without indentation or line breaks
+        verbose: Print where the outputs were saved and a summary of the embedded content
+        shard_by: None for one map file, "directory" for a shard per top-level directory,
+            or "size" for shards of about SELECTIVE_SHARD_KB each (needs a json_output_path path)
     """
-    # Build the selective map structure and scan report entries
-    # Pass include_git_info and repo_root_path down
-    selective_map_data, scan_report_rows, total_embedded_bytes, csv_fields = _build_selective_map_structure(
-        file_info_list, 
-        config_module,
-        include_git_info, # Pass include_git_info
-        repo_root_path # Pass repo_root_path
-    )
-    
-    # Create the final JSON map with repo name as the root key
-    json_data = {repo_name: selective_map_data}
-    
-    # Write the JSON map to the output file
-    try:
-        with open(json_output_path, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, indent=2)
+    if shard_by is not None:
+        if shard_by not in SHARD_MODES:
+            raise ValueError(f"Unknown shard_by '{shard_by}'. Choose from: {', '.join(SHARD_MODES)}")
+        if is_stream(json_output_path):
+            raise ValueError("shard_by needs an output file path for the map index and its shards")
+    if tree_index is None:
+        tree_index = TreeIndex(file_info_list)
+
+    with contextlib.ExitStack() as output_files:
+        # Open the JSON map; the map is streamed into it while files are processed,
+        # with the repo name as the root key
+        json_file = None
+        map_writer = None
+        if json_output_path is not None and shard_by is not None:
+            try:
+                map_writer = _ShardedMapWriter(
+                    json_output_path, repo_name, shard_by,
+                    getattr(config_module, 'SELECTIVE_SHARD_KB', 1024) * 1024, config_module, compact_json
+                )
+            except Exception as e:
+                print(f"Error writing JSON map: {e}", file=sys.stderr) # Still build the CSV report
+        elif json_output_path is not None:
+            try:
+                json_file = output_files.enter_context(output_stream(json_output_path, config_module))
+            except Exception as e:
+                print(f"Error writing JSON map: {e}", file=sys.stderr) # Still build the CSV report
+        if map_writer is None:
+            map_writer = _JsonTreeWriter(json_file, repo_name, compact_json)
+
+        # Build the selective map and scan report entries
+        # Pass include_git_info and repo_root_path down
+        result = _build_selective_map_structure(
+            file_info_list, 
+            config_module,
+            include_git_info, # Pass include_git_info
+            repo_root_path, # Pass repo_root_path
+            map_writer,
+            tree_index,
+            content_cache
+        )
+        map_writer.close()
+
+    if verbose and not map_writer.failed and isinstance(map_writer, _ShardedMapWriter):
+        print(f"Successfully generated JSON map index: {json_output_path} ({map_writer.shard_count} shards in {map_writer.shard_dir})")
+    elif verbose and not map_writer.failed and not is_stream(json_output_path):
         print(f"Successfully generated JSON map: {json_output_path} ({json_output_path.stat().st_size / 1024:.2f} KB)")
-    except Exception as e:
-        print(f"Error writing JSON map: {e}", file=sys.stderr)
 
     # Write the CSV report
     try:
-        if scan_report_rows:
-            with open(csv_output_path, 'w', encoding='utf-8', newline='') as csvfile:
+        if csv_output_path is None:
+            pass
+        elif result.scan_report_rows:
+            with output_stream(csv_output_path, config_module, newline='') as csvfile:
                 # Use the determined fields based on git info inclusion
-                writer = csv.DictWriter(csvfile, fieldnames=csv_fields)
+                writer = csv.DictWriter(csvfile, fieldnames=result.csv_fields)
                 writer.writeheader()
-                writer.writerows(scan_report_rows)
-            print(f"Successfully generated CSV report: {csv_output_path} ({csv_output_path.stat().st_size / 1024:.2f} KB)")
-        else:
+                writer.writerows(result.scan_report_rows)
+            if verbose and not is_stream(csv_output_path):
+                print(f"Successfully generated CSV report: {csv_output_path} ({csv_output_path.stat().st_size / 1024:.2f} KB)")
+        elif verbose:
             print("No files processed for CSV report.")
     except Exception as e:
         print(f"Error writing CSV report: {e}", file=sys.stderr)
 
+    if not verbose:
+        return
     # Print summary
-    print(f"Selective mapping complete. Total embedded content: {total_embedded_bytes / 1024:.2f} KB")
-    print(f"Processed {len(file_info_list)} files, with detailed breakdown in {csv_output_path}")
\ No newline at end of file
+    if getattr(config_module, 'SELECTIVE_BUDGET_UNIT', 'bytes') == "tokens":
+        print(f"Selective mapping complete. Total embedded content: {result.total_embedded_bytes / 1024:.2f} KB (~{result.total_budget_used} tokens)")
+    else:
+        print(f"Selective mapping complete. Total embedded content: {result.total_embedded_bytes / 1024:.2f} KB")
+    if result.duplicate_count:
+        print(f"Deduplicated {result.duplicate_count} files with content identical to an embedded file ({result.duplicate_bytes / 1024:.2f} KB not repeated)")
+    if csv_output_path is not None and not is_stream(csv_output_path):
+        print(f"Processed {len(file_info_list)} files, with detailed breakdown in {csv_output_path}")
\ No newline at end of file
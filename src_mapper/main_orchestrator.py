@@ -2,10 +2,13 @@
 # src_mapper/main_orchestrator.py
 
 import argparse
+import contextlib
+import io
 import os
 import sys
+import time
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Optional
 
 # Adjust import paths
 # This allows importing src_mapper as a package even if not installed
@@ -13,51 +16,41 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Local imports using custom config loader
 from src_mapper.custom_config_loader import get_config
-cfg = get_config()
+from src_mapper.repo_mapper import RepoMapper, MapperError, ARTIFACTS, SELECTIVE_SHARD_MODES, GIT_UTILS_AVAILABLE
 from src_mapper.utils import (
-    count_lines,
-    get_file_extension,
-    get_file_timestamps,
-    load_gitignore_patterns,
-    should_ignore_by_gitignore,
-    is_excluded_entirely
+    Profiler,
+    set_profiler,
+    resolve_compression,
+    COMPRESSION_CHOICES
 )
-# Import git_utils functions here if include_git_info is possible
-try:
-    from src_mapper.utils import is_git_repository, get_last_commit_info
-    _GIT_UTILS_AVAILABLE = True
-except ImportError:
-    _GIT_UTILS_AVAILABLE = False
-    # Define dummy functions if git_utils is not available
-    def is_git_repository(repo_root_path: Path) -> bool: return False
-    def get_last_commit_info(relative_file_path: Path, repo_root_path: Path, timeout: int = 10) -> None: return None
-
-
 from src_mapper.generators import (
-    generate_html_map,
-    generate_json_structure,
-    generate_text_tree,
-    generate_selective_map_and_report
+    GeneratorTask,
+    GeneratorOutcome,
+    run_generators,
+    GENERATOR_MODES
 )
+# Watch mode's modules (watchers, scan state, signal, shutil) are imported when --watch is used
+if TYPE_CHECKING:
+    from src_mapper.utils import ScanState, ScanUpdate
 
-def _setup_arg_parser() -> argparse.ArgumentParser:
-    """Sets up the command-line argument parser."""
-    parser = argparse.ArgumentParser(
-        description="Repo Mapper: Generate various representations of a repository's structure and content.",
-        formatter_class=argparse.RawDescriptionHelpFormatter
-    )
-    
-    parser.add_argument(
-        "repo_path",
-        help="Path to the repository to map. Use '..' to map the parent directory, '.' for the current directory."
-    )
-    
+WATCH_STAGING_DIR_NAME = ".watch-staging"
+# Outputs that only depend on which paths exist
+_STRUCTURE_ONLY_GENERATORS = ("json_structure", "text_tree")
+
+def _add_artifact_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the options that select artifacts (also used by batch_orchestrator.py)."""
     # Generator options
     parser.add_argument(
         "--html", 
         action="store_true",
         help="Generate the interactive HTML map."
     )
+    parser.add_argument(
+        "--html-lazy",
+        action="store_true",
+        help="With --html/--all, keep only the tree in the HTML file and load file content on demand"\
+             " from sidecar chunks in <repo>-mapper_content/. Recommended for large repositories."
+    )
     parser.add_argument(
         "--json-structure", 
         action="store_true",
@@ -73,22 +66,58 @@ def _setup_arg_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Generate the selective content JSON map AND its companion CSV scan report."
     )
+    parser.add_argument(
+        "--selective-shards",
+        choices=SELECTIVE_SHARD_MODES,
+        help="With --selective/--all, split the selective map into shards in <repo>-selective_map_shards/,"\
+             " one per top-level directory or of about SELECTIVE_SHARD_KB each, and write their index"\
+             " (shard of every path, bytes and estimated tokens per shard) to <repo>-selective_map.json."
+    )
     parser.add_argument(
         "--all", 
         action="store_true",
         help="Generate all available artifact types."
     )
+
+def _add_output_format_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the options that change how artifacts are written (also used by batch_orchestrator.py)."""
+    parser.add_argument(
+        "--compress",
+        choices=COMPRESSION_CHOICES,
+        help="Compress every output file while it is written (adds .gz, .zst or .xz to its name)."\
+             " 'zstd-if-available' uses gzip when the zstandard package is not installed. --html-lazy"\
+             " content chunks stay uncompressed."
+    )
+    parser.add_argument(
+        "--compact-json",
+        action="store_true",
+        help="Write the JSON structure and selective map without indentation or line breaks."
+    )
+
+def _setup_arg_parser(config_module) -> argparse.ArgumentParser:
+    """Sets up the command-line argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Repo Mapper: Generate various representations of a repository's structure and content.",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    
+    parser.add_argument(
+        "repo_path",
+        help="Path to the repository to map. Use '..' to map the parent directory, '.' for the current directory."
+    )
+    
+    _add_artifact_arguments(parser)
     
     # Additional options
     parser.add_argument(
         "--output-dir", 
         type=str,
-        help=f"Specify a custom output directory (defaults to {cfg.DEFAULT_OUTPUT_DIR_NAME}/ subdirectory)."\
+        help=f"Specify a custom output directory (defaults to {config_module.DEFAULT_OUTPUT_DIR_NAME}/ subdirectory)."\
              " Path is relative to the script's directory (repo-mapper/)."
     )
     
     # Add include-git-info only if git_utils is available
-    if _GIT_UTILS_AVAILABLE:
+    if GIT_UTILS_AVAILABLE:
         parser.add_argument(
             "--include-git-info", 
             action="store_true",
@@ -103,6 +132,48 @@ def _setup_arg_parser() -> argparse.ArgumentParser:
             dest="_include_git_info_ignored" # Use a different destination
         )
 
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Number of worker threads for per-file metadata extraction during the scan (default: 1, serial)."\
+             " Higher values help on network filesystems and cold caches."
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep a scan manifest in the output directory and only re-read files whose size, mtime or inode"\
+             " changed since the previous run."
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After mapping, keep running and update the outputs when files change (inotify on Linux, polling"\
+             " elsewhere; see WATCH_* in config.py). Only changed files are re-read, and each output is replaced"\
+             " atomically. Stop with Ctrl+C."
+    )
+    parser.add_argument(
+        "--parallel-generators",
+        nargs="?",
+        const="auto",
+        choices=GENERATOR_MODES,
+        help="Run the selected generators concurrently instead of one after another. 'auto' (default) runs"\
+             " them in threads that share the scan's file content (in order on a single CPU); 'threads' does"\
+             " the same on any machine; 'processes' runs each in a worker process, which reads file content"\
+             " again. A failing generator does not stop the others."
+    )
+    _add_output_format_arguments(parser)
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="json",
+        choices=["json", "chrome"],
+        help="Record phase timings, counters (files, bytes read, decode fallbacks, subprocesses) and files slower"\
+             " than PROFILE_SLOW_FILE_MS. Written to <repo>-profile.json, or with 'chrome' to <repo>-trace.json"\
+             " for chrome://tracing or Perfetto."
+    )
+
     return parser
 
 def _create_output_directory(output_dir_path: Path) -> Path:
@@ -122,94 +193,200 @@ def _create_output_directory(output_dir_path: Path) -> Path:
         print(f"Error creating output directory {output_dir_path}: {e}", file=sys.stderr)
         sys.exit(1)
 
-def _collect_all_file_info(target_repo_path: Path, gitignore_patterns: List[str], include_git_info: bool) -> List[Dict[str, Any]]:
-    """Collects information about all files in the repository."""
-    file_info_list = []
-    
-    # Validate the repository path
-    if not target_repo_path.is_dir():
-        print(f"Error: {target_repo_path} is not a valid directory", file=sys.stderr)
-        sys.exit(1)
-    
-    # Check if it's a git repo if git info is requested
-    is_git_repo = include_git_info and is_git_repository(target_repo_path)
-    if include_git_info and not is_git_repo:
-         print("Info: --include-git-info specified, but target is not a Git repository. Git info will be skipped.", file=sys.stderr)
+def _write_profile(profiler: Profiler, profile_format: str, output_dir: Path, repo_name: str) -> None:
+    """Writes the collected profile and prints the phase timings."""
+    suffix = "trace" if profile_format == "chrome" else "profile"
+    profile_path = output_dir / f"{repo_name}-{suffix}.json"
+    try:
+        profiler.write(profile_path, profile_format)
+    except Exception as e:
+        print(f"Error writing profile: {e}", file=sys.stderr)
+        return
 
+    summary = profiler.to_dict()
+    print("Profile:")
+    for phase in summary['phases']:
+        print(f"  {phase['name']:<26}{phase['duration_s']:>9.3f}s")
+    counters = summary['counters']
+    print(f"  {counters.get('files_scanned', 0)} files scanned, {counters.get('bytes_read', 0) / 1024:.1f} KB read, "
+          f"{counters.get('decode_fallbacks', 0)} decode fallbacks, {counters.get('subprocesses_spawned', 0)} subprocesses, "
+          f"{len(summary['slow_files'])} slow files")
+    print(f"  Profile saved to: {profile_path}")
 
-    # Walk through the directory structure
-    for root, dirs, files in os.walk(target_repo_path):
-        root_path = Path(root)
-        
-        # Filter out directories that should be excluded entirely
-        # Need to create relative path for exclusion check
-        dirs_to_process = []
-        for d in dirs:
-            relative_dir_path = Path(os.path.relpath(root_path / d, target_repo_path))
-            if not is_excluded_entirely(
-                relative_dir_path,
-                cfg.EXCLUDE_ENTIRELY_FOLDERS,
-                gitignore_patterns
-            ):
-                dirs_to_process.append(d)
-            # else:
-                # print(f"Debug: Excluding directory {relative_dir_path}", file=sys.stderr) # Optional debug
-        dirs[:] = dirs_to_process # Modify dirs in place for os.walk
-
-        # Process each file
-        for filename in files:
-            absolute_path = root_path / filename
-            relative_path = Path(os.path.relpath(absolute_path, target_repo_path))
-            relative_path_posix = relative_path.as_posix()
-            
-            # Skip files that match gitignore patterns
-            if should_ignore_by_gitignore(relative_path, gitignore_patterns):
-                # print(f"Debug: Ignoring file {relative_path} by gitignore", file=sys.stderr) # Optional debug
-                continue
-            
-            # Get file extension
-            extension = get_file_extension(filename)
-            
-            # Get file size
+def _selected_artifacts(args: argparse.Namespace) -> List[str]:
+    """Returns the artifact names (see RepoMapper.write) selected by args."""
+    if args.all:
+        return list(ARTIFACTS)
+    selected = [("html", args.html), ("json_structure", args.json_structure),
+                ("text_tree", args.text_tree), ("selective", args.selective)]
+    return [artifact for artifact, chosen in selected if chosen]
+
+def _build_generator_tasks(
+    args: argparse.Namespace,
+    mapper: RepoMapper,
+    output_dir: Path,
+    write_dir: Optional[Path] = None,
+    compression: Optional[str] = None
+) -> List[GeneratorTask]:
+    """
+    Returns the generator tasks selected by args. Outputs are written to write_dir
+    (default: output_dir); messages name their final place in output_dir.
+    compression ("gzip", "zstd", "xz" or None) adds its suffix to every output file name.
+    """
+    return mapper.generator_tasks(
+        output_dir, _selected_artifacts(args), write_dir, compression,
+        getattr(args, 'compact_json', False), getattr(args, 'html_lazy', False),
+        getattr(args, 'selective_shards', None)
+    )
+
+def _watch_excluded_folders(config_module, repo_root_path: Path, output_dir: Path) -> frozenset:
+    """Folder exclusions for watch mode: the configured ones plus the output directory if it is inside the repository."""
+    excluded_folders = set(config_module.EXCLUDE_ENTIRELY_FOLDERS)
+    try:
+        relative_output_dir = output_dir.relative_to(repo_root_path)
+    except ValueError:
+        return frozenset(excluded_folders)
+    if relative_output_dir == Path('.'):
+        print("Error: --watch cannot write its outputs into the repository root it watches. Use --output-dir.", file=sys.stderr)
+        sys.exit(1)
+    excluded_folders.add(relative_output_dir.as_posix()) # Rewriting outputs must not trigger another update
+    return frozenset(excluded_folders)
+
+def _publish_outputs(tasks: List[GeneratorTask], outcomes: List[GeneratorOutcome], output_dir: Path) -> List[str]:
+    """
+    Moves the outputs of the generators that succeeded from the staging directory
+    into output_dir, each with a single rename. Returns the names moved.
+    """
+    import shutil
+    published = []
+    for task, outcome in zip(tasks, outcomes):
+        if outcome.error is not None:
+            continue # Previous outputs stay in place
+        for staged_path in task.outputs:
+            target_path = output_dir / staged_path.name
             try:
-                size_bytes = absolute_path.stat().st_size
-            except Exception:
-                size_bytes = 0 # File might have vanished or permission error
-            
-            # Count lines of code (only attempt for non-binary extensions)
-            loc = 0
-            if extension.lower() not in cfg.BINARY_FILE_EXTENSIONS:
-                 loc = count_lines(absolute_path, cfg.ENCODINGS_TO_TRY)
-            
-            # Get file timestamps
-            timestamp_created, timestamp_modified = get_file_timestamps(absolute_path)
-            
-            # Get Git info if requested and it's a git repo
-            git_info = None
-            if include_git_info and is_git_repo:
-                 git_info = get_last_commit_info(relative_path, target_repo_path, cfg.GIT_COMMAND_TIMEOUT_SECONDS)
-
-            # Collect all info in a dictionary
-            file_info = {
-                'name': filename,
-                'absolute_path': absolute_path,
-                'relative_path': relative_path, # Keep Path object
-                'relative_path_posix': relative_path_posix, # Keep posix string
-                'parent_dir_relative_posix': str(relative_path.parent),
-                'extension': extension,
-                'size_bytes': size_bytes,
-                'loc': loc,
-                'timestamp_created': timestamp_created,
-                'timestamp_modified': timestamp_modified,
-                'git_info': git_info # Add git info here
-            }
-            
-            file_info_list.append(file_info)
-    
-    return file_info_list
+                if staged_path.is_dir():
+                    # Directories cannot replace a non-empty directory: move the old one aside first
+                    retired_path = target_path.with_name(target_path.name + ".old")
+                    shutil.rmtree(retired_path, ignore_errors=True)
+                    if target_path.exists():
+                        os.replace(target_path, retired_path)
+                    os.replace(staged_path, target_path)
+                    shutil.rmtree(retired_path, ignore_errors=True)
+                elif staged_path.exists():
+                    os.replace(staged_path, target_path)
+                else:
+                    continue # Not written (e.g. no CSV report for an empty repository)
+                published.append(target_path.name)
+            except OSError as e:
+                print(f"Error: Could not move {staged_path.name} into {output_dir}: {e}", file=sys.stderr)
+    return published
 
-def run_mapper(args: argparse.Namespace) -> None:
-    """Main function to run the mapper with the given arguments."""
+def _update_watches(watcher, update: "ScanUpdate", scan_state: "ScanState", config_module):
+    """Watches the directories the update added and drops removed ones. Returns the watcher to use from now on."""
+    from src_mapper.utils import PollingWatcher
+    for relative_dir_posix in update.directories_removed:
+        watcher.unwatch_directory(relative_dir_posix)
+    try:
+        for relative_dir_posix in update.directories_added:
+            watcher.watch_directory(relative_dir_posix)
+    except OSError as e:
+        print(f"Warning: {e}. Falling back to polling.", file=sys.stderr)
+        watcher.close()
+        watcher = PollingWatcher(
+            scan_state.repo_root_path, scan_state.listings, scan_state.signatures,
+            getattr(config_module, 'WATCH_POLL_INTERVAL_MS', 500) / 1000
+        )
+    return watcher
+
+def _watch_repository(
+    args: argparse.Namespace,
+    mapper: RepoMapper,
+    output_dir: Path,
+    compression: Optional[str] = None
+) -> None:
+    """
+    Keeps the outputs up to date until interrupted (Ctrl+C).
+
+    The scan results stay in memory; each batch of changes (collected until no
+    change arrives for WATCH_DEBOUNCE_MS, at most WATCH_MAX_DELAY_MS) re-lists only
+    the affected directories and re-reads only the changed files. The generators
+    then write to a staging directory, and each finished output replaces the
+    previous one with a rename, so readers never see a partly written file.
+    Structure-only outputs are rewritten only when files were added or removed.
+    mapper must have been created with keep_listings=True and have scanned.
+    """
+    import shutil
+    import signal
+    from src_mapper.utils import TreeIndex, create_watcher
+
+    cfg = mapper.config
+    repo_root_path = mapper.repo_root_path
+    staging_dir = output_dir / WATCH_STAGING_DIR_NAME
+    staging_dir.mkdir(exist_ok=True)
+    tasks = _build_generator_tasks(args, mapper, output_dir, staging_dir, compression)
+    scan_state = mapper.scan_state()
+    watcher = create_watcher(
+        getattr(cfg, 'WATCH_BACKEND', 'auto'), repo_root_path, scan_state.listings, scan_state.signatures,
+        getattr(cfg, 'WATCH_POLL_INTERVAL_MS', 500) / 1000
+    )
+    debounce_seconds = getattr(cfg, 'WATCH_DEBOUNCE_MS', 100) / 1000
+    max_delay_seconds = getattr(cfg, 'WATCH_MAX_DELAY_MS', 1000) / 1000
+    generator_mode = getattr(args, 'parallel_generators', None)
+
+    def stop_on_sigterm(signum, frame):
+        raise KeyboardInterrupt
+    # Stopped by a service manager like by Ctrl+C, so the staging directory is cleaned up
+    previous_sigterm_handler = signal.signal(signal.SIGTERM, stop_on_sigterm)
+
+    print(f"\nWatching {repo_root_path} for changes ({watcher.backend}). Press Ctrl+C to stop.")
+    try:
+        while True:
+            changes = watcher.wait(None)
+            deadline = time.monotonic() + max_delay_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                more_changes = watcher.wait(min(debounce_seconds, remaining))
+                if not more_changes:
+                    break
+                changes.merge(more_changes)
+
+            update_start = time.perf_counter()
+            update = scan_state.apply(changes)
+            watcher = _update_watches(watcher, update, scan_state, cfg)
+            if not update:
+                continue # Only ignored paths or unchanged files were touched
+
+            selected_tasks = [
+                task for task in tasks
+                if update.paths_changed or task.name not in _STRUCTURE_ONLY_GENERATORS
+            ]
+            tree_index = TreeIndex(scan_state.file_records())
+            with contextlib.redirect_stdout(io.StringIO()): # Errors still go to stderr
+                outcomes = run_generators(
+                    selected_tasks, tree_index.records, cfg, mapper.content_cache, generator_mode, tree_index
+                )
+            published = _publish_outputs(selected_tasks, outcomes, output_dir)
+            print(
+                f"[{time.strftime('%H:%M:%S')}] {len(update.added)} added, {len(update.modified)} modified,"
+                f" {len(update.removed)} removed; updated {', '.join(published) or 'nothing'}"
+                f" in {time.perf_counter() - update_start:.2f}s"
+            )
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        signal.signal(signal.SIGTERM, previous_sigterm_handler)
+        watcher.close()
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+def run_mapper(args: argparse.Namespace, config_module=None) -> None:
+    """
+    Main function to run the mapper with the given arguments.
+    config_module defaults to get_config(). Exits with status 1 on errors.
+    """
+    cfg = config_module if config_module is not None else get_config()
     # Resolve repository path
     repo_path_str = args.repo_path
     repo_root_path = Path(repo_path_str).resolve()
@@ -217,6 +394,12 @@ def run_mapper(args: argparse.Namespace) -> None:
     # Determine the repository name (last part of the path)
     repo_name = repo_root_path.name
     
+    # Check if nothing was selected
+    artifacts = _selected_artifacts(args)
+    if not artifacts:
+        print("Error: No output format selected. Use --html, --json-structure, --text-tree, --selective, or --all.", file=sys.stderr)
+        sys.exit(1)
+    
     # Create or use specified output directory
     if args.output_dir:
         output_dir = Path(args.output_dir).resolve()
@@ -226,80 +409,86 @@ def run_mapper(args: argparse.Namespace) -> None:
         output_dir = script_dir / cfg.DEFAULT_OUTPUT_DIR_NAME
     
     output_dir = _create_output_directory(output_dir)
-    
-    # Load gitignore patterns
-    gitignore_patterns = load_gitignore_patterns(repo_root_path)
-    
-    print(f"Scanning repository: {repo_root_path}")
-    print(f"Output directory: {output_dir}")
+
+    # Instrumentation is reported to the active profiler; install a recording one if requested
+    profile_format = getattr(args, 'profile', None)
+    profiler = Profiler(
+        enabled=profile_format is not None,
+        slow_file_threshold_ms=getattr(cfg, 'PROFILE_SLOW_FILE_MS', 50)
+    )
+    set_profiler(profiler)
     
     # Check if git info is requested and possible
     include_git_info = getattr(args, 'include_git_info', False) # Handle case where git_utils is not available
-    if include_git_info and not _GIT_UTILS_AVAILABLE:
+    if include_git_info and not GIT_UTILS_AVAILABLE:
         print("Warning: --include-git-info requires git utilities to be available. Flag ignored.", file=sys.stderr)
         include_git_info = False # Disable if not possible
 
-    # Collect file information (do this once for all generators)
-    # Pass include_git_info down to collect git info during the walk
-    file_info_list = _collect_all_file_info(repo_root_path, gitignore_patterns, include_git_info)
-    
-    print(f"Found {len(file_info_list)} files to process.")
-    
-    # Determine which artifacts to generate
-    generate_html = args.html or args.all
-    generate_json = args.json_structure or args.all
-    generate_tree = args.text_tree or args.all
-    generate_selective = args.selective or args.all
-    
-    # Check if nothing was selected
-    if not any([generate_html, generate_json, generate_tree, generate_selective]):
-        print("Error: No output format selected. Use --html, --json-structure, --text-tree, --selective, or --all.", file=sys.stderr)
-        sys.exit(1)
-    
-    # Generate HTML map
-    if generate_html:
-        print("Generating HTML map...")
-        html_output_path = output_dir / f"{repo_name}-mapper.html"
-        generate_html_map(file_info_list, repo_root_path, repo_name, html_output_path, cfg)
-        print(f"  HTML map saved to: {html_output_path}")
-    
-    # Generate JSON structure
-    if generate_json:
-        print("Generating JSON structure...")
-        json_output_path = output_dir / f"{repo_name}-structure.json"
-        generate_json_structure(file_info_list, repo_root_path, repo_name, json_output_path, cfg)
-        print(f"  JSON structure saved to: {json_output_path}")
-    
-    # Generate text tree
-    if generate_tree:
-        print("Generating text tree...")
-        tree_output_path = output_dir / f"{repo_name}-structure.txt"
-        generate_text_tree(file_info_list, repo_root_path, repo_name, tree_output_path, cfg)
-        print(f"  Text tree saved to: {tree_output_path}")
-    
-    # Generate selective map and scan report
-    if generate_selective:
-        print("Generating selective map and scan report...")
-        json_map_path = output_dir / f"{repo_name}-selective_map.json"
-        csv_report_path = output_dir / f"{repo_name}-scan_report.csv"
-        
-        # Pass include_git_info down to the generator
-        generate_selective_map_and_report(
-            file_info_list, 
-            repo_root_path, 
-            repo_name, 
-            json_map_path, 
-            csv_report_path, 
+    # Watch mode keeps the directory listings to re-list only what changes later
+    watch = getattr(args, 'watch', False)
+    excluded_folders = _watch_excluded_folders(cfg, repo_root_path, output_dir) if watch else None
+
+    # Scan once for all generators; reuse per-file results from the previous run if requested
+    try:
+        mapper = RepoMapper(
+            repo_root_path,
             cfg,
-            include_git_info # Pass the flag
+            include_git_info=include_git_info,
+            jobs=getattr(args, 'jobs', 1),
+            manifest_path=output_dir / f"{repo_name}-scan_manifest.json" if getattr(args, 'incremental', False) else None,
+            excluded_folders=excluded_folders,
+            keep_listings=watch,
+            verbose=True
         )
+    except MapperError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Scanning repository: {repo_root_path}")
+    print(f"Output directory: {output_dir}")
+
+    try:
+        try:
+            file_info_list = mapper.scan()
+        except MapperError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
         
-        print(f"  Selective map saved to: {json_map_path}")
-        print(f"  Scan report saved to: {csv_report_path}")
-    
+        print(f"Found {len(file_info_list)} files to process.")
+        if mapper.scan_manifest is not None:
+            print(f"Reused {mapper.scan_manifest.reused_count} unchanged files from {mapper.scan_manifest.manifest_path.name}.")
+        compression = resolve_compression(getattr(args, 'compress', None))
+
+        # Each generator only reads the scan results; they run in order unless --parallel-generators is given
+        tasks = _build_generator_tasks(args, mapper, output_dir, None, compression)
+        outcomes = run_generators(
+            tasks, mapper.file_records, cfg, mapper.content_cache, getattr(args, 'parallel_generators', None),
+            mapper.tree_index
+        )
+        failed = [outcome.name for outcome in outcomes if outcome.error is not None]
+
+        if profiler.enabled:
+            _write_profile(profiler, profile_format, output_dir, repo_name)
+            set_profiler(None)
+
+        if watch:
+            if failed:
+                print(f"\nInitial mapping finished with errors in: {', '.join(failed)}", file=sys.stderr)
+            _watch_repository(args, mapper, output_dir, compression)
+            return
+    finally:
+        mapper.close()
+
+    if failed:
+        print(f"\nRepo mapping finished with errors in: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
     print("\nRepo mapping complete!")
 
-if __name__ == "__main__":
-    parser = _setup_arg_parser()
+def main() -> None:
+    cfg = get_config()
+    parser = _setup_arg_parser(cfg)
     arguments = parser.parse_args()
-    run_mapper(arguments)
\ No newline at end of file
+    run_mapper(arguments, cfg)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,574 @@
+# src_mapper/repo_mapper.py
+
+"""
+Library API: a mapping session for one repository.
+
+RepoMapper holds the configuration, the compiled ignore rules, the content
+cache and the scan results of a repository, so a program can scan once and
+render any number of artifacts, to files or to streams, without going through
+the command line. Nothing here prints to stdout unless asked to (verbose=True)
+or exits the process; problems with the repository raise MapperError, and
+warnings go to stderr as everywhere else in the mapper.
+
+    with RepoMapper("path/to/repo") as mapper:
+        records = mapper.scan()
+        mapper.render("text_tree", sys.stdout)
+        mapper.write("out", ["html", "selective"])
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, AbstractSet, Dict, Iterable, List, Optional, TextIO, Tuple, Union
+
+from .custom_config_loader import get_config
+from .utils import (
+    count_lines_streaming,
+    count_non_empty_lines,
+    get_file_extension,
+    sha256_of_file,
+    GitignoreMatcher,
+    FileRecord,
+    FileContentCache,
+    TreeIndex,
+    ScanManifest,
+    manifest_settings,
+    get_profiler,
+    walk_repository,
+    DirectoryListing,
+    compressed_path,
+    WALKERS
+)
+# Import git_utils functions here if include_git_info is possible
+try:
+    from .utils import is_git_repository, get_last_commit_info_bulk
+    GIT_UTILS_AVAILABLE = True
+except ImportError:
+    GIT_UTILS_AVAILABLE = False
+    # Define dummy functions if git_utils is not available
+    def is_git_repository(repo_root_path: Path) -> bool: return False
+    def get_last_commit_info_bulk(relative_file_paths: List[str], repo_root_path: Path, timeout: int = 300) -> Dict[str, Dict[str, str]]: return {}
+
+# Generator modules are imported by _generator_task, so a run only loads the generators it uses
+from .generators.runner import GeneratorTask, GeneratorOutcome, Shared, run_generators
+
+if TYPE_CHECKING:
+    from .utils.scan_state import ScanState
+
+# Artifact names, as accepted by RepoMapper.render() and RepoMapper.write()
+ARTIFACTS = ("html", "json_structure", "text_tree", "selective")
+# Ways to split the selective map (the selective generator's SHARD_MODES, without importing it)
+SELECTIVE_SHARD_MODES = ("directory", "size")
+
+
+class MapperError(Exception):
+    """The repository cannot be mapped (e.g. its path is not a directory)."""
+
+
+def _collect_file_info(
+    config_module,
+    repo_root: str,
+    absolute_path: str,
+    relative_path_posix: str,
+    content_cache: FileContentCache,
+    scan_manifest: Optional[ScanManifest] = None,
+    stat_result: Optional[os.stat_result] = None
+) -> FileRecord:
+    """
+    Collects the metadata for a single file (size, LOC, timestamps).
+    Git info is filled in afterwards for all files at once. Safe to call from worker threads.
+    With a scan_manifest, files whose stat signature is unchanged reuse the previous
+    run's LOC and content hash instead of being read. Text files are hashed while they
+    are read when a scan manifest is used or DEDUPLICATE_CONTENT is set.
+    stat_result is the walker's stat of the file; the file is stat'ed here if it is None.
+    """
+    cfg = config_module
+    profiler = get_profiler()
+    if profiler.enabled:
+        file_start = time.perf_counter()
+    directory, _, filename = relative_path_posix.rpartition('/')
+
+    # Get file extension
+    extension = get_file_extension(filename)
+
+    # Get file size
+    if stat_result is None:
+        try:
+            stat_result = os.stat(absolute_path)
+        except Exception:
+            pass # File might have vanished or permission error
+    size_bytes = stat_result.st_size if stat_result is not None else 0
+
+    loc = 0
+    content_sha256 = None
+    previous_record = None
+    compute_sha256 = scan_manifest is not None or getattr(cfg, 'DEDUPLICATE_CONTENT', True)
+    if scan_manifest is not None and stat_result is not None:
+        previous_record = scan_manifest.lookup(relative_path_posix, stat_result)
+
+    if previous_record is not None:
+        loc = previous_record['loc']
+        content_sha256 = previous_record['sha256']
+        if previous_record['is_binary']:
+            content_cache.seed_binary(absolute_path, previous_record['read_error'])
+    elif extension.lower() not in cfg.BINARY_FILE_EXTENSIONS:
+        # Count lines of code (only attempt for non-binary extensions)
+        streamed = None
+        if size_bytes >= getattr(cfg, 'LOC_STREAMING_MIN_KB', 256) * 1024:
+            # Large file: count on raw bytes in chunks instead of decoding and caching all of it
+            if profiler.enabled:
+                loc_start = time.perf_counter()
+            streamed = count_lines_streaming(
+                absolute_path, cfg.ENCODINGS_TO_TRY,
+                compute_sha256=compute_sha256, classifier=content_cache.classifier
+            )
+            if profiler.enabled:
+                profiler.add_time("loc_counting", time.perf_counter() - loc_start) # Includes reading the file
+                if streamed is not None:
+                    profiler.count("files_loc_streamed")
+        if streamed is not None:
+            loc, is_binary, error_msg, encoding, content_sha256 = streamed
+            if is_binary:
+                content_cache.seed_binary(absolute_path, error_msg)
+        else:
+            if compute_sha256:
+                (content, is_binary, error_msg), content_sha256 = content_cache.get_with_sha256(absolute_path)
+            else:
+                content, is_binary, error_msg = content_cache.get(absolute_path)
+            encoding = content_cache.encoding_of(absolute_path)
+            if not is_binary and content is not None:
+                if profiler.enabled:
+                    loc_start = time.perf_counter()
+                    loc = count_non_empty_lines(content)
+                    profiler.add_time("loc_counting", time.perf_counter() - loc_start)
+                else:
+                    loc = count_non_empty_lines(content)
+                if compute_sha256 and content_sha256 is None:
+                    # Cached by a get() that did not hash it; the cache keeps digests it computed
+                    content_sha256 = sha256_of_file(absolute_path)
+        if scan_manifest is not None and stat_result is not None:
+            scan_manifest.update(
+                relative_path_posix, stat_result, loc, is_binary, encoding, content_sha256, error_msg
+            )
+    elif scan_manifest is not None and stat_result is not None:
+        # Binary by extension: content was never inspected
+        scan_manifest.update(relative_path_posix, stat_result, 0, None, None, None)
+
+    if profiler.enabled:
+        profiler.count("files_scanned")
+        profiler.record_file(
+            relative_path_posix, file_start, time.perf_counter() - file_start,
+            f"{size_bytes} bytes, {loc} LOC" + (" (from manifest)" if previous_record is not None else "")
+        )
+
+    # Timestamps come from the same stat; git_info is filled in by _collect_all_file_info if requested
+    return FileRecord(
+        repo_root,
+        directory,
+        filename,
+        extension,
+        size_bytes,
+        loc,
+        stat_result.st_ctime if stat_result is not None else None,
+        stat_result.st_mtime if stat_result is not None else None,
+        content_sha256
+    )
+
+def _collect_all_file_info(
+    config_module,
+    target_repo_path: Path,
+    gitignore_matcher: GitignoreMatcher,
+    include_git_info: bool,
+    content_cache: FileContentCache,
+    jobs: int = 1,
+    scan_manifest: Optional[ScanManifest] = None,
+    excluded_folders: Optional[AbstractSet[str]] = None,
+    listings: Optional[Dict[str, DirectoryListing]] = None
+) -> List[FileRecord]:
+    """
+    Collects information about all files in the repository.
+    Text content read for line counting is kept in content_cache for the generators.
+    Unchanged files are taken from scan_manifest when one is given.
+    With jobs > 1, per-file metadata extraction runs on a thread pool while the
+    walk continues; results are returned in the same order as a serial scan.
+    excluded_folders defaults to EXCLUDE_ENTIRELY_FOLDERS; listings, if given, is
+    filled with the listing of every walked directory (see walk_repository).
+    Raises MapperError if target_repo_path is not a directory.
+    """
+    cfg = config_module
+    # Validate the repository path
+    if not target_repo_path.is_dir():
+        raise MapperError(f"{target_repo_path} is not a valid directory")
+
+    # Check if it's a git repo if git info is requested
+    is_git_repo = include_git_info and is_git_repository(target_repo_path)
+    if include_git_info and not is_git_repo:
+         print("Info: --include-git-info specified, but target is not a Git repository. Git info will be skipped.", file=sys.stderr)
+
+    # Folder exclusions from config match either a directory name or a full relative path
+    if excluded_folders is None:
+        excluded_folders = frozenset(cfg.EXCLUDE_ENTIRELY_FOLDERS)
+    profiler = get_profiler()
+    repo_root = str(target_repo_path) # Shared by all records
+
+    executor = None
+    if jobs > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=jobs)
+    # Completed dicts (serial) or futures (parallel), always in walk order
+    pending_results = []
+
+    walker = getattr(cfg, 'SCAN_WALKER', 'scandir')
+    if walker not in WALKERS:
+        print(f"Warning: Unknown SCAN_WALKER '{walker}', using 'scandir'.", file=sys.stderr)
+        walker = "scandir"
+
+    try:
+        # Walk through the directory structure; excluded and ignored paths are already skipped
+        for absolute_path, relative_path_posix, stat_result in walk_repository(
+            target_repo_path, gitignore_matcher, excluded_folders, walker, listings
+        ):
+            if executor is not None:
+                pending_results.append(executor.submit(
+                    _collect_file_info, cfg, repo_root, absolute_path, relative_path_posix,
+                    content_cache, scan_manifest, stat_result
+                ))
+            else:
+                pending_results.append(_collect_file_info(
+                    cfg, repo_root, absolute_path, relative_path_posix, content_cache, scan_manifest, stat_result
+                ))
+
+        if executor is None:
+            file_info_list = pending_results
+        else:
+            file_info_list = [future.result() for future in pending_results]
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    # Get Git info for every file with one history walk instead of one git process per file
+    if is_git_repo:
+        with profiler.phase("git_info"):
+            git_info_by_path = get_last_commit_info_bulk(
+                [file_info.relative_path_posix for file_info in file_info_list],
+                target_repo_path,
+                getattr(cfg, 'GIT_BULK_LOG_TIMEOUT_SECONDS', 300)
+            )
+        for file_info in file_info_list:
+            file_info.git_info = git_info_by_path.get(file_info.relative_path_posix)
+
+    return file_info_list
+
+
+class RepoMapper:
+    """
+    Mapping session for one repository: scans it and renders artifacts from the scan.
+
+    The session keeps the scan results, the ignore rules compiled for the scan and
+    the content read during it, so every artifact is rendered without reading files
+    again. scan() can be called again to pick up changes. Close the session (or use
+    it as a context manager) to release the content cache.
+
+    Args:
+        repo_path: Repository to map
+        config: Configuration module or object with the constants of config.py;
+            loaded with get_config() (custom_config.py if present) when not given
+        include_git_info: Fill in the last commit of every file (needs git)
+        jobs: Worker threads for per-file metadata extraction during the scan
+        manifest_path: Keep a scan manifest at this path and only re-read files that
+            changed since it was written (--incremental)
+        excluded_folders: Directory names or relative paths never entered; defaults
+            to EXCLUDE_ENTIRELY_FOLDERS
+        keep_listings: Keep the listing of every walked directory (for scan_state())
+        verbose: Print the command line's progress messages to stdout
+
+    Raises:
+        MapperError: repo_path is not a directory
+    """
+
+    def __init__(
+        self,
+        repo_path: Union[str, Path],
+        config=None,
+        include_git_info: bool = False,
+        jobs: int = 1,
+        manifest_path: Optional[Path] = None,
+        excluded_folders: Optional[Iterable[str]] = None,
+        keep_listings: bool = False,
+        verbose: bool = False
+    ):
+        self.repo_root_path = Path(repo_path).resolve()
+        if not self.repo_root_path.is_dir():
+            raise MapperError(f"{self.repo_root_path} is not a valid directory")
+        self.repo_name = self.repo_root_path.name
+        self.config = config if config is not None else get_config(announce=False)
+        self.include_git_info = include_git_info and GIT_UTILS_AVAILABLE
+        self.jobs = max(1, jobs)
+        self.manifest_path = manifest_path
+        self.excluded_folders = frozenset(
+            excluded_folders if excluded_folders is not None else self.config.EXCLUDE_ENTIRELY_FOLDERS
+        )
+        self.verbose = verbose
+        self.gitignore_matcher: Optional[GitignoreMatcher] = None
+        self.content_cache = FileContentCache.from_config(self.config)
+        self.scan_manifest: Optional[ScanManifest] = None
+        self.listings: Optional[Dict[str, DirectoryListing]] = {} if keep_listings else None
+        self._file_records: Optional[Tuple[FileRecord, ...]] = None
+        self._tree_index: Optional[TreeIndex] = None
+
+    def __enter__(self) -> "RepoMapper":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Releases the cached file content. The scan results stay available."""
+        self.content_cache.close()
+
+    def scan(self) -> Tuple[FileRecord, ...]:
+        """
+        Walks the repository and returns a FileRecord per file, in walk order.
+        Ignore rules are compiled afresh and content cached by an earlier scan is dropped.
+        Raises MapperError if the repository is no longer a directory.
+        """
+        profiler = get_profiler()
+        # Compile root .gitignore and .git/info/exclude (nested .gitignore files are added during the walk)
+        with profiler.phase("ignore_rules"):
+            self.gitignore_matcher = GitignoreMatcher(self.repo_root_path)
+        self.content_cache.close()
+        if self.manifest_path is not None:
+            self.scan_manifest = ScanManifest.load(
+                Path(self.manifest_path), self.repo_root_path, manifest_settings(self.config)
+            )
+        if self.listings is not None:
+            self.listings.clear()
+
+        with profiler.phase("scan"):
+            file_records = _collect_all_file_info(
+                self.config, self.repo_root_path, self.gitignore_matcher, self.include_git_info,
+                self.content_cache, self.jobs, self.scan_manifest, self.excluded_folders, self.listings
+            )
+        if self.scan_manifest is not None:
+            profiler.count("manifest_reused_files", self.scan_manifest.reused_count)
+            with profiler.phase("manifest_save"):
+                self.scan_manifest.save()
+
+        # Generators and worker processes share the index's own record tuple
+        with profiler.phase("tree_index"):
+            self._tree_index = TreeIndex(file_records)
+        self._file_records = self._tree_index.records
+        return self._file_records
+
+    @property
+    def file_records(self) -> Tuple[FileRecord, ...]:
+        """Records of the last scan; scans first if there was none."""
+        if self._file_records is None:
+            self.scan()
+        return self._file_records
+
+    @property
+    def tree_index(self) -> TreeIndex:
+        """Directory tree of the last scan; scans first if there was none."""
+        if self._tree_index is None:
+            self.scan()
+        return self._tree_index
+
+    def collect_file(self, absolute_path: str, relative_path_posix: str, stat_result: Optional[os.stat_result]) -> FileRecord:
+        """Collects the record of one file the way scan() does (without git info)."""
+        return _collect_file_info(
+            self.config, str(self.repo_root_path), absolute_path, relative_path_posix, self.content_cache,
+            None, stat_result
+        )
+
+    def scan_state(self) -> "ScanState":
+        """Scan state that can be updated from file changes (watch mode). Needs keep_listings=True."""
+        if self.listings is None:
+            raise ValueError("scan_state() needs a RepoMapper created with keep_listings=True")
+        from .utils.scan_state import ScanState
+        return ScanState(
+            self.repo_root_path, self.excluded_folders, self.collect_file, self.content_cache,
+            list(self.file_records), self.listings, self.gitignore_matcher
+        )
+
+    def render(
+        self,
+        artifact: str,
+        target: Union[Path, TextIO],
+        report_target: Optional[Union[Path, TextIO]] = None,
+        compact_json: bool = False,
+        html_lazy: bool = False,
+        selective_shards: Optional[str] = None
+    ) -> None:
+        """
+        Renders one artifact of the last scan (scanning first if needed) to target,
+        a file path (compressed if it ends in .gz, .zst or .xz) or an open text stream.
+
+        Args:
+            artifact: One of ARTIFACTS
+            target: Where to write the artifact; for "selective", the JSON map (None to skip it)
+            report_target: For "selective", where to write the CSV scan report (None to skip it)
+            compact_json: Write JSON without indentation or line breaks
+            html_lazy: For "html", store file content in sidecar chunks next to target (a path)
+            selective_shards: For "selective", one of SELECTIVE_SHARD_MODES to split the map into
+                shards in `<name>_shards/` next to target (a path), which gets their index
+        """
+        task = self._generator_task(artifact, target, report_target, compact_json, html_lazy, selective_shards)
+        shared = {
+            Shared.FILE_RECORDS: self.file_records,
+            Shared.CONFIG: self.config,
+            Shared.CONTENT_CACHE: self.content_cache,
+            Shared.TREE_INDEX: self.tree_index,
+        }
+        args = [shared[arg] if isinstance(arg, Shared) else arg for arg in task.args]
+        kwargs = {key: shared[value] if isinstance(value, Shared) else value for key, value in task.kwargs.items()}
+        with get_profiler().phase(f"generator.{task.name}"):
+            task.function(*args, **kwargs)
+
+    def generator_tasks(
+        self,
+        output_dir: Path,
+        artifacts: Iterable[str] = ARTIFACTS,
+        write_dir: Optional[Path] = None,
+        compression: Optional[str] = None,
+        compact_json: bool = False,
+        html_lazy: bool = False,
+        selective_shards: Optional[str] = None
+    ) -> List[GeneratorTask]:
+        """
+        Returns the generator tasks that write artifacts as {repo_name}-* files. Outputs are
+        written to write_dir (default: output_dir); messages name their final place in output_dir.
+        compression ("gzip", "zstd", "xz" or None) adds its suffix to every output file name.
+        selective_shards (one of SELECTIVE_SHARD_MODES) writes the selective map as shards in
+        {repo_name}-selective_map_shards/ with their index in {repo_name}-selective_map.json.
+        """
+        artifacts = set(artifacts)
+        unknown = artifacts.difference(ARTIFACTS)
+        if unknown:
+            raise ValueError(f"Unknown artifacts: {', '.join(sorted(unknown))}. Choose from: {', '.join(ARTIFACTS)}")
+        write_dir = write_dir or output_dir
+        repo_name = self.repo_name
+        tasks = []
+        if "html" in artifacts:
+            html_output_path = compressed_path(write_dir / f"{repo_name}-mapper.html", compression)
+            outputs = (html_output_path,)
+            if html_lazy:
+                # Sidecar content first, so the new HTML never points at chunks that are not in place yet
+                outputs = (write_dir / f"{repo_name}-mapper_content", html_output_path)
+            tasks.append(self._generator_task("html", html_output_path, html_lazy=html_lazy)._replace(
+                done_messages=(f"  HTML map saved to: {output_dir / html_output_path.name}",),
+                outputs=outputs
+            ))
+        if "json_structure" in artifacts:
+            json_output_path = compressed_path(write_dir / f"{repo_name}-structure.json", compression)
+            tasks.append(self._generator_task("json_structure", json_output_path, compact_json=compact_json)._replace(
+                done_messages=(f"  JSON structure saved to: {output_dir / json_output_path.name}",),
+                outputs=(json_output_path,)
+            ))
+        if "text_tree" in artifacts:
+            tree_output_path = compressed_path(write_dir / f"{repo_name}-structure.txt", compression)
+            tasks.append(self._generator_task("text_tree", tree_output_path)._replace(
+                done_messages=(f"  Text tree saved to: {output_dir / tree_output_path.name}",),
+                outputs=(tree_output_path,)
+            ))
+        if "selective" in artifacts:
+            json_map_path = compressed_path(write_dir / f"{repo_name}-selective_map.json", compression)
+            csv_report_path = compressed_path(write_dir / f"{repo_name}-scan_report.csv", compression)
+            task = self._generator_task(
+                "selective", json_map_path, csv_report_path, compact_json, selective_shards=selective_shards
+            )
+            if selective_shards:
+                # Shards first, so the new index never lists shards that are not in place yet
+                shard_dir = write_dir / f"{repo_name}-selective_map_shards"
+                tasks.append(task._replace(
+                    done_messages=(
+                        f"  Selective map index saved to: {output_dir / json_map_path.name}"
+                        f" (shards in {output_dir / shard_dir.name})",
+                        f"  Scan report saved to: {output_dir / csv_report_path.name}"
+                    ),
+                    outputs=(shard_dir, json_map_path, csv_report_path)
+                ))
+            else:
+                tasks.append(task._replace(
+                    done_messages=(
+                        f"  Selective map saved to: {output_dir / json_map_path.name}",
+                        f"  Scan report saved to: {output_dir / csv_report_path.name}"
+                    ),
+                    outputs=(json_map_path, csv_report_path)
+                ))
+        if not self.verbose:
+            tasks = [task._replace(start_message="", done_messages=()) for task in tasks]
+        return tasks
+
+    def write(
+        self,
+        output_dir: Union[str, Path],
+        artifacts: Iterable[str] = ARTIFACTS,
+        compression: Optional[str] = None,
+        compact_json: bool = False,
+        html_lazy: bool = False,
+        parallel: Optional[str] = None,
+        selective_shards: Optional[str] = None
+    ) -> List[GeneratorOutcome]:
+        """
+        Writes artifacts of the last scan (scanning first if needed) into output_dir,
+        named {repo_name}-* like the command line does. parallel is a GENERATOR_MODES
+        value to run the generators concurrently. Returns the outcome of every generator;
+        a failed generator does not stop the others.
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        tasks = self.generator_tasks(
+            output_dir, artifacts, None, compression, compact_json, html_lazy, selective_shards
+        )
+        return run_generators(tasks, self.file_records, self.config, self.content_cache, parallel, self.tree_index)
+
+    def _generator_task(
+        self,
+        artifact: str,
+        target: Union[Path, TextIO],
+        report_target: Optional[Union[Path, TextIO]] = None,
+        compact_json: bool = False,
+        html_lazy: bool = False,
+        selective_shards: Optional[str] = None
+    ) -> GeneratorTask:
+        repo_root_path = self.repo_root_path
+        repo_name = self.repo_name
+        if artifact == "html":
+            from .generators.html_generator import generate_html_map
+            return GeneratorTask(
+                "html", generate_html_map,
+                (Shared.FILE_RECORDS, repo_root_path, repo_name, target, Shared.CONFIG, Shared.CONTENT_CACHE),
+                {'lazy_content': html_lazy, 'tree_index': Shared.TREE_INDEX},
+                # Reads through the scan's content cache, so it stays in this process
+                start_message="Generating HTML map..."
+            )
+        if artifact == "json_structure":
+            from .generators.json_structure_generator import generate_json_structure
+            return GeneratorTask(
+                "json_structure", generate_json_structure,
+                (Shared.FILE_RECORDS, repo_root_path, repo_name, target, Shared.CONFIG),
+                {'tree_index': Shared.TREE_INDEX, 'compact_json': compact_json},
+                start_message="Generating JSON structure..."
+            )
+        if artifact == "text_tree":
+            from .generators.text_tree_generator import generate_text_tree
+            return GeneratorTask(
+                "text_tree", generate_text_tree,
+                (Shared.FILE_RECORDS, repo_root_path, repo_name, target, Shared.CONFIG),
+                {'tree_index': Shared.TREE_INDEX},
+                start_message="Generating text tree..."
+            )
+        if artifact == "selective":
+            # Reads through the scan's content cache, so it stays in this process
+            from .generators.selective_content_generator import generate_selective_map_and_report
+            return GeneratorTask(
+                "selective", generate_selective_map_and_report,
+                (Shared.FILE_RECORDS, repo_root_path, repo_name, target, report_target, Shared.CONFIG,
+                 self.include_git_info, Shared.CONTENT_CACHE),
+                {'tree_index': Shared.TREE_INDEX, 'compact_json': compact_json, 'verbose': self.verbose,
+                 'shard_by': selective_shards},
+                start_message="Generating selective map and scan report..."
+            )
+        raise ValueError(f"Unknown artifact '{artifact}'. Choose from: {', '.join(ARTIFACTS)}")
@@ -1,28 +1,88 @@
 # src_mapper/utils/__init__.py
 
-from .file_utils import (
-    read_file_content,
-    count_lines,
-    get_file_timestamps,
-    get_file_extension,
-    truncate_content_by_lines
-)
-from .ignore_utils import (
-    load_gitignore_patterns,
-    should_ignore_by_gitignore,
-    is_excluded_entirely
-)
-# from .git_utils import is_git_repository, get_last_commit_info # Uncomment when implemented
-
-__all__ = [
-    "read_file_content",
-    "count_lines",
-    "get_file_timestamps",
-    "get_file_extension",
-    "truncate_content_by_lines",
-    "load_gitignore_patterns",
-    "should_ignore_by_gitignore",
-    "is_excluded_entirely",
-    # "is_git_repository", # Uncomment when implemented
-    # "get_last_commit_info", # Uncomment when implemented
-]
\ No newline at end of file
+"""
+Helpers shared by the scan and the generators.
+
+Each name is imported from its module the first time it is used, so a run only
+loads what it needs (e.g. no inotify or compression modules for a plain scan).
+"""
+
+import importlib
+
+# Exported name -> module of this package that defines it
+_EXPORTS = {
+    "read_file_content": "file_utils",
+    "read_file_content_with_encoding": "file_utils",
+    "read_file_content_with_sha256": "file_utils",
+    "count_lines": "file_utils",
+    "count_non_empty_lines": "file_utils",
+    "sha256_of_file": "file_utils",
+    "get_file_timestamps": "file_utils",
+    "format_file_timestamps": "file_utils",
+    "format_timestamp": "file_utils",
+    "get_file_extension": "file_utils",
+    "truncate_content_by_lines": "file_utils",
+    "load_gitignore_patterns": "ignore_utils",
+    "should_ignore_by_gitignore": "ignore_utils",
+    "is_excluded_entirely": "ignore_utils",
+    "GitignoreMatcher": "ignore_utils",
+    "FileClassification": "file_classifier",
+    "FileClassifier": "file_classifier",
+    "get_default_classifier": "file_classifier",
+    "count_lines_streaming": "line_counter",
+    "StreamedLineCount": "line_counter",
+    "read_head_lines": "mapped_content",
+    "ContentRules": "content_rules",
+    "RuleMatch": "content_rules",
+    "FileRecord": "file_record",
+    "dedup_digest": "file_record",
+    "TreeIndex": "tree_index",
+    "TreeNode": "tree_index",
+    "FileContentCache": "content_cache",
+    "ScanManifest": "scan_manifest",
+    "manifest_settings": "scan_manifest",
+    "Profiler": "profiler",
+    "get_profiler": "profiler",
+    "set_profiler": "profiler",
+    "walk_repository": "walker",
+    "list_directory": "walker",
+    "DirectoryListing": "walker",
+    "WALKERS": "walker",
+    "Changes": "change_watcher",
+    "InotifyWatcher": "change_watcher",
+    "PollingWatcher": "change_watcher",
+    "create_watcher": "change_watcher",
+    "WATCH_BACKENDS": "change_watcher",
+    "ScanState": "scan_state",
+    "ScanUpdate": "scan_state",
+    "open_output_file": "output_files",
+    "output_stream": "output_files",
+    "is_stream": "output_files",
+    "open_artifact": "output_files",
+    "find_artifact": "output_files",
+    "compressed_path": "output_files",
+    "uncompressed_path": "output_files",
+    "resolve_compression": "output_files",
+    "COMPRESSION_CHOICES": "output_files",
+    "estimate_tokens_fast": "token_utils",
+    "estimate_tokens_from_bytes": "token_utils",
+    "get_token_estimator": "token_utils",
+    "is_git_repository": "git_utils",
+    "get_last_commit_info": "git_utils",
+    "get_last_commit_info_bulk": "git_utils",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,267 @@
+# src_mapper/utils/change_watcher.py
+
+"""
+File change notification for watch mode, without third-party packages.
+
+InotifyWatcher uses the Linux inotify API through ctypes: one watch per walked
+directory, and events are read from a single file descriptor. PollingWatcher
+works everywhere: at every interval it stats the walked directories (their
+mtime changes when entries are added, removed or renamed) and the known files,
+and compares the results with what the last scan recorded.
+
+Both report changed paths relative to the repository root. A path can be a file
+or a directory; the caller re-lists or re-reads whatever it refers to.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Set
+
+from .file_classifier import StatSignature, stat_signature
+from .walker import DirectoryListing
+
+WATCH_BACKENDS = ("auto", "inotify", "poll")
+
+
+class Changes:
+    """Paths reported changed since the last wait, or a request to rescan everything."""
+
+    __slots__ = ('paths', 'rescan')
+
+    def __init__(self, paths: Optional[Set[str]] = None, rescan: bool = False):
+        self.paths: Set[str] = paths if paths is not None else set()
+        self.rescan = rescan # Events were lost; the tree must be walked again
+
+    def merge(self, other: "Changes") -> None:
+        self.paths |= other.paths
+        self.rescan = self.rescan or other.rescan
+
+    def __bool__(self) -> bool:
+        return bool(self.paths) or self.rescan
+
+
+class PollingWatcher:
+    """
+    Detects changes by comparing stats with the scan state every poll_interval seconds.
+
+    Args:
+        repo_root_path: Repository root
+        listings: Walked directories with their mtimes, as kept up to date by the caller
+        signatures: Stat signatures of the known files, as kept up to date by the caller
+        poll_interval: Seconds between polls
+    """
+
+    backend = "poll"
+
+    def __init__(
+        self,
+        repo_root_path: Path,
+        listings: Mapping[str, DirectoryListing],
+        signatures: Mapping[str, Optional[StatSignature]],
+        poll_interval: float
+    ):
+        self._repo_root = str(repo_root_path)
+        self._listings = listings
+        self._signatures = signatures
+        self._poll_interval = poll_interval
+        self._next_poll = time.monotonic() + poll_interval
+
+    def watch_directory(self, relative_dir_posix: str) -> None:
+        pass # Every directory in listings is polled
+
+    def unwatch_directory(self, relative_dir_posix: str) -> None:
+        pass
+
+    def wait(self, timeout: Optional[float]) -> Changes:
+        """Waits for the next poll (at most timeout seconds, None for no limit) and returns what changed."""
+        while True:
+            now = time.monotonic()
+            if timeout is not None and self._next_poll - now > timeout:
+                time.sleep(max(0.0, timeout))
+                return Changes()
+            time.sleep(max(0.0, self._next_poll - now))
+            changes = self._poll()
+            self._next_poll = time.monotonic() + self._poll_interval
+            if changes or timeout is not None:
+                return changes
+
+    def close(self) -> None:
+        pass
+
+    def _poll(self) -> Changes:
+        changed = set()
+        for relative_dir_posix, listing in list(self._listings.items()):
+            try:
+                if os.stat(os.path.join(self._repo_root, relative_dir_posix)).st_mtime_ns != listing.mtime_ns:
+                    changed.add(relative_dir_posix)
+            except OSError:
+                changed.add(relative_dir_posix) # Removed; its parent is re-listed
+        for relative_path_posix, signature in list(self._signatures.items()):
+            try:
+                current = stat_signature(os.stat(os.path.join(self._repo_root, relative_path_posix)))
+            except OSError:
+                current = None
+            if current != signature:
+                changed.add(relative_path_posix)
+        return Changes(changed)
+
+
+# inotify constants from <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_EXCL_UNLINK = 0x04000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+_WATCH_MASK = (
+    _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+    | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR | _IN_EXCL_UNLINK
+)
+_EVENT_HEADER = struct.Struct('iIII') # wd, mask, cookie, len
+_READ_SIZE = 64 * 1024
+
+
+def _load_inotify():
+    """Returns libc if it provides inotify, otherwise None."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyWatcher:
+    """
+    Linux inotify watcher with one watch per directory.
+
+    Raises OSError if inotify cannot be set up; watch_directory raises OSError when
+    the per-user watch limit (fs.inotify.max_user_watches) is reached.
+    """
+
+    backend = "inotify"
+
+    def __init__(self, repo_root_path: Path):
+        self._libc = _load_inotify()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1 failed: {os.strerror(error)}")
+        self._repo_root = str(repo_root_path)
+        self._dir_by_wd: Dict[int, str] = {}
+        self._wd_by_dir: Dict[str, int] = {}
+
+    def watch_directory(self, relative_dir_posix: str) -> None:
+        if relative_dir_posix in self._wd_by_dir:
+            return
+        path = os.path.join(self._repo_root, relative_dir_posix) if relative_dir_posix else self._repo_root
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                return # Already gone; its parent's event reports it
+            raise OSError(error, f"Cannot watch {path}: {os.strerror(error)}")
+        self._dir_by_wd[wd] = relative_dir_posix
+        self._wd_by_dir[relative_dir_posix] = wd
+
+    def unwatch_directory(self, relative_dir_posix: str) -> None:
+        wd = self._wd_by_dir.pop(relative_dir_posix, None)
+        if wd is not None:
+            self._dir_by_wd.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd) # Fails harmlessly if the directory is gone
+
+    def wait(self, timeout: Optional[float]) -> Changes:
+        """Waits up to timeout seconds (None for no limit) for events and returns what changed."""
+        changes = Changes()
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        while readable:
+            try:
+                data = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            self._parse(data, changes)
+            readable, _, _ = select.select([self._fd], [], [], 0)
+        return changes
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _parse(self, data: bytes, changes: Changes) -> None:
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b'\0')
+            offset += name_length
+
+            if mask & _IN_Q_OVERFLOW:
+                changes.rescan = True
+                continue
+            relative_dir_posix = self._dir_by_wd.get(wd)
+            if relative_dir_posix is None:
+                continue # Watch already removed
+            if mask & _IN_IGNORED:
+                # The directory is gone; its watch was removed by the kernel
+                del self._dir_by_wd[wd]
+                self._wd_by_dir.pop(relative_dir_posix, None)
+                continue
+            if name:
+                name_posix = os.fsdecode(name)
+                changes.paths.add(f"{relative_dir_posix}/{name_posix}" if relative_dir_posix else name_posix)
+            else:
+                changes.paths.add(relative_dir_posix) # Event on the directory itself
+
+
+def create_watcher(
+    backend: str,
+    repo_root_path: Path,
+    listings: Mapping[str, DirectoryListing],
+    signatures: Mapping[str, Optional[StatSignature]],
+    poll_interval: float
+):
+    """
+    Returns an InotifyWatcher or a PollingWatcher for backend ("auto", "inotify" or
+    "poll") and starts watching every directory in listings. Falls back to polling
+    with a warning when inotify is unavailable or runs out of watches.
+    """
+    if backend not in WATCH_BACKENDS:
+        print(f"Warning: Unknown WATCH_BACKEND '{backend}', using 'auto'.", file=sys.stderr)
+        backend = "auto"
+    if backend != "poll":
+        watcher = None
+        try:
+            watcher = InotifyWatcher(repo_root_path)
+            for relative_dir_posix in listings:
+                watcher.watch_directory(relative_dir_posix)
+            return watcher
+        except OSError as e:
+            if watcher is not None:
+                watcher.close()
+            if backend == "inotify" or e.errno != errno.ENOSYS:
+                print(f"Warning: inotify unavailable ({e}). Falling back to polling.", file=sys.stderr)
+    return PollingWatcher(repo_root_path, listings, signatures, poll_interval)
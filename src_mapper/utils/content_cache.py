@@ -0,0 +1,243 @@
+# src_mapper/utils/content_cache.py
+
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .file_classifier import FileClassifier
+from .file_utils import read_file_content_with_encoding, read_file_content_with_sha256
+from .profiler import get_profiler
+
+# Same shape as the read_file_content return value
+ContentResult = Tuple[Optional[str], bool, Optional[str]]
+
+# Invalidated bytes in the spill file above which (and above the live bytes) it is rewritten
+_SPILL_COMPACT_MIN_BYTES = 16 * 1024 * 1024
+
+
+class FileContentCache:
+    """
+    Per-run store of decoded file content shared by the scan and all generators.
+
+    Each file is read at most once per run; classifier decides binary/text and the
+    encoding from the file's head sample, so text is decoded exactly once.
+    Decoded text is kept in memory up to a byte budget, counted as the memory the
+    strings take (up to 4 bytes per character for non-ASCII text); least recently
+    used entries beyond the budget are spilled to a temporary file as UTF-8 (or
+    dropped if spilling is disabled, in which case they are re-read on demand).
+    Binary/error verdicts are tiny and always kept in memory. Content invalidated
+    while spilled is dropped from the spill file once it outweighs the live content,
+    so a long --watch session does not grow the file without bound.
+    Safe to share between scan worker threads; file reads happen outside the lock.
+    """
+
+    def __init__(
+        self,
+        encodings: List[str],
+        max_memory_bytes: int,
+        spill_to_disk: bool = True,
+        classifier: Optional[FileClassifier] = None
+    ):
+        self._encodings = encodings
+        self.classifier = classifier if classifier is not None else FileClassifier(encodings)
+        self._max_memory_bytes = max_memory_bytes
+        self._spill_to_disk = spill_to_disk
+
+        self._entries: "OrderedDict[str, str]" = OrderedDict() # key -> decoded content
+        self._memory_bytes = 0
+        self._verdicts: Dict[str, ContentResult] = {} # key -> (None, True, error_msg)
+        self._spilled: Dict[str, Tuple[int, int]] = {} # key -> (offset, length) in spill file
+        self._spilled_bytes = 0 # Live bytes in the spill file
+        self._spill_dead_bytes = 0 # Bytes of invalidated entries still in the spill file
+        self._decoded_with: Dict[str, str] = {} # key -> encoding that decoded the file
+        self._digests: Dict[str, str] = {} # key -> SHA-256 of the raw bytes, if hashed when read
+        self._spill_file = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config_module) -> "FileContentCache":
+        """Creates a cache (and its classifier) with the settings of config_module."""
+        return cls(
+            config_module.ENCODINGS_TO_TRY,
+            getattr(config_module, 'CONTENT_CACHE_MAX_MB', 256) * 1024 * 1024,
+            getattr(config_module, 'CONTENT_CACHE_SPILL_TO_DISK', True),
+            FileClassifier(
+                config_module.ENCODINGS_TO_TRY,
+                getattr(config_module, 'CLASSIFIER_SAMPLE_BYTES', 8192),
+                getattr(config_module, 'BINARY_CONTROL_CHAR_RATIO', 0.3)
+            )
+        )
+
+    def get(self, file_path: Path) -> ContentResult:
+        """Returns (content_string_or_none, is_binary_or_unreadable_error, error_message_or_none) for file_path."""
+        return self._get(file_path, False)[0]
+
+    def get_with_sha256(self, file_path: Path) -> Tuple[ContentResult, Optional[str]]:
+        """
+        Same as get, additionally returning the SHA-256 of the raw bytes of a text file.
+        The digest is computed from the bytes read and kept with the content, so a cache
+        hit returns it without reading the file again. It is None for binary and
+        unreadable files, and for files that were read by get() before.
+        """
+        return self._get(file_path, True)
+
+    def _get(self, file_path: Path, compute_sha256: bool) -> Tuple[ContentResult, Optional[str]]:
+        key = str(file_path)
+        profiler = get_profiler()
+
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                profiler.count("content_cache_hits")
+                return (content, False, None), self._digests.get(key)
+
+            verdict = self._verdicts.get(key)
+            if verdict is not None:
+                profiler.count("content_cache_hits")
+                return verdict, None
+
+            if key in self._spilled:
+                content = self._read_spilled(key)
+                if content is not None:
+                    profiler.count("content_cache_spill_reads")
+                    return (content, False, None), self._digests.get(key)
+                # Spill file unreadable: fall through and re-read from disk
+
+        profiler.count("content_cache_misses")
+        if compute_sha256:
+            content, is_binary, error_msg, encoding, sha256 = read_file_content_with_sha256(
+                file_path, self._encodings, self.classifier
+            )
+        else:
+            content, is_binary, error_msg, encoding = read_file_content_with_encoding(
+                file_path, self._encodings, self.classifier
+            )
+            sha256 = None
+        result = (content, is_binary, error_msg)
+        with self._lock:
+            if encoding is not None:
+                self._decoded_with[key] = encoding
+            if sha256 is not None:
+                self._digests[key] = sha256
+            self._store(key, result)
+        return result, sha256
+
+    def encoding_of(self, file_path: Path) -> Optional[str]:
+        """Returns the encoding that decoded file_path, if it has been read as text."""
+        with self._lock:
+            return self._decoded_with.get(str(file_path))
+
+    def seed_binary(self, file_path: Path, error_msg: Optional[str]) -> None:
+        """Records a binary/unreadable verdict known from a previous run, so the file is not probed again."""
+        with self._lock:
+            self._verdicts.setdefault(str(file_path), (None, True, error_msg))
+
+    def invalidate(self, file_path: Path) -> None:
+        """Forgets everything cached for file_path, so it is read again on the next get()."""
+        key = str(file_path)
+        with self._lock:
+            content = self._entries.pop(key, None)
+            if content is not None:
+                self._memory_bytes -= sys.getsizeof(content)
+            self._verdicts.pop(key, None)
+            self._forget_spilled(key)
+            self._decoded_with.pop(key, None)
+            self._digests.pop(key, None)
+
+    def close(self) -> None:
+        """Releases cached content and removes the spill file."""
+        with self._lock:
+            self._entries.clear()
+            self._verdicts.clear()
+            self._spilled.clear()
+            self._spilled_bytes = 0
+            self._spill_dead_bytes = 0
+            self._decoded_with.clear()
+            self._digests.clear()
+            self._memory_bytes = 0
+            if self._spill_file is not None:
+                try:
+                    self._spill_file.close()
+                except Exception:
+                    pass
+                self._spill_file = None
+
+    def _store(self, key: str, result: ContentResult) -> None:
+        content, is_binary, _ = result
+        if key in self._entries or key in self._verdicts:
+            return # Another thread read the same file concurrently
+        if is_binary or content is None:
+            self._verdicts[key] = result
+            return
+
+        self._entries[key] = content
+        self._memory_bytes += sys.getsizeof(content)
+
+        # Evict least recently used entries until we are back within budget
+        while self._memory_bytes > self._max_memory_bytes and self._entries:
+            evicted_key, evicted_content = self._entries.popitem(last=False)
+            self._memory_bytes -= sys.getsizeof(evicted_content)
+            if self._spill_to_disk:
+                self._spill(evicted_key, evicted_content)
+
+    def _spill(self, key: str, content: str) -> None:
+        try:
+            if self._spill_file is None:
+                self._spill_file = tempfile.TemporaryFile(prefix="repo-mapper-content-")
+            data = content.encode('utf-8')
+            self._spill_file.seek(0, 2) # Append at end
+            offset = self._spill_file.tell()
+            self._spill_file.write(data)
+            self._spilled[key] = (offset, len(data))
+            self._spilled_bytes += len(data)
+            get_profiler().count("content_cache_spills")
+        except Exception as e:
+            # Spilling is an optimization; the file will simply be re-read from disk
+            print(f"Warning: Could not spill cached content to disk: {e}", file=sys.stderr)
+            self._spill_to_disk = False
+
+    def _read_spilled(self, key: str) -> Optional[str]:
+        offset, length = self._spilled[key]
+        try:
+            self._spill_file.seek(offset)
+            return self._spill_file.read(length).decode('utf-8')
+        except Exception:
+            self._forget_spilled(key)
+            return None
+
+    def _forget_spilled(self, key: str) -> None:
+        """Drops key's spilled entry; the spill file is compacted once enough of it is dead."""
+        location = self._spilled.pop(key, None)
+        if location is None:
+            return
+        self._spilled_bytes -= location[1]
+        self._spill_dead_bytes += location[1]
+        if self._spill_dead_bytes >= _SPILL_COMPACT_MIN_BYTES and self._spill_dead_bytes > self._spilled_bytes:
+            self._compact_spill_file()
+
+    def _compact_spill_file(self) -> None:
+        """Copies the live spilled entries to a new spill file and removes the old one."""
+        new_file = None
+        try:
+            new_file = tempfile.TemporaryFile(prefix="repo-mapper-content-")
+            spilled: Dict[str, Tuple[int, int]] = {}
+            for key, (offset, length) in self._spilled.items():
+                self._spill_file.seek(offset)
+                data = self._spill_file.read(length)
+                spilled[key] = (new_file.tell(), len(data))
+                new_file.write(data)
+        except Exception as e:
+            # Keep using the old file; compaction is retried after the next invalidation
+            print(f"Warning: Could not compact the content spill file: {e}", file=sys.stderr)
+            if new_file is not None:
+                new_file.close()
+            return
+        self._spill_file.close()
+        self._spill_file = new_file
+        self._spilled = spilled
+        self._spill_dead_bytes = 0
+        get_profiler().count("content_cache_spill_compactions")
@@ -0,0 +1,184 @@
+# src_mapper/utils/content_rules.py
+
+"""
+The selective map's content rules (BINARY_FILE_EXTENSIONS, EXCLUDE_CONTENT_FILE_EXTENSIONS,
+ALWAYS_INCLUDE_CONTENT_PATTERNS, INCLUDE_CONTENT_IN_FOLDERS_PATTERNS), compiled once so a
+file is classified with a few lookups instead of a loop over every rule.
+
+Extensions are looked up in frozensets. Filename patterns without wildcards go into a
+dict and the rest into one combined regex; folder patterns into a character trie. When
+several patterns of a list match, the first one in the list wins, as with the loops
+this replaces.
+"""
+
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+_WILDCARD_CHARS = frozenset('*?[')
+_END = None # Trie key marking the end of a folder pattern; its value is the pattern's index
+
+
+class RuleMatch(NamedTuple):
+    decision: str # "binary", "excluded", "pattern", "folder" or "other"
+    rule: Optional[str] # The extension, filename pattern or folder pattern that decided it (None for "other")
+
+
+def _translate_fnmatch(pattern: str) -> str:
+    """
+    Translates a shell pattern into a regex fragment that matches what fnmatch.fnmatchcase
+    does (without the capturing groups fnmatch.translate uses on some Python versions,
+    which could not be combined into one regex).
+    """
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == '*':
+            if not parts or parts[-1] != '.*': # Consecutive stars match the same as one
+                parts.append('.*')
+        elif c == '?':
+            parts.append('.')
+        elif c == '[':
+            j = i
+            if j < n and pattern[j] == '!':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                parts.append('\\[') # No closing bracket: a literal '['
+            else:
+                if '-' not in pattern[i:j]:
+                    stuff = pattern[i:j].replace('\\', '\\\\')
+                else:
+                    # Split into range chunks and drop empty ranges ('z-a'), which are invalid in a regex
+                    chunks = []
+                    k = i + 2 if pattern[i] == '!' else i + 1
+                    while True:
+                        k = pattern.find('-', k, j)
+                        if k < 0:
+                            break
+                        chunks.append(pattern[i:k])
+                        i = k + 1
+                        k = k + 3
+                    chunk = pattern[i:j]
+                    if chunk:
+                        chunks.append(chunk)
+                    else:
+                        chunks[-1] += '-'
+                    for k in range(len(chunks) - 1, 0, -1):
+                        if chunks[k - 1][-1] > chunks[k][0]:
+                            chunks[k - 1] = chunks[k - 1][:-1] + chunks[k][1:]
+                            del chunks[k]
+                    stuff = '-'.join(chunk.replace('\\', '\\\\').replace('-', '\\-') for chunk in chunks)
+                stuff = re.sub(r'([&~|])', r'\\\1', stuff) # Not set operations
+                i = j + 1
+                if not stuff:
+                    parts.append('(?!)') # Empty set: never matches
+                elif stuff == '!':
+                    parts.append('.')
+                else:
+                    if stuff[0] == '!':
+                        stuff = '^' + stuff[1:]
+                    elif stuff[0] in ('^', '['):
+                        stuff = '\\' + stuff
+                    parts.append(f'[{stuff}]')
+        else:
+            parts.append(re.escape(c))
+    return ''.join(parts)
+
+
+class ContentRules:
+    """Compiled content rules of one configuration. Immutable, so it can be shared between threads."""
+
+    def __init__(
+        self,
+        binary_extensions: Iterable[str],
+        excluded_extensions: Iterable[str],
+        include_patterns: Iterable[str],
+        include_folders: Iterable[str]
+    ):
+        self._binary_extensions = frozenset(binary_extensions)
+        self._excluded_extensions = frozenset(excluded_extensions)
+
+        # Filename patterns are matched like fnmatch.fnmatch: case-insensitively where the OS is
+        self._patterns: List[str] = list(include_patterns)
+        self._literal_patterns: Dict[str, int] = {}
+        self._first_wildcard_index = -1
+        alternatives = []
+        for index, pattern in enumerate(self._patterns):
+            normalized = os.path.normcase(pattern)
+            if _WILDCARD_CHARS & set(normalized):
+                if self._first_wildcard_index < 0:
+                    self._first_wildcard_index = index
+                alternatives.append(f'(?P<r{index}>{_translate_fnmatch(normalized)})')
+            else:
+                self._literal_patterns.setdefault(normalized, index)
+        # In list order, so the first alternative that matches is the first matching pattern
+        self._pattern_regex = re.compile('|'.join(alternatives), re.DOTALL) if alternatives else None
+
+        self._folders: List[str] = list(include_folders)
+        self._folder_trie: Dict = {}
+        for index, folder in enumerate(self._folders):
+            node = self._folder_trie
+            for char in folder:
+                node = node.setdefault(char, {})
+            node.setdefault(_END, index)
+
+    @classmethod
+    def from_config(cls, config_module) -> "ContentRules":
+        """Compiles the content rules of config_module."""
+        return cls(
+            config_module.BINARY_FILE_EXTENSIONS,
+            config_module.EXCLUDE_CONTENT_FILE_EXTENSIONS,
+            config_module.ALWAYS_INCLUDE_CONTENT_PATTERNS,
+            config_module.INCLUDE_CONTENT_IN_FOLDERS_PATTERNS
+        )
+
+    def classify(self, filename: str, extension: str, relative_path_posix: str) -> RuleMatch:
+        """
+        Decides a file's content rule. Binary extensions come first; an excluded
+        extension is overridden by a matching filename pattern; then filename
+        patterns, then folder patterns.
+        """
+        extension = extension.lower()
+        if extension in self._binary_extensions:
+            return RuleMatch("binary", extension)
+        pattern = self.match_pattern(filename)
+        if pattern is not None:
+            return RuleMatch("pattern", pattern)
+        if extension in self._excluded_extensions:
+            return RuleMatch("excluded", extension)
+        folder = self.match_folder(relative_path_posix)
+        if folder is not None:
+            return RuleMatch("folder", folder)
+        return RuleMatch("other", None)
+
+    def match_pattern(self, filename: str) -> Optional[str]:
+        """Returns the first ALWAYS_INCLUDE_CONTENT_PATTERNS entry that filename matches, or None."""
+        filename = os.path.normcase(filename)
+        best = self._literal_patterns.get(filename, -1)
+        # A wildcard pattern can only win if it comes before the literal match
+        if self._pattern_regex is not None and (best < 0 or self._first_wildcard_index < best):
+            m = self._pattern_regex.fullmatch(filename)
+            if m is not None:
+                index = int(m.lastgroup[1:])
+                if best < 0 or index < best:
+                    best = index
+        return self._patterns[best] if best >= 0 else None
+
+    def match_folder(self, relative_path_posix: str) -> Optional[str]:
+        """Returns the first INCLUDE_CONTENT_IN_FOLDERS_PATTERNS entry that the path starts with, or None."""
+        node = self._folder_trie
+        best = node.get(_END, -1)
+        for char in relative_path_posix:
+            node = node.get(char)
+            if node is None:
+                break
+            index = node.get(_END, -1)
+            if index >= 0 and (best < 0 or index < best):
+                best = index
+        return self._folders[best] if best >= 0 else None
@@ -0,0 +1,229 @@
+# src_mapper/utils/file_classifier.py
+
+"""
+Binary/text classification from a single head sample.
+
+A file is classified once from the first SAMPLE bytes: known binary format
+signatures, null bytes, the share of control characters, and which of the
+configured encodings can decode the sample (the UTF-8 check is a strict
+incremental decode, so a sequence cut off at the end of the sample is fine).
+The verdict is cached per (device, inode, mtime, size), so a file that is read
+again in the same process is neither sampled nor probed again, and text is
+decoded with the known encoding straight from the bytes already read.
+"""
+
+import codecs
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .profiler import get_profiler
+
+DEFAULT_SAMPLE_BYTES: int = 8192
+DEFAULT_MAX_CONTROL_RATIO: float = 0.3
+
+NULL_BYTES_MESSAGE = "File appears to be binary (contains null bytes)."
+
+# Leading bytes of common binary formats that can start without a null byte
+_MAGIC_SIGNATURES: Tuple[Tuple[bytes, str], ...] = (
+    (b'\x89PNG\r\n\x1a\n', "PNG image"),
+    (b'\xff\xd8\xff', "JPEG image"),
+    (b'GIF87a', "GIF image"),
+    (b'GIF89a', "GIF image"),
+    (b'%PDF-', "PDF document"),
+    (b'PK\x03\x04', "ZIP archive"),
+    (b'PK\x05\x06', "ZIP archive"),
+    (b'\x1f\x8b', "gzip data"),
+    (b'\xfd7zXZ\x00', "xz data"),
+    (b'\x28\xb5\x2f\xfd', "zstd data"),
+    (b"7z\xbc\xaf\x27\x1c", "7z archive"),
+    (b'Rar!\x1a\x07', "RAR archive"),
+    (b'\x7fELF', "ELF executable"),
+    (b'\xca\xfe\xba\xbe', "Mach-O or Java class file"),
+    (b'\xcf\xfa\xed\xfe', "Mach-O executable"),
+    (b'\xce\xfa\xed\xfe', "Mach-O executable"),
+    (b'SQLite format 3\x00', "SQLite database"),
+    (b'OggS', "Ogg media"),
+    (b'fLaC', "FLAC audio"),
+    (b'ID3', "MP3 audio"),
+    (b'wOFF', "WOFF font"),
+    (b'wOF2', "WOFF2 font"),
+)
+
+# Signatures of printable ASCII alone ("ID3", "GIF89a", "%PDF-"...) also start ordinary text,
+# so they only decide the verdict when the sample shows other binary evidence
+_TEXT_LIKE_SIGNATURES = frozenset(
+    signature for signature, _ in _MAGIC_SIGNATURES if all(0x20 <= byte < 0x7f for byte in signature)
+)
+
+# Control characters that do not occur in text; tab, line breaks, form feed and ESC do
+_CONTROL_BYTES = bytes(range(0x01, 0x09)) + b'\x0e\x0f' + bytes(range(0x10, 0x1b)) + b'\x7f'
+
+# (st_dev, st_ino, st_mtime_ns, st_size)
+StatSignature = Tuple[int, int, int, int]
+
+
+class FileClassification(NamedTuple):
+    is_binary: bool
+    encoding: Optional[str] # First listed encoding that decodes the sample; None for binary files
+    error_msg: Optional[str] # Why the file counts as binary, as read_file_content reports it
+
+
+def stat_signature(stat_result: os.stat_result) -> StatSignature:
+    return (stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+
+
+class FileClassifier:
+    """
+    Classifies files as binary or text (with an encoding) and caches the verdicts.
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        encodings: List[str],
+        sample_bytes: int = DEFAULT_SAMPLE_BYTES,
+        max_control_ratio: float = DEFAULT_MAX_CONTROL_RATIO
+    ):
+        self.encodings = list(encodings)
+        self.sample_bytes = sample_bytes
+        self.max_control_ratio = max_control_ratio
+        self._verdicts: Dict[StatSignature, FileClassification] = {}
+        self._lock = threading.Lock()
+
+    def classify_sample(self, sample: bytes, is_complete: bool) -> FileClassification:
+        """
+        Classifies a file from its first bytes. is_complete tells whether the
+        sample is the whole file (a truncated multi-byte character at its end
+        then makes the encoding fail).
+        """
+        for signature, description in _MAGIC_SIGNATURES:
+            if sample.startswith(signature):
+                if signature in _TEXT_LIKE_SIGNATURES and not self._has_binary_evidence(sample, is_complete):
+                    break # Text that happens to start like the format
+                return FileClassification(True, None, f"File appears to be binary ({description} signature).")
+        if b'\x00' in sample:
+            return FileClassification(True, None, NULL_BYTES_MESSAGE)
+        if sample:
+            control_bytes = len(sample) - len(sample.translate(None, _CONTROL_BYTES))
+            if control_bytes / len(sample) > self.max_control_ratio:
+                return FileClassification(
+                    True, None,
+                    f"File appears to be binary ({control_bytes * 100 // len(sample)}% control characters)."
+                )
+
+        for encoding in self.encodings:
+            if _decodes(sample, encoding, is_complete):
+                return FileClassification(False, encoding, None)
+        return FileClassification(True, None, f"Failed to decode file with any of specified encodings: {self.encodings}")
+
+    def _has_binary_evidence(self, sample: bytes, is_complete: bool) -> bool:
+        """Whether sample has a null or control byte, or does not decode with the first encoding."""
+        if len(sample.translate(None, b'\x00' + _CONTROL_BYTES)) < len(sample):
+            return True
+        return bool(self.encodings) and not _decodes(sample, self.encodings[0], is_complete)
+
+    def cached(self, signature: StatSignature) -> Optional[FileClassification]:
+        return self._verdicts.get(signature)
+
+    def remember(self, signature: StatSignature, classification: FileClassification) -> None:
+        with self._lock:
+            self._verdicts[signature] = classification
+
+    def read(self, file_path: Path) -> Tuple[Optional[str], bool, Optional[str], Optional[str]]:
+        """
+        Reads and decodes a file with one open and one pass over its bytes.
+
+        Returns:
+            Tuple (content_string_or_none, is_binary_or_unreadable_error, error_message_or_none, encoding_or_none)
+        """
+        return self._read(file_path, False)[:4]
+
+    def read_with_sha256(
+        self, file_path: Path
+    ) -> Tuple[Optional[str], bool, Optional[str], Optional[str], Optional[str]]:
+        """
+        Same as read, additionally returning the SHA-256 of the raw bytes of a text
+        file (hashed from the bytes already read; None for binary or unreadable files).
+        """
+        return self._read(file_path, True)
+
+    def _read(
+        self, file_path: Path, compute_sha256: bool
+    ) -> Tuple[Optional[str], bool, Optional[str], Optional[str], Optional[str]]:
+        profiler = get_profiler()
+        profiler.count("files_read")
+        try:
+            with open(file_path, 'rb') as f:
+                signature = stat_signature(os.fstat(f.fileno()))
+                classification = self.cached(signature)
+                if classification is None:
+                    sample = f.read(self.sample_bytes)
+                    classification = self.classify_sample(sample, len(sample) < self.sample_bytes)
+                    if classification.is_binary:
+                        profiler.count("bytes_read", len(sample))
+                        self.remember(signature, classification)
+                        profiler.count("binary_files_detected")
+                        return None, True, classification.error_msg, None, None
+                    data = sample + f.read()
+                else:
+                    profiler.count("classifier_cache_hits")
+                    if classification.is_binary:
+                        return None, True, classification.error_msg, None, None
+                    data = f.read()
+        except Exception as e:
+            # Handle cases where file might be inaccessible
+            profiler.count("read_errors")
+            return None, True, f"Error during initial file access: {type(e).__name__}: {e}", None, None
+        profiler.count("bytes_read", len(data))
+
+        # Encodings listed before the detected one already failed on the sample
+        start = self.encodings.index(classification.encoding)
+        for attempt, encoding in enumerate(self.encodings[start:]):
+            try:
+                content = data.decode(encoding)
+            except UnicodeDecodeError:
+                continue # Try next encoding
+            except LookupError as e:
+                profiler.count("read_errors")
+                return None, True, f"Error reading file with {encoding}: {type(e).__name__}: {e}", None, None
+            if attempt:
+                profiler.count("decode_fallbacks")
+                classification = FileClassification(False, encoding, None)
+            self.remember(signature, classification)
+            # Same newline handling as reading in text mode
+            if '\r' in content:
+                content = content.replace('\r\n', '\n').replace('\r', '\n')
+            return content, False, None, encoding, hashlib.sha256(data).hexdigest() if compute_sha256 else None
+
+        # If all encodings failed
+        profiler.count("decode_failures")
+        classification = FileClassification(
+            True, None, f"Failed to decode file with any of specified encodings: {self.encodings}"
+        )
+        self.remember(signature, classification)
+        return None, True, classification.error_msg, None, None
+
+
+_default_classifiers: Dict[Tuple[str, ...], FileClassifier] = {}
+
+
+def get_default_classifier(encodings: List[str]) -> FileClassifier:
+    """Returns the process-wide classifier for an encodings list, with default thresholds."""
+    key = tuple(encodings)
+    classifier = _default_classifiers.get(key)
+    if classifier is None:
+        classifier = _default_classifiers.setdefault(key, FileClassifier(encodings))
+    return classifier
+
+
+def _decodes(sample: bytes, encoding: str, is_complete: bool) -> bool:
+    try:
+        codecs.getincrementaldecoder(encoding)(errors='strict').decode(sample, final=is_complete)
+    except UnicodeDecodeError:
+        return False
+    except LookupError:
+        return True # Unknown codec: reported when the file is decoded
+    return True
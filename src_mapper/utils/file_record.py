@@ -0,0 +1,91 @@
+# src_mapper/utils/file_record.py
+
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+from .file_utils import format_timestamp
+
+
+class FileRecord:
+    """
+    Scan result for one file, shared by all generators.
+
+    Records are kept for every file of the repository, so they are compact: only
+    the file name is stored per record, the directory and extension strings are
+    interned (shared by all files with the same value), timestamps stay numeric,
+    and paths are derived on access. git_info dicts are shared between the files
+    of one commit and must be treated as read-only.
+    """
+
+    __slots__ = (
+        '_repo_root', 'directory', 'name', 'extension', 'size_bytes', 'loc',
+        'ctime', 'mtime', 'content_sha256', 'git_info',
+    )
+
+    def __init__(
+        self,
+        repo_root: str,
+        directory: str,
+        name: str,
+        extension: str,
+        size_bytes: int,
+        loc: int,
+        ctime: Optional[float],
+        mtime: Optional[float],
+        content_sha256: Optional[str] = None
+    ):
+        self._repo_root = repo_root # Same string object for every record of a scan
+        self.directory = sys.intern(directory) # Relative POSIX directory, "" for the repository root
+        self.name = name
+        self.extension = sys.intern(extension)
+        self.size_bytes = size_bytes
+        self.loc = loc
+        self.ctime = ctime # st_ctime: creation on Windows, last metadata change on Unix
+        self.mtime = mtime
+        self.content_sha256 = content_sha256 # Of text files, if a scan manifest or DEDUPLICATE_CONTENT is used
+        self.git_info: Optional[Dict[str, str]] = None # Filled in after the scan if git info is requested
+
+    @property
+    def relative_path_posix(self) -> str:
+        return f"{self.directory}/{self.name}" if self.directory else self.name
+
+    @property
+    def parent_dir_relative_posix(self) -> str:
+        """Relative POSIX path of the containing directory, "." for the repository root."""
+        return self.directory or "."
+
+    @property
+    def relative_path(self) -> Path:
+        return Path(self.relative_path_posix)
+
+    @property
+    def absolute_path(self) -> Path:
+        return Path(self._repo_root, self.relative_path_posix)
+
+    @property
+    def timestamp_created(self) -> str:
+        """Creation (ctime) timestamp formatted as 'YYYY-MM-DD HH:MM:SS', "" if unknown."""
+        return format_timestamp(self.ctime)
+
+    @property
+    def timestamp_modified(self) -> str:
+        """Modification timestamp formatted as 'YYYY-MM-DD HH:MM:SS', "" if unknown."""
+        return format_timestamp(self.mtime)
+
+    def __repr__(self) -> str:
+        return f"FileRecord({self.relative_path_posix!r}, size_bytes={self.size_bytes}, loc={self.loc})"
+
+
+def dedup_digest(record: FileRecord, config_module) -> Optional[str]:
+    """
+    Returns the SHA-256 under which record shares its content with identical files, or
+    None if it is not deduplicated: DEDUPLICATE_CONTENT is off, the file was not hashed,
+    or it is smaller than DEDUP_MIN_BYTES (empty files never are), where a reference
+    would take more space than the content.
+    """
+    if record.content_sha256 is None or not getattr(config_module, 'DEDUPLICATE_CONTENT', True):
+        return None
+    if record.size_bytes < max(getattr(config_module, 'DEDUP_MIN_BYTES', 128), 1):
+        return None
+    return record.content_sha256
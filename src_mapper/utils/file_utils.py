@@ -1,50 +1,105 @@
 # src_mapper/utils/file_utils.py
 
 import datetime
+import hashlib
+import time
 from pathlib import Path
 import os # Import os for os.path.getctime/getmtime fallback
-from typing import Tuple, List, Optional
+from typing import Callable, Tuple, List, Optional, TypeVar
+
+from .file_classifier import FileClassifier, get_default_classifier
+from .mapped_content import truncation_marker
+from .line_counter import LOC_CHUNK_SIZE, count_lines_streaming, count_non_blank_lines_in_text
+from .profiler import get_profiler
+
+ReadResult = TypeVar('ReadResult')
 
 def read_file_content(file_path: Path, encodings: List[str]) -> Tuple[Optional[str], bool, Optional[str]]:
     """
     Attempts to read file content with a list of encodings.
-    Detects binary files by checking for null bytes in the first KB.
+    Detects binary files from a head sample (format signatures, null bytes, control characters).
 
     Returns:
         Tuple (content_string_or_none, is_binary_or_unreadable_error, error_message_or_none)
     """
-    try:
-        # First, check for null bytes to quickly identify many binary files
-        with open(file_path, 'rb') as bf:
-            chunk = bf.read(1024)  # Read first 1KB
-            if b'\x00' in chunk:
-                return None, True, "File appears to be binary (contains null bytes)."
-    except Exception as e:
-        # Handle cases where file might be inaccessible even for binary check
-        return None, True, f"Error during initial file access: {type(e).__name__}: {e}"
-
-    # If no null bytes, try reading as text with specified encodings
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding, errors='strict') as f:
-                return f.read(), False, None
-        except UnicodeDecodeError:
-            continue # Try next encoding
-        except Exception as e: # Other read errors like permission denied
-            return None, True, f"Error reading file with {encoding}: {type(e).__name__}: {e}"
-    
-    # If all encodings failed
-    return None, True, f"Failed to decode file with any of specified encodings: {encodings}"
+    content, is_binary, error_msg, _ = read_file_content_with_encoding(file_path, encodings)
+    return content, is_binary, error_msg
+
+def read_file_content_with_encoding(
+    file_path: Path,
+    encodings: List[str],
+    classifier: Optional[FileClassifier] = None
+) -> Tuple[Optional[str], bool, Optional[str], Optional[str]]:
+    """
+    Same as read_file_content, additionally returning the encoding that decoded the file.
+    Verdicts are cached in classifier (a shared per-encodings classifier by default).
+
+    Returns:
+        Tuple (content_string_or_none, is_binary_or_unreadable_error, error_message_or_none, encoding_or_none)
+    """
+    if classifier is None:
+        classifier = get_default_classifier(encodings)
+    return _timed_read(classifier.read, file_path)
+
+def read_file_content_with_sha256(
+    file_path: Path,
+    encodings: List[str],
+    classifier: Optional[FileClassifier] = None
+) -> Tuple[Optional[str], bool, Optional[str], Optional[str], Optional[str]]:
+    """
+    Same as read_file_content_with_encoding, additionally returning the SHA-256 of
+    the raw bytes of a text file, hashed while it is read (None for binary files).
+
+    Returns:
+        Tuple (content_string_or_none, is_binary_or_unreadable_error, error_message_or_none,
+        encoding_or_none, sha256_or_none)
+    """
+    if classifier is None:
+        classifier = get_default_classifier(encodings)
+    return _timed_read(classifier.read_with_sha256, file_path)
+
+def _timed_read(read: Callable[[Path], ReadResult], file_path: Path) -> ReadResult:
+    profiler = get_profiler()
+    if profiler.enabled:
+        start = time.perf_counter()
+        result = read(file_path)
+        profiler.add_time("file_read", time.perf_counter() - start)
+        return result
+    return read(file_path)
 
+def sha256_of_file(file_path: Path, chunk_size: int = LOC_CHUNK_SIZE) -> Optional[str]:
+    """Returns the SHA-256 of the raw file bytes, or None if the file cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
 
 def count_lines(file_path: Path, encodings: List[str]) -> int:
     """Counts non-empty lines in a text file."""
+    # Count on raw bytes in chunks when the encodings allow it
+    streamed = count_lines_streaming(file_path, encodings)
+    if streamed is not None:
+        return streamed.loc
+
     # Use read_file_content to handle encoding and binary check
     content, is_binary, _ = read_file_content(file_path, encodings)
     
     if is_binary or content is None:
         return 0
     
+    return count_non_empty_lines(content)
+
+def count_non_empty_lines(content: str) -> int:
+    """Counts non-empty lines in already decoded text content."""
+    lines = count_non_blank_lines_in_text(content)
+    if lines is not None:
+        return lines
+
+    # Text with non-ASCII whitespace or line breaks
     lines = 0
     # Splitlines keeps line endings, which is fine for counting
     for line in content.splitlines():
@@ -57,19 +112,23 @@ def get_file_timestamps(file_path: Path) -> Tuple[str, str]:
     Gets formatted creation and modification timestamps for a file.
     Note: ctime behavior varies by OS (creation on Windows, last metadata change on Unix).
     """
-    created_str, modified_str = "", ""
     try:
-        # Use os.path functions for compatibility, though Path.stat() is also fine
-        # os.path.getctime is creation on Windows, last metadata change on Unix
-        # os.path.getmtime is last modification time
-        created_ts = os.path.getctime(file_path)
-        modified_ts = os.path.getmtime(file_path)
-        
-        created_str = datetime.datetime.fromtimestamp(created_ts).strftime('%Y-%m-%d %H:%M:%S')
-        modified_str = datetime.datetime.fromtimestamp(modified_ts).strftime('%Y-%m-%d %H:%M:%S')
+        return format_file_timestamps(os.stat(file_path))
     except Exception: # Handle potential errors like file not found if it vanished
-        pass # Timestamps will remain empty
-    return created_str, modified_str
+        return "", "" # Timestamps will remain empty
+
+def format_file_timestamps(stat_result: os.stat_result) -> Tuple[str, str]:
+    """
+    Formats creation and modification timestamps from an existing stat result.
+    st_ctime is creation on Windows, last metadata change on Unix.
+    """
+    return format_timestamp(stat_result.st_ctime), format_timestamp(stat_result.st_mtime)
+
+def format_timestamp(timestamp: Optional[float]) -> str:
+    """Formats a POSIX timestamp as local 'YYYY-MM-DD HH:MM:SS' ("" for None)."""
+    if timestamp is None:
+        return ""
+    return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
 
 def get_file_extension(filename: str) -> str:
     """Extracts the file extension, including compound ones like .tar.gz."""
@@ -98,6 +157,6 @@ def truncate_content_by_lines(content: str, max_lines: int) -> Tuple[str, bool]:
     if len(lines) > max_lines:
         truncated_content = "".join(lines[:max_lines])
         # Add a clear indicator that content was truncated
-        truncated_content += f"\n...\n[Content truncated to {max_lines} lines]\n"
+        truncated_content += truncation_marker(max_lines)
         return truncated_content, True
     return content, False
\ No newline at end of file
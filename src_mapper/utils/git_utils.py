@@ -2,8 +2,11 @@
 
 import subprocess
 import sys # Import sys for stderr
+import threading
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set
+
+from .profiler import get_profiler
 
 def is_git_repository(repo_root_path: Path) -> bool:
     """Checks if the given path is the root of a Git repository."""
@@ -36,6 +39,7 @@ def get_last_commit_info(relative_file_path: Path, repo_root_path: Path, timeout
         ]
         
         # Execute the command from the repository root
+        get_profiler().count("subprocesses_spawned")
         result = subprocess.run(
             command,
             capture_output=True, # Capture stdout and stderr
@@ -81,4 +85,137 @@ def get_last_commit_info(relative_file_path: Path, repo_root_path: Path, timeout
         return None
     except Exception as e:
         # print(f"Warning: Unexpected error getting Git info for {relative_file_path}: {type(e).__name__}: {e}", file=sys.stderr) # Optional warning
-        return None
\ No newline at end of file
+        return None
+
+def _paths_at_head(repo_root_path: Path, timeout: int) -> Optional[Set[str]]:
+    """
+    Returns the POSIX paths of the files in the HEAD commit (the paths a log walk from
+    HEAD can resolve), or None if they cannot be listed.
+    """
+    try:
+        get_profiler().count("subprocesses_spawned")
+        result = subprocess.run(
+            ["git", "ls-tree", "-r", "-z", "--name-only", "HEAD"],
+            capture_output=True,
+            check=False,
+            cwd=str(repo_root_path),
+            timeout=timeout
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None # No commits yet, or not a usable repository
+    return {raw_path.decode('utf-8', errors='surrogateescape') for raw_path in result.stdout.split(b'\x00') if raw_path}
+
+
+def get_last_commit_info_bulk(relative_file_paths: List[str], repo_root_path: Path, timeout: int = 300) -> Dict[str, Dict[str, str]]:
+    """
+    Gets the last commit information for many files with a single streaming `git log` walk.
+    History is read newest-first and the walk stops as soon as every requested path
+    in the HEAD commit has been seen, so recently touched trees resolve without reading
+    all of history. Untracked and never-committed paths are left out up front (one
+    `git ls-tree` call), as no commit can resolve them.
+
+    Args:
+        relative_file_paths: POSIX-style paths relative to repo_root_path
+        repo_root_path: Path to the repository root (must contain .git)
+        timeout: Seconds after which the walk is abandoned; paths resolved so far are kept
+
+    Returns:
+        Dict mapping relative POSIX path to the same dict shape as get_last_commit_info.
+        Paths without history (untracked, never committed) are absent.
+        Files last changed in the same commit share one dict; do not modify it.
+    """
+    resolved: Dict[str, Dict[str, str]] = {}
+    if not relative_file_paths or not is_git_repository(repo_root_path):
+        return resolved
+
+    wanted = set(relative_file_paths)
+    paths_at_head = _paths_at_head(repo_root_path, timeout)
+    if paths_at_head is not None:
+        wanted &= paths_at_head
+        if not wanted:
+            return resolved
+
+    # Each commit is emitted as: \x1e<hash>\0<name>\0<email>\0<date>\0<subject>\n<path>\0<path>\0...
+    # -z keeps paths unquoted; --no-renames skips rename detection we don't need.
+    format_string = "%x1e%H%x00%an%x00%ae%x00%aI%x00%s"
+    command = [
+        "git", "log", "--name-only", "-z", "--no-renames",
+        f"--pretty=format:{format_string}"
+    ]
+
+    try:
+        get_profiler().count("subprocesses_spawned")
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=str(repo_root_path)
+        )
+    except FileNotFoundError:
+        # print("Warning: 'git' command not found. Git info will not be available.", file=sys.stderr) # Optional warning
+        return resolved
+    except Exception as e:
+        print(f"Warning: Could not start git log for bulk commit info: {type(e).__name__}: {e}", file=sys.stderr)
+        return resolved
+
+    # Kill the walk if it runs past the timeout; whatever was parsed so far is still returned
+    timed_out = threading.Event()
+    def _on_timeout() -> None:
+        timed_out.set()
+        process.kill()
+    timer = threading.Timer(timeout, _on_timeout)
+    timer.start()
+
+    def _consume_record(record: bytes) -> None:
+        header, _, paths_blob = record.partition(b'\n')
+        parts = header.decode('utf-8', errors='replace').split('\x00')
+        if len(parts) != 5:
+            return
+        commit_info = None # One dict shared by all files last changed in this commit
+        for raw_path in paths_blob.split(b'\x00'):
+            if not raw_path:
+                continue
+            path = raw_path.decode('utf-8', errors='surrogateescape')
+            if path in wanted and path not in resolved:
+                if commit_info is None:
+                    commit_info = {
+                        "hash": parts[0],
+                        "author_name": parts[1],
+                        "author_email": parts[2],
+                        "date_iso": parts[3],
+                        "subject": parts[4]
+                    }
+                resolved[path] = commit_info
+
+    try:
+        pending_chunks: List[bytes] = [] # Pieces of the record currently being read
+        while len(resolved) < len(wanted):
+            chunk = process.stdout.read1(65536)
+            if not chunk:
+                # End of history: the final record has no separator after it
+                _consume_record(b''.join(pending_chunks))
+                break
+            if b'\x1e' not in chunk:
+                pending_chunks.append(chunk)
+                continue
+            records = chunk.split(b'\x1e')
+            pending_chunks.append(records[0])
+            _consume_record(b''.join(pending_chunks))
+            for record in records[1:-1]:
+                _consume_record(record)
+            pending_chunks = [records[-1]]
+    except Exception as e:
+        print(f"Warning: Error reading git log output: {type(e).__name__}: {e}", file=sys.stderr)
+    finally:
+        timer.cancel()
+        if process.poll() is None:
+            process.kill() # All paths resolved (or error); the rest of history is irrelevant
+        process.stdout.close()
+        process.wait()
+
+    if timed_out.is_set() and len(resolved) < len(wanted):
+        print(f"Warning: git log did not finish within {timeout}s; commit info is incomplete.", file=sys.stderr)
+
+    return resolved
@@ -1,13 +1,16 @@
 # src_mapper/utils/ignore_utils.py
 
-import fnmatch
+import re
 import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 # Import from config to avoid circular dependency if config needs utils
 # from .. import config as cfg # This would be if config.py was in src_mapper/
 
+_GLOB_CHARS = frozenset('*?[\\')
+
 def load_gitignore_patterns(repo_root_path: Path) -> List[str]:
     """Loads and cleans patterns from .gitignore file in the repo root."""
     patterns: List[str] = []
@@ -24,59 +27,253 @@ def load_gitignore_patterns(repo_root_path: Path) -> List[str]:
             print(f"Warning: Could not read .gitignore from {gitignore_file}: {e}", file=sys.stderr)
     return patterns
 
-def _is_path_match(path_str: str, pattern: str) -> bool:
+def _read_ignore_file(ignore_file: Path) -> List[str]:
+    """Reads raw pattern lines from a .gitignore-style file (comments are dropped later)."""
+    if not ignore_file.is_file():
+        return []
+    try:
+        with open(ignore_file, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read().splitlines()
+    except Exception as e:
+        print(f"Warning: Could not read ignore file {ignore_file}: {e}", file=sys.stderr)
+        return []
+
+def _translate_glob(pattern: str) -> str:
+    """
+    Translates a gitignore glob into a regex fragment.
+    '*', '?' and '[...]' never match '/'; '**' matches across directories
+    only when it forms a whole path segment.
+    """
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            j = i
+            while j < n and pattern[j] == '*':
+                j += 1
+            is_double = j - i >= 2 and (i == 0 or pattern[i - 1] == '/') and (j == n or pattern[j] == '/')
+            if is_double and j == n:
+                parts.append('.*') # 'dir/**': everything inside
+            elif is_double:
+                parts.append('(?:.*/)?') # '**/': zero or more directories
+                j += 1
+            else:
+                parts.append('[^/]*')
+            i = j
+            continue
+        if c == '?':
+            parts.append('[^/]')
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                parts.append('\\[') # Unterminated class: literal '['
+            else:
+                stuff = pattern[i + 1:j].replace('\\', '\\\\')
+                if stuff[0] in '!^':
+                    stuff = '^' + stuff[1:]
+                parts.append(f'(?!/)[{stuff}]')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return ''.join(parts)
+
+def _parse_gitignore_line(line: str) -> Optional[Tuple[str, bool, bool]]:
+    """
+    Parses one .gitignore line.
+
+    Returns:
+        Tuple (pattern_without_markers, negate, dir_only) or None for blank/comment lines
+    """
+    if not line or line.startswith('#'):
+        return None
+    # Trailing spaces are ignored unless escaped with a backslash
+    while line.endswith(' ') and not line.endswith('\\ '):
+        line = line[:-1]
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    return line, negate, dir_only
+
+
+class _IgnoreRuleSet:
+    """
+    The patterns of one ignore file (or several concatenated), compiled for matching
+    paths relative to the directory the file lives in. The last matching rule wins.
+
+    Plain names ('node_modules') and simple extension globs ('*.log') are resolved with
+    dict lookups; everything else goes into one combined regex per file/dir kind.
+    """
+
+    def __init__(self, lines: List[str]):
+        self._negated: List[bool] = []
+        # Lookup tables map a basename / suffix to the highest rule index using it
+        self._names: Dict[str, int] = {}
+        self._names_dir_only: Dict[str, int] = {}
+        self._suffixes: Dict[str, int] = {}
+        self._suffixes_dir_only: Dict[str, int] = {}
+        file_alternatives: List[str] = []
+        dir_alternatives: List[str] = []
+
+        for line in lines:
+            parsed = _parse_gitignore_line(line)
+            if parsed is None:
+                continue
+            pattern, negate, dir_only = parsed
+            index = len(self._negated)
+            self._negated.append(negate)
+
+            anchored = '/' in pattern
+            if not anchored and not (_GLOB_CHARS & set(pattern)):
+                (self._names_dir_only if dir_only else self._names)[pattern] = index
+                continue
+            suffix = pattern[1:]
+            if not anchored and pattern.startswith('*.') and not (_GLOB_CHARS & set(suffix)):
+                (self._suffixes_dir_only if dir_only else self._suffixes)[suffix] = index
+                continue
+
+            regex = _translate_glob(pattern.lstrip('/'))
+            if not anchored:
+                regex = '(?:.*/)?' + regex
+            alternative = f'(?P<r{index}>{regex})'
+            dir_alternatives.append(alternative)
+            if not dir_only:
+                file_alternatives.append(alternative)
+
+        # Highest index first, so the first alternative that matches is the last rule in the file
+        self._file_regex = re.compile('|'.join(reversed(file_alternatives))) if file_alternatives else None
+        self._dir_regex = re.compile('|'.join(reversed(dir_alternatives))) if dir_alternatives else None
+
+    def __bool__(self) -> bool:
+        return bool(self._negated)
+
+    def match(self, relative_path_posix: str, is_dir: bool) -> Optional[bool]:
+        """
+        Returns True (ignored), False (re-included by a '!' rule) or None (no rule matched).
+        relative_path_posix is relative to the directory this rule set belongs to.
+        """
+        best = -1
+        name = relative_path_posix.rpartition('/')[2]
+
+        best = max(best, self._names.get(name, -1))
+        if is_dir:
+            best = max(best, self._names_dir_only.get(name, -1))
+
+        if self._suffixes or (is_dir and self._suffixes_dir_only):
+            # '*.tar.gz' style rules: try the name from every '.' onwards
+            dot = name.find('.')
+            while dot >= 0:
+                suffix = name[dot:]
+                best = max(best, self._suffixes.get(suffix, -1))
+                if is_dir:
+                    best = max(best, self._suffixes_dir_only.get(suffix, -1))
+                dot = name.find('.', dot + 1)
+
+        regex = self._dir_regex if is_dir else self._file_regex
+        if regex is not None:
+            m = regex.fullmatch(relative_path_posix)
+            if m is not None:
+                best = max(best, int(m.lastgroup[1:]))
+
+        if best < 0:
+            return None
+        return not self._negated[best]
+
+
+class GitignoreMatcher:
     """
-    Enhanced fnmatch considering directory patterns.
-    path_str should be a POSIX-style path string.
+    Compiled .gitignore matcher for one repository.
+
+    Loads `.git/info/exclude` and the root `.gitignore` up front; nested `.gitignore`
+    files are added with load_directory() as the walk enters each directory.
+    Rules in deeper files take precedence over shallower ones, later rules over
+    earlier ones, and '!' re-includes. Patterns are parsed and compiled once.
     """
-    if pattern.endswith('/'):
-        # 'build/' should match 'build' or 'build/foo.txt'
-        # To match 'build' itself, we check if path_str is pattern.rstrip('/')
-        # To match 'build/foo.txt', we check if path_str starts with pattern
-        return path_str == pattern.rstrip('/') or path_str.startswith(pattern)
-    return fnmatch.fnmatch(path_str, pattern) or fnmatch.fnmatch(Path(path_str).name, pattern)
+
+    def __init__(self, repo_root_path: Path):
+        self._repo_root_path = repo_root_path
+        self._rule_sets: Dict[str, _IgnoreRuleSet] = {} # base dir (POSIX, '' for root) -> rules
+
+        # info/exclude has lower precedence than the root .gitignore, so it goes first
+        root_lines = _read_ignore_file(repo_root_path / '.git' / 'info' / 'exclude')
+        root_lines += _read_ignore_file(repo_root_path / '.gitignore')
+        root_rules = _IgnoreRuleSet(root_lines)
+        if root_rules:
+            self._rule_sets[''] = root_rules
+
+    def load_directory(self, relative_dir_posix: str) -> None:
+        """Compiles the .gitignore inside relative_dir_posix, if there is one."""
+        if not relative_dir_posix or relative_dir_posix in self._rule_sets:
+            return
+        rules = _IgnoreRuleSet(_read_ignore_file(self._repo_root_path / relative_dir_posix / '.gitignore'))
+        if rules:
+            self._rule_sets[relative_dir_posix] = rules
+
+    def matches(self, relative_path_posix: str, is_dir: bool) -> bool:
+        """
+        Checks the path itself against all applicable ignore files.
+        Does not look at parent directories; the walker prunes those before descending.
+        """
+        if not self._rule_sets:
+            return False
+        slash = relative_path_posix.rfind('/')
+        while True:
+            base = relative_path_posix[:slash] if slash >= 0 else ''
+            rule_set = self._rule_sets.get(base)
+            if rule_set is not None:
+                result = rule_set.match(relative_path_posix[slash + 1:], is_dir)
+                if result is not None:
+                    return result
+            if slash < 0:
+                return False
+            slash = relative_path_posix.rfind('/', 0, slash)
+
+    def is_ignored(self, relative_path_posix: str, is_dir: bool = False) -> bool:
+        """Checks the path and every parent directory (a path inside an ignored directory is ignored)."""
+        slash = relative_path_posix.find('/')
+        while slash >= 0:
+            if self.matches(relative_path_posix[:slash], True):
+                return True
+            slash = relative_path_posix.find('/', slash + 1)
+        return self.matches(relative_path_posix, is_dir)
+
+
+@lru_cache(maxsize=16)
+def _compile_patterns(gitignore_patterns: Tuple[str, ...]) -> _IgnoreRuleSet:
+    return _IgnoreRuleSet(list(gitignore_patterns))
 
 
 def should_ignore_by_gitignore(relative_path: Path, gitignore_patterns: List[str]) -> bool:
     """
     Checks if a relative path should be ignored based on .gitignore patterns.
-    This is a simplified implementation and may not cover all .gitignore nuances.
+    Patterns are compiled once per distinct pattern list; a file inside an
+    ignored directory is ignored too.
     """
-    path_str_posix = relative_path.as_posix() # Use POSIX separators for matching
-
-    for pattern_str in gitignore_patterns:
-        pattern = pattern_str
-        # Handle negation (basic support)
-        negate = False
-        if pattern.startswith('!'):
-            negate = True
-            pattern = pattern[1:]
-
-        # Handle patterns starting with / (anchored to root)
-        if pattern.startswith('/'):
-            if _is_path_match(path_str_posix, pattern.lstrip('/')):
-                return not negate # Apply negation
-            continue # Anchored patterns only match at root
-
-        # Handle non-anchored patterns (can match anywhere)
-        # Check against full path and individual path components
-        if _is_path_match(path_str_posix, pattern):
-            return not negate
-        
-        # Check if pattern matches any directory component in the path
-        # e.g. pattern 'node_modules/' should ignore 'src/node_modules/file.js'
-        if pattern.endswith('/'):
-            dir_pattern_name = pattern.rstrip('/')
-            if dir_pattern_name in relative_path.parts:
-                # Further check: if 'node_modules/' is pattern, ensure 'node_modules' part is a directory
-                # This is implicitly handled if the path component matches the dir_pattern_name
-                return not negate
-        
-        # Check against just the filename/dirname if pattern has no slashes
-        if '/' not in pattern and fnmatch.fnmatch(relative_path.name, pattern):
-            return not negate
-            
-    return False
+    rule_set = _compile_patterns(tuple(gitignore_patterns))
+    parts = relative_path.parts
+    for depth in range(1, len(parts)):
+        if rule_set.match('/'.join(parts[:depth]), True):
+            return True
+    return bool(rule_set.match(relative_path.as_posix(), False))
+
+
+@lru_cache(maxsize=16)
+def _excluded_folder_set(config_exclude_folders: Tuple[str, ...]) -> frozenset:
+    return frozenset(config_exclude_folders)
 
 
 def is_excluded_entirely(relative_path: Path, config_exclude_folders: List[str], gitignore_patterns: List[str]) -> bool:
@@ -89,36 +286,10 @@ def is_excluded_entirely(relative_path: Path, config_exclude_folders: List[str],
         return False
 
     # Check against config_exclude_folders (these are usually simple names)
-    if relative_path.name in config_exclude_folders:
+    excluded_folders = _excluded_folder_set(tuple(config_exclude_folders))
+    if relative_path.name in excluded_folders:
         return True
-    if str(relative_path) in config_exclude_folders: # For paths like "docs/_build"
+    if str(relative_path) in excluded_folders: # For paths like "docs/_build"
         return True
 
-    # Check against gitignore patterns that are directory-specific
-    # A pattern like "build/" or "node_modules/" from .gitignore should exclude the directory
-    path_str_posix = relative_path.as_posix()
-    for pattern_str in gitignore_patterns:
-        pattern = pattern_str
-        negate = False
-        if pattern.startswith('!'):
-            negate = True
-            pattern = pattern[1:]
-
-        if pattern.endswith('/'):
-            # If pattern is 'build/', it should match the directory 'build'
-            if path_str_posix == pattern.rstrip('/'):
-                return not negate
-            # If pattern is 'some/path/build/', it should match 'some/path/build'
-            if path_str_posix == pattern.rstrip('/'):
-                 return not negate
-            # If pattern is 'node_modules/', and relative_path is 'src/node_modules', it should match
-            if pattern.rstrip('/') in relative_path.parts:
-                 # This is a bit broad, but often intended for .gitignore
-                 # A more precise check would ensure the pattern matches the full path segment
-                 # For example, if pattern is 'foo/', path 'a/foo/b' should be ignored.
-                 # If path is 'a/bfoo/c', it should not.
-                 # The current check `pattern.rstrip('/') in relative_path.parts` is simple.
-                 return not negate
-
-
-    return False
\ No newline at end of file
+    return bool(_compile_patterns(tuple(gitignore_patterns)).match(relative_path.as_posix(), True))
@@ -0,0 +1,196 @@
+# src_mapper/utils/line_counter.py
+
+"""
+Byte-level counting of non-blank lines.
+
+Gives the same result as counting the lines of str.splitlines() for which
+line.strip() is non-empty, but works on raw bytes in fixed-size chunks: every
+chunk is translated in one pass (whitespace deleted, line breaks mapped to
+b"\\n", everything else to b"x") and the non-blank lines are the line starts
+followed by an "x". No per-line strings are built and memory stays flat.
+
+Exact for ASCII, UTF-8 and Latin-1. UTF-8 text containing one of the few
+non-ASCII whitespace or line-break characters (NBSP, U+2028, ...) is reported
+as unsupported so the caller can count it from decoded text instead.
+"""
+
+import codecs
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from .file_classifier import FileClassification, FileClassifier, get_default_classifier, stat_signature
+
+LOC_CHUNK_SIZE: int = 1024 * 1024
+
+# Bytes str.strip() removes that do not end a line; removed before counting
+_WHITESPACE_BYTES = b' \t\x1f'
+# Bytes str.splitlines() breaks on
+_LINE_BREAK_BYTES = b'\n\r\x0b\x0c\x1c\x1d\x1e'
+
+
+def _translation_table(extra_line_breaks: bytes = b'') -> bytes:
+    table = bytearray(b'x' * 256)
+    for byte in _LINE_BREAK_BYTES + extra_line_breaks:
+        table[byte] = ord('\n')
+    return bytes(table)
+
+
+_ASCII_TABLE = _translation_table() # Also exact for UTF-8 without the characters below
+_LATIN_1_TABLE = _translation_table(b'\x85') # NEL is a line break in Latin-1
+_LATIN_1_WHITESPACE = _WHITESPACE_BYTES + b'\xa0' # NBSP
+
+# UTF-8 encodings of the non-ASCII characters that are whitespace or line breaks in str
+_UTF8_SPACE_OR_BREAK = re.compile(
+    rb'\xc2[\x85\xa0]|\xe1\x9a\x80|\xe2\x80[\x80-\x8a\xa8\xa9\xaf]|\xe2\x81\x9f|\xe3\x80\x80'
+)
+
+# Encodings the streaming counter understands, by codecs.lookup() name
+_STREAMING_ENCODINGS = {'utf-8': 'utf-8', 'ascii': 'ascii', 'iso8859-1': 'latin-1'}
+
+
+def _count_translated(translated: bytes, at_line_start: bool) -> Tuple[int, bool]:
+    """Counts lines that start with content in translated bytes, continuing from the previous chunk's state."""
+    if not translated:
+        return 0, at_line_start
+    count = translated.count(b'\nx')
+    if at_line_start and translated[0] == 0x78: # b'x'
+        count += 1
+    return count, translated[-1] == 0x0a # b'\n'
+
+
+def count_non_blank_lines_in_text(content: str) -> Optional[int]:
+    """
+    Counts non-blank lines of decoded text via its UTF-8 bytes.
+    Returns None if the text contains non-ASCII whitespace or line breaks.
+    """
+    data = content.encode('utf-8', 'surrogatepass')
+    if not data.isascii() and _UTF8_SPACE_OR_BREAK.search(data):
+        return None
+    return _count_translated(data.translate(_ASCII_TABLE, _WHITESPACE_BYTES), True)[0]
+
+
+class StreamedLineCount(NamedTuple):
+    loc: int
+    is_binary: bool # Binary or unreadable, as read_file_content would report it
+    error_msg: Optional[str]
+    encoding: Optional[str] # Entry of the encodings list that decodes the file
+    sha256: Optional[str] # SHA-256 of the raw file bytes, if requested
+
+
+class _Candidate:
+    """Running count for one encoding the file may turn out to be in."""
+    __slots__ = ('encoding', 'kind', 'valid', 'count', 'at_line_start', 'decoder', 'needs_decode')
+
+    def __init__(self, encoding: str, kind: str):
+        self.encoding = encoding
+        self.kind = kind
+        self.valid = True
+        self.count = 0
+        self.at_line_start = True
+        self.decoder = codecs.getincrementaldecoder('utf-8')() if kind == 'utf-8' else None
+        self.needs_decode = False # UTF-8 file with non-ASCII whitespace: count from decoded text
+
+
+def count_lines_streaming(
+    file_path: Path,
+    encodings: List[str],
+    chunk_size: int = LOC_CHUNK_SIZE,
+    compute_sha256: bool = False,
+    classifier: Optional[FileClassifier] = None
+) -> Optional[StreamedLineCount]:
+    """
+    Counts non-blank lines of a file without decoding it, choosing the encoding
+    like read_file_content does (first in the list that decodes the whole file).
+    The file is classified from its head sample by classifier (the shared
+    classifier for encodings by default), and the verdict is cached there.
+
+    Returns None when the result cannot be computed exactly from bytes (an
+    encoding other than ASCII/UTF-8/Latin-1 is listed, or UTF-8 text uses
+    non-ASCII whitespace); the caller should decode the file instead.
+    """
+    if classifier is None:
+        classifier = get_default_classifier(encodings)
+    kinds = []
+    for encoding in encodings:
+        try:
+            kind = _STREAMING_ENCODINGS.get(codecs.lookup(encoding).name)
+        except LookupError:
+            kind = None
+        if kind is None:
+            return None
+        kinds.append(kind)
+        if kind == 'latin-1':
+            break # Decodes anything; later encodings are never tried
+
+    digest = hashlib.sha256() if compute_sha256 else None
+    try:
+        with open(file_path, 'rb') as f:
+            signature = stat_signature(os.fstat(f.fileno()))
+            chunk = f.read(classifier.sample_bytes)
+            classification = classifier.cached(signature)
+            if classification is None:
+                classification = classifier.classify_sample(chunk, len(chunk) < classifier.sample_bytes)
+                if classification.is_binary:
+                    classifier.remember(signature, classification)
+            if classification.is_binary:
+                return StreamedLineCount(0, True, classification.error_msg, None, None)
+            # Encodings listed before the detected one already failed on the sample
+            start = encodings.index(classification.encoding)
+            candidates = [_Candidate(encoding, kind) for encoding, kind in zip(encodings[start:], kinds[start:])]
+            previous_tail = b''
+            while chunk:
+                if digest is not None:
+                    digest.update(chunk)
+                _count_chunk(chunk, previous_tail, candidates)
+                previous_tail = (previous_tail + chunk[-2:])[-2:]
+                chunk = f.read(chunk_size)
+    except Exception as e:
+        return StreamedLineCount(0, True, f"Error during initial file access: {type(e).__name__}: {e}", None, None)
+
+    for candidate in candidates:
+        if candidate.decoder is not None and candidate.valid:
+            try:
+                candidate.decoder.decode(b'', final=True)
+            except UnicodeDecodeError:
+                candidate.valid = False
+        if candidate.valid:
+            classifier.remember(signature, FileClassification(False, candidate.encoding, None))
+            if candidate.needs_decode:
+                return None
+            return StreamedLineCount(
+                candidate.count, False, None, candidate.encoding,
+                digest.hexdigest() if digest is not None else None
+            )
+    error_msg = f"Failed to decode file with any of specified encodings: {encodings}"
+    classifier.remember(signature, FileClassification(True, None, error_msg))
+    return StreamedLineCount(0, True, error_msg, None, None)
+
+
+def _count_chunk(chunk: bytes, previous_tail: bytes, candidates: List[_Candidate]) -> None:
+    is_ascii = chunk.isascii()
+    ascii_translated = None
+    for candidate in candidates:
+        if not candidate.valid:
+            continue
+        if candidate.kind == 'latin-1' and not is_ascii:
+            translated = chunk.translate(_LATIN_1_TABLE, _LATIN_1_WHITESPACE)
+        else:
+            if candidate.kind == 'ascii' and not is_ascii:
+                candidate.valid = False
+                continue
+            if candidate.decoder is not None and (not is_ascii or candidate.decoder.getstate()[0]):
+                try:
+                    candidate.decoder.decode(chunk) # Validation only; the text is discarded
+                except UnicodeDecodeError:
+                    candidate.valid = False
+                    continue
+                if not is_ascii and _UTF8_SPACE_OR_BREAK.search(previous_tail + chunk):
+                    candidate.needs_decode = True
+            if ascii_translated is None:
+                ascii_translated = chunk.translate(_ASCII_TABLE, _WHITESPACE_BYTES)
+            translated = ascii_translated
+        added, candidate.at_line_start = _count_translated(translated, candidate.at_line_start)
+        candidate.count += added
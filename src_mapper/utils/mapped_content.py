@@ -0,0 +1,134 @@
+# src_mapper/utils/mapped_content.py
+
+"""
+Head-of-file access for large text files.
+
+The file is memory-mapped, the end of its Nth line is found by scanning the
+mapped bytes for line breaks, and only that slice is decoded. The result is
+the same as decoding the whole file and passing it to truncate_content_by_lines,
+without reading the rest of the file or building a string per line.
+"""
+
+import codecs
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .file_classifier import FileClassification, FileClassifier, get_default_classifier, stat_signature
+from .profiler import get_profiler
+
+_VALIDATION_CHUNK_SIZE = 1024 * 1024
+
+# Line breaks of str.splitlines(), as bytes of each encoding; \r\n counts as one
+_ASCII_LINE_BREAK = rb'\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e]'
+_LINE_BREAK_PATTERNS = {
+    'utf-8': re.compile(_ASCII_LINE_BREAK + rb'|\xc2\x85|\xe2\x80[\xa8\xa9]'),
+    'ascii': re.compile(_ASCII_LINE_BREAK),
+    'iso8859-1': re.compile(_ASCII_LINE_BREAK + rb'|\x85'),
+}
+
+# (content_or_none, was_truncated, is_binary_or_unreadable_error, error_message_or_none)
+HeadResult = Tuple[Optional[str], bool, bool, Optional[str]]
+
+
+def truncation_marker(max_lines: int) -> str:
+    """Text appended to content cut to max_lines lines."""
+    return f"\n...\n[Content truncated to {max_lines} lines]\n"
+
+
+def read_head_lines(
+    file_path: Path,
+    max_lines: int,
+    encodings: List[str],
+    classifier: Optional[FileClassifier] = None
+) -> Optional[HeadResult]:
+    """
+    Returns the first max_lines lines of a text file, with the truncation marker
+    if the file has more, reading only those lines.
+
+    The encoding comes from classifier (the shared classifier for encodings by
+    default); a verdict it does not know yet is established by validating the
+    mapped file without decoding it into a string.
+
+    Returns None if the file cannot be handled this way (an encoding that is
+    not ASCII-compatible, or the file cannot be mapped); the caller should read
+    it normally.
+    """
+    if classifier is None:
+        classifier = get_default_classifier(encodings)
+    try:
+        with open(file_path, 'rb') as f:
+            stat_result = os.fstat(f.fileno())
+            if stat_result.st_size == 0:
+                return None # Empty files cannot be mapped
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                classification = _classify_mapped(mapped, stat_result, classifier)
+                if classification is None:
+                    return None
+                if classification.is_binary:
+                    return None, False, True, classification.error_msg
+                pattern = _LINE_BREAK_PATTERNS.get(codecs.lookup(classification.encoding).name)
+                if pattern is None:
+                    return None
+
+                end = 0
+                for line_number, match in enumerate(pattern.finditer(mapped), 1):
+                    if line_number == max_lines:
+                        end = match.end()
+                        break
+                else:
+                    end = len(mapped) # max_lines lines or fewer: the whole file
+                was_truncated = end < len(mapped)
+                content = mapped[:end].decode(classification.encoding)
+                get_profiler().count("bytes_read", end)
+    except (OSError, ValueError):
+        return None
+
+    # Same newline handling as reading in text mode
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    if was_truncated:
+        content += truncation_marker(max_lines)
+    return content, was_truncated, False, None
+
+
+def _classify_mapped(mapped: mmap.mmap, stat_result: os.stat_result,
+                     classifier: FileClassifier) -> Optional[FileClassification]:
+    """Returns the whole-file verdict for the mapped file, validating its encoding if needed."""
+    signature = stat_signature(stat_result)
+    classification = classifier.cached(signature)
+    if classification is not None:
+        return classification # Cached text verdicts always come from decoding the whole file
+
+    sample = mapped[:classifier.sample_bytes]
+    classification = classifier.classify_sample(sample, len(sample) < classifier.sample_bytes)
+    if not classification.is_binary:
+        # The sample fits the encoding; the first encoding that fits the whole file decides
+        start = classifier.encodings.index(classification.encoding)
+        for encoding in classifier.encodings[start:]:
+            try:
+                decodes = _decodes_fully(mapped, encoding)
+            except LookupError:
+                return None
+            if decodes:
+                classification = FileClassification(False, encoding, None)
+                break
+        else:
+            classification = FileClassification(
+                True, None, f"Failed to decode file with any of specified encodings: {classifier.encodings}"
+            )
+    classifier.remember(signature, classification)
+    return classification
+
+
+def _decodes_fully(mapped: mmap.mmap, encoding: str) -> bool:
+    decoder = codecs.getincrementaldecoder(encoding)(errors='strict')
+    try:
+        for offset in range(0, len(mapped), _VALIDATION_CHUNK_SIZE):
+            decoder.decode(mapped[offset:offset + _VALIDATION_CHUNK_SIZE]) # Validation only
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
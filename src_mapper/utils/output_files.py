@@ -0,0 +1,190 @@
+# src_mapper/utils/output_files.py
+
+"""
+Opening artifacts for writing, optionally through a compressor, and reading
+them back whatever way they were written.
+
+The compressor is chosen by the file suffix (.gz, .zst, .xz), so generators
+only need the output path. Text is encoded and compressed as it is written,
+one buffer at a time; no artifact is held in memory in full. gzip and xz come
+with Python; zstd needs the zstandard package (or Python 3.14's
+compression.zstd); compression modules are only imported once an artifact is
+compressed or read. Readers detect the format from the leading bytes, so an
+artifact can be renamed without breaking them. Generators also accept an open
+text stream instead of a path (output_stream), so artifacts can be rendered into
+memory or any writable stream.
+"""
+
+import contextlib
+import io
+import sys
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, TextIO, Union
+
+# Values of --compress
+COMPRESSION_CHOICES = ("gzip", "zstd-if-available", "xz")
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst", "xz": ".xz"}
+_COMPRESSION_BY_SUFFIX = {suffix: compression for compression, suffix in COMPRESSION_SUFFIXES.items()}
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_XZ_MAGIC = b'\xfd7zXZ\x00'
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+# (compression.zstd or None, zstandard or None), imported on first use
+_zstd_modules = None
+
+
+def _load_zstd():
+    """Returns the zstd modules, importing them the first time."""
+    global _zstd_modules
+    if _zstd_modules is None:
+        try:
+            from compression import zstd as stdlib_zstd # Python 3.14+
+        except ImportError:
+            stdlib_zstd = None
+        try:
+            import zstandard
+        except ImportError:
+            zstandard = None
+        _zstd_modules = (stdlib_zstd, zstandard)
+    return _zstd_modules
+
+
+def zstd_available() -> bool:
+    stdlib_zstd, zstandard = _load_zstd()
+    return stdlib_zstd is not None or zstandard is not None
+
+
+def resolve_compression(requested: Optional[str]) -> Optional[str]:
+    """
+    Returns the compression to use for a --compress value: None, "gzip", "zstd" or "xz".
+    "zstd-if-available" falls back to gzip when no zstd module is installed.
+    """
+    if requested == "zstd-if-available":
+        if zstd_available():
+            return "zstd"
+        print("Info: zstd needs the 'zstandard' package, which is not installed. Compressing with gzip.", file=sys.stderr)
+        return "gzip"
+    if requested is not None and requested not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression: {requested}")
+    return requested
+
+
+def compressed_path(path: Path, compression: Optional[str]) -> Path:
+    """Returns path with the suffix of compression appended (unchanged for None)."""
+    if compression is None:
+        return path
+    return path.with_name(path.name + COMPRESSION_SUFFIXES[compression])
+
+
+def uncompressed_path(path: Path) -> Path:
+    """Returns path without a trailing .gz, .zst or .xz suffix."""
+    if path.suffix in _COMPRESSION_BY_SUFFIX:
+        return path.with_suffix('')
+    return path
+
+
+def open_output_file(path: Path, config_module=None, newline: Optional[str] = None) -> TextIO:
+    """
+    Opens path for writing UTF-8 text, compressed if its suffix is .gz, .zst or .xz.
+    Levels come from config_module (GZIP_COMPRESS_LEVEL, ZSTD_COMPRESS_LEVEL, XZ_PRESET).
+    newline is passed on as for open().
+    """
+    compression = _COMPRESSION_BY_SUFFIX.get(path.suffix)
+    if compression is None:
+        return open(path, 'w', encoding='utf-8', newline=newline)
+    return io.TextIOWrapper(
+        _open_compressed_writer(path, compression, config_module), encoding='utf-8', newline=newline
+    )
+
+
+@contextlib.contextmanager
+def output_stream(target: Union[Path, TextIO], config_module=None, newline: Optional[str] = None) -> Iterator[TextIO]:
+    """
+    Yields a text stream to write an artifact to: target itself if it is already an
+    open stream (it is left open), otherwise the file opened with open_output_file.
+    """
+    if is_stream(target):
+        yield target
+        return
+    with open_output_file(Path(target), config_module, newline) as f:
+        yield f
+
+
+def is_stream(target) -> bool:
+    """Whether an output target is an open stream rather than a path."""
+    return hasattr(target, 'write')
+
+
+def _open_compressed_writer(path: Path, compression: str, config_module) -> BinaryIO:
+    if compression == "gzip":
+        import gzip
+        # mtime=0 keeps the output identical for identical content
+        return gzip.GzipFile(
+            path, 'wb', compresslevel=getattr(config_module, 'GZIP_COMPRESS_LEVEL', 6), mtime=0
+        )
+    if compression == "xz":
+        import lzma
+        return lzma.open(path, 'wb', preset=getattr(config_module, 'XZ_PRESET', 6))
+    level = getattr(config_module, 'ZSTD_COMPRESS_LEVEL', 3)
+    stdlib_zstd, zstandard = _load_zstd()
+    if stdlib_zstd is not None:
+        return stdlib_zstd.open(path, 'wb', level=level)
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).stream_writer(open(path, 'wb'), closefd=True)
+    raise RuntimeError(f"Cannot write {path.name}: zstd needs the 'zstandard' package")
+
+
+def find_artifact(path: Path) -> Optional[Path]:
+    """Returns path, or its compressed variant (.gz, .zst, .xz) if only that exists, or None."""
+    if path.exists():
+        return path
+    for suffix in COMPRESSION_SUFFIXES.values():
+        candidate = path.with_name(path.name + suffix)
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def open_artifact(path: Path) -> TextIO:
+    """Opens an artifact for reading text, decompressing it if it starts with a gzip, zstd or xz header."""
+    raw = open(path, 'rb')
+    try:
+        magic = raw.read(6)
+        raw.seek(0)
+        if magic.startswith(_GZIP_MAGIC):
+            import gzip
+            stream = gzip.GzipFile(fileobj=raw)
+        elif magic.startswith(_XZ_MAGIC):
+            import lzma
+            stream = lzma.LZMAFile(raw)
+        elif magic.startswith(_ZSTD_MAGIC):
+            stdlib_zstd, zstandard = _load_zstd()
+            if stdlib_zstd is not None:
+                stream = stdlib_zstd.ZstdFile(raw)
+            elif zstandard is not None:
+                stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+            else:
+                raise RuntimeError(f"Cannot read {path.name}: zstd needs the 'zstandard' package")
+        else:
+            return io.TextIOWrapper(raw, encoding='utf-8')
+    except BaseException:
+        raw.close()
+        raise
+    return _ClosingTextIOWrapper(stream, raw)
+
+
+class _ClosingTextIOWrapper(io.TextIOWrapper):
+    """Text reader over a decompressor that also closes the file under it (GzipFile and LZMAFile leave it open)."""
+
+    def __init__(self, stream: BinaryIO, raw: BinaryIO):
+        super().__init__(stream, encoding='utf-8')
+        self._raw = raw
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._raw.close()
@@ -0,0 +1,185 @@
+# src_mapper/utils/profiler.py
+
+"""
+Lightweight run instrumentation: phase timers, accumulated timers for hot paths,
+counters, and a trace of files slower than a threshold.
+
+Code anywhere in the mapper reports to the active profiler (get_profiler()).
+By default that is a disabled profiler whose methods return immediately, so
+instrumented code costs almost nothing unless --profile is given; hot loops
+should still check `profiler.enabled` before taking timestamps.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+
+class Profiler:
+    """Collects timings and counters for one mapper run. Thread-safe."""
+
+    def __init__(self, enabled: bool = True, slow_file_threshold_ms: float = 50.0):
+        self.enabled = enabled
+        self.slow_file_threshold_s = slow_file_threshold_ms / 1000.0
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._phases: List[Dict[str, Any]] = [] # Completed phases in completion order
+        self._timers: Dict[str, List[float]] = {} # name -> [total_seconds, calls]
+        self._counters: Dict[str, int] = {}
+        self._slow_files: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times a named section of the run. Phases may nest."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self._phases.append({
+                    'name': name,
+                    'start_s': start - self._origin,
+                    'duration_s': end - start,
+                    'thread_id': threading.get_ident(),
+                })
+
+    def add_phase(self, name: str, start: float, seconds: float) -> None:
+        """Records a phase timed elsewhere (start is a time.perf_counter() value of this process)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._phases.append({
+                'name': name,
+                'start_s': start - self._origin,
+                'duration_s': seconds,
+                'thread_id': threading.get_ident(),
+            })
+
+    def merge(self, summary: Dict[str, Any]) -> None:
+        """Adds the timers, counters and slow files of another profiler's to_dict() (e.g. from a worker process)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for name, timer in summary.get('timers', {}).items():
+                total = self._timers.setdefault(name, [0.0, 0])
+                total[0] += timer['total_s']
+                total[1] += timer['calls']
+            for name, amount in summary.get('counters', {}).items():
+                self._counters[name] = self._counters.get(name, 0) + amount
+            for slow_file in summary.get('slow_files', []):
+                self._slow_files.append({
+                    'path': slow_file['path'],
+                    'start_s': 0.0, # Not comparable across processes
+                    'duration_s': slow_file['duration_s'],
+                    'thread_id': 0,
+                    'detail': slow_file['detail'],
+                })
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Adds to an accumulated timer (for code that runs many times, like matching or reading)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                self._timers[name] = [seconds, 1]
+            else:
+                timer[0] += seconds
+                timer[1] += 1
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def record_file(self, relative_path: str, start: float, seconds: float, detail: str = "") -> None:
+        """Traces one file's processing if it took longer than the slow-file threshold."""
+        if not self.enabled or seconds < self.slow_file_threshold_s:
+            return
+        with self._lock:
+            self._slow_files.append({
+                'path': relative_path,
+                'start_s': start - self._origin,
+                'duration_s': seconds,
+                'thread_id': threading.get_ident(),
+                'detail': detail,
+            })
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns everything collected so far as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                'total_s': round(time.perf_counter() - self._origin, 6),
+                'phases': [
+                    {'name': p['name'], 'start_s': round(p['start_s'], 6), 'duration_s': round(p['duration_s'], 6)}
+                    for p in sorted(self._phases, key=lambda p: p['start_s'])
+                ],
+                'timers': {
+                    name: {'total_s': round(total, 6), 'calls': calls}
+                    for name, (total, calls) in sorted(self._timers.items())
+                },
+                'counters': dict(sorted(self._counters.items())),
+                'slow_file_threshold_ms': self.slow_file_threshold_s * 1000.0,
+                'slow_files': [
+                    {'path': f['path'], 'duration_s': round(f['duration_s'], 6), 'detail': f['detail']}
+                    for f in sorted(self._slow_files, key=lambda f: f['duration_s'], reverse=True)
+                ],
+            }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Returns the run in Chrome trace event format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        with self._lock:
+            for p in self._phases:
+                events.append({
+                    'name': p['name'], 'cat': 'phase', 'ph': 'X', 'pid': pid, 'tid': p['thread_id'],
+                    'ts': p['start_s'] * 1e6, 'dur': p['duration_s'] * 1e6,
+                })
+            for f in self._slow_files:
+                events.append({
+                    'name': f['path'], 'cat': 'slow_file', 'ph': 'X', 'pid': pid, 'tid': f['thread_id'],
+                    'ts': f['start_s'] * 1e6, 'dur': f['duration_s'] * 1e6, 'args': {'detail': f['detail']},
+                })
+            end_ts = (time.perf_counter() - self._origin) * 1e6
+            if self._counters:
+                events.append({
+                    'name': 'counters', 'ph': 'C', 'pid': pid, 'tid': 0, 'ts': end_ts,
+                    'args': dict(self._counters),
+                })
+            timers = {name: round(total, 6) for name, (total, _) in self._timers.items()}
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'accumulated_timers_s': timers},
+        }
+
+    def write(self, output_path: Path, output_format: str = "json") -> None:
+        """Writes the profile as "json" (summary) or "chrome" (trace events)."""
+        data = self.to_chrome_trace() if output_format == "chrome" else self.to_dict()
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2 if output_format == "json" else None)
+
+
+# Disabled until a run installs a real one with set_profiler()
+_active_profiler = Profiler(enabled=False)
+
+
+def get_profiler() -> Profiler:
+    """Returns the profiler instrumented code should report to."""
+    return _active_profiler
+
+
+def set_profiler(profiler: Optional[Profiler]) -> None:
+    """Installs profiler as the active one (None restores the disabled default)."""
+    global _active_profiler
+    _active_profiler = profiler if profiler is not None else Profiler(enabled=False)
@@ -0,0 +1,115 @@
+# src_mapper/utils/scan_manifest.py
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MANIFEST_VERSION = 2 # 2: sha256 is taken over the raw file bytes
+
+
+class ScanManifest:
+    """
+    Persistent per-file scan results, keyed by relative POSIX path.
+
+    Each record stores the stat signature (mtime_ns, size, inode) together with the
+    results that are expensive to recompute: LOC, the binary/encoding decision and a
+    SHA-256 of the raw file bytes. On the next run, files whose stat signature is
+    unchanged reuse their record instead of being read again.
+
+    The manifest is only trusted when it was written for the same repository root and
+    the same settings that influence the cached values (encodings, binary extensions,
+    binary classification thresholds).
+    """
+
+    def __init__(self, manifest_path: Path, repo_root_path: Path, settings: Dict[str, Any]):
+        self.manifest_path = manifest_path
+        self._header = {
+            "version": MANIFEST_VERSION,
+            "repo_root": str(repo_root_path),
+            "settings": settings,
+        }
+        self._previous_records: Dict[str, Dict[str, Any]] = {}
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self.reused_count = 0
+
+    @classmethod
+    def load(cls, manifest_path: Path, repo_root_path: Path, settings: Dict[str, Any]) -> "ScanManifest":
+        """Loads an existing manifest; a missing, unreadable or stale one starts empty."""
+        manifest = cls(manifest_path, repo_root_path, settings)
+        if not manifest_path.is_file():
+            return manifest
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not read scan manifest {manifest_path}: {e}. Doing a full scan.", file=sys.stderr)
+            return manifest
+
+        if all(data.get(key) == value for key, value in manifest._header.items()):
+            manifest._previous_records = data.get("files", {})
+        else:
+            print("Info: Scan manifest was written with different settings. Doing a full scan.", file=sys.stderr)
+        return manifest
+
+    def lookup(self, relative_path_posix: str, stat_result: os.stat_result) -> Optional[Dict[str, Any]]:
+        """Returns the previous record for the path if its stat signature is unchanged."""
+        record = self._previous_records.get(relative_path_posix)
+        if (
+            record is None
+            or record.get("mtime_ns") != stat_result.st_mtime_ns
+            or record.get("size") != stat_result.st_size
+            or record.get("inode") != stat_result.st_ino
+        ):
+            return None
+        self._records[relative_path_posix] = record
+        self.reused_count += 1
+        return record
+
+    def update(
+        self,
+        relative_path_posix: str,
+        stat_result: os.stat_result,
+        loc: int,
+        is_binary: bool,
+        encoding: Optional[str],
+        content_sha256: Optional[str],
+        read_error: Optional[str] = None
+    ) -> None:
+        """Records freshly computed results for a file. Safe to call from worker threads."""
+        self._records[relative_path_posix] = {
+            "mtime_ns": stat_result.st_mtime_ns,
+            "size": stat_result.st_size,
+            "inode": stat_result.st_ino,
+            "loc": loc,
+            "is_binary": is_binary,
+            "encoding": encoding,
+            "sha256": content_sha256,
+            "read_error": read_error,
+        }
+
+    def save(self) -> None:
+        """
+        Writes the records seen in this run (deleted files drop out).
+        Written to a temporary file first so an interrupted run never leaves a corrupt manifest.
+        """
+        data = dict(self._header)
+        data["files"] = self._records
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.manifest_path)
+        except Exception as e:
+            print(f"Warning: Could not write scan manifest {self.manifest_path}: {e}", file=sys.stderr)
+
+
+def manifest_settings(config_module) -> Dict[str, Any]:
+    """The configuration values that cached manifest records depend on."""
+    return {
+        "encodings": list(config_module.ENCODINGS_TO_TRY),
+        "binary_extensions": sorted(config_module.BINARY_FILE_EXTENSIONS),
+        "classifier_sample_bytes": getattr(config_module, 'CLASSIFIER_SAMPLE_BYTES', 8192),
+        "binary_control_char_ratio": getattr(config_module, 'BINARY_CONTROL_CHAR_RATIO', 0.3),
+    }
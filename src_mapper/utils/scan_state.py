@@ -0,0 +1,234 @@
+# src_mapper/utils/scan_state.py
+
+"""
+Scan results kept in memory between updates, for watch mode.
+
+The state holds every walked directory's listing, the FileRecord and stat
+signature of every file, and the content cache. A change only re-lists the
+directories it touched and re-collects the files whose stat signature changed;
+the other records are reused. file_records() returns the records in the order
+a fresh walk would produce, so maps written from an updated state match those
+of a cold run.
+"""
+
+import os
+import stat
+from pathlib import Path
+from typing import AbstractSet, Callable, Dict, List, NamedTuple, Optional, Set
+
+from .change_watcher import Changes
+from .content_cache import FileContentCache
+from .file_classifier import StatSignature, stat_signature
+from .file_record import FileRecord
+from .ignore_utils import GitignoreMatcher
+from .walker import DirectoryListing, WalkedFile, list_directory, walk_repository
+
+# (absolute_path, relative_path_posix, stat_result_or_None) -> FileRecord
+CollectFile = Callable[[str, str, Optional[os.stat_result]], FileRecord]
+
+
+class ScanUpdate(NamedTuple):
+    added: Set[str]
+    modified: Set[str]
+    removed: Set[str]
+    directories_added: Set[str]
+    directories_removed: Set[str]
+
+    @property
+    def paths_changed(self) -> bool:
+        """Whether files were added or removed, so structure-only outputs change too."""
+        return bool(self.added or self.removed)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+
+class ScanState:
+    """
+    In-memory scan results that can be updated from reported changes.
+
+    Args:
+        repo_root_path: Repository root
+        excluded_folders: Directory names or relative paths that are never entered
+        collect_file: Collects the FileRecord of one file (reads it if needed)
+        content_cache: Content store of the scan; entries of changed files are dropped
+        file_records: Records of the initial scan, in walk order
+        listings: Directory listings recorded by the initial walk
+        gitignore_matcher: Matcher used by the initial walk
+    """
+
+    def __init__(
+        self,
+        repo_root_path: Path,
+        excluded_folders: AbstractSet[str],
+        collect_file: CollectFile,
+        content_cache: FileContentCache,
+        file_records: List[FileRecord],
+        listings: Dict[str, DirectoryListing],
+        gitignore_matcher: GitignoreMatcher
+    ):
+        self.repo_root_path = repo_root_path
+        self._excluded_folders = excluded_folders
+        self._collect_file = collect_file
+        self._content_cache = content_cache
+        self._gitignore_matcher = gitignore_matcher
+        # Watchers hold on to these two dicts; they are only ever updated in place
+        self.listings: Dict[str, DirectoryListing] = listings
+        self.signatures: Dict[str, Optional[StatSignature]] = {}
+        self._records: Dict[str, FileRecord] = {record.relative_path_posix: record for record in file_records}
+        for listing in listings.values():
+            for _, relative_path_posix, stat_result in listing.files:
+                self.signatures[relative_path_posix] = _signature_of(stat_result)
+
+    def file_records(self) -> List[FileRecord]:
+        """Returns the current records in walk order."""
+        records = []
+        stack = [""]
+        while stack:
+            listing = self.listings.get(stack.pop())
+            if listing is None:
+                continue
+            records.extend(self._records[relative_path_posix] for _, relative_path_posix, _ in listing.files)
+            stack.extend(reversed(listing.subdirectories))
+        return records
+
+    def apply(self, changes: Changes) -> ScanUpdate:
+        """Brings the state up to date with the changed paths and returns what changed."""
+        if changes.rescan or any(os.path.basename(path) == '.gitignore' for path in changes.paths):
+            return self.rescan()
+
+        update = ScanUpdate(set(), set(), set(), set(), set())
+        dirty_directories = set()
+        for path in changes.paths:
+            if path in self.listings:
+                dirty_directories.add(path)
+            elif path in self._records:
+                if not self._refresh_file(path, update):
+                    dirty_directories.add(_parent_of(path)) # No longer a file
+            else:
+                dirty_directories.add(self._nearest_listed_directory(path))
+
+        # Parents first: a re-listed parent already handles subdirectories that were removed
+        for relative_dir_posix in sorted(dirty_directories, key=lambda path: (path.count('/'), path)):
+            if relative_dir_posix in self.listings:
+                self._relist(relative_dir_posix, update)
+        return update
+
+    def rescan(self) -> ScanUpdate:
+        """Walks the whole tree again with freshly loaded ignore rules, reusing unchanged records."""
+        update = ScanUpdate(set(), set(), set(), set(), set())
+        self._gitignore_matcher = GitignoreMatcher(self.repo_root_path)
+        listings: Dict[str, DirectoryListing] = {}
+        seen = set()
+        for walked_file in walk_repository(
+            self.repo_root_path, self._gitignore_matcher, self._excluded_folders, "scandir", listings
+        ):
+            seen.add(walked_file[1])
+            self._update_file(walked_file, update)
+        for relative_path_posix in list(self._records):
+            if relative_path_posix not in seen:
+                self._forget_file(relative_path_posix, update)
+
+        update.directories_added.update(path for path in listings if path not in self.listings)
+        update.directories_removed.update(path for path in self.listings if path not in listings)
+        self.listings.clear()
+        self.listings.update(listings)
+        return update
+
+    def _nearest_listed_directory(self, relative_path_posix: str) -> str:
+        path = _parent_of(relative_path_posix)
+        while path and path not in self.listings:
+            path = _parent_of(path)
+        return path
+
+    def _refresh_file(self, relative_path_posix: str, update: ScanUpdate) -> bool:
+        """Re-collects a known file if its stat changed. Returns False if it is no longer a file."""
+        absolute_path = os.path.join(str(self.repo_root_path), relative_path_posix)
+        try:
+            stat_result = os.stat(absolute_path)
+        except OSError:
+            return False
+        if not stat.S_ISREG(stat_result.st_mode):
+            return False
+        self._update_file((absolute_path, relative_path_posix, stat_result), update)
+        return True
+
+    def _update_file(self, walked_file: WalkedFile, update: ScanUpdate) -> None:
+        absolute_path, relative_path_posix, stat_result = walked_file
+        signature = _signature_of(stat_result)
+        previous = self._records.get(relative_path_posix)
+        if previous is not None and signature is not None and self.signatures.get(relative_path_posix) == signature:
+            return
+        self._content_cache.invalidate(Path(absolute_path))
+        record = self._collect_file(absolute_path, relative_path_posix, stat_result)
+        if previous is not None:
+            # Editing a file does not change its last commit; committing does not touch the working tree
+            record.git_info = previous.git_info
+            update.modified.add(relative_path_posix)
+        else:
+            update.added.add(relative_path_posix)
+        self._records[relative_path_posix] = record
+        self.signatures[relative_path_posix] = signature
+
+    def _forget_file(self, relative_path_posix: str, update: ScanUpdate) -> None:
+        del self._records[relative_path_posix]
+        self.signatures.pop(relative_path_posix, None)
+        self._content_cache.invalidate(self.repo_root_path / relative_path_posix)
+        update.removed.add(relative_path_posix)
+
+    def _relist(self, relative_dir_posix: str, update: ScanUpdate) -> None:
+        listing = list_directory(self.repo_root_path, relative_dir_posix, self._gitignore_matcher, self._excluded_folders)
+        if listing is None:
+            if relative_dir_posix:
+                self._relist(_parent_of(relative_dir_posix), update) # Removed: drop it from its parent
+            return
+        previous = self.listings[relative_dir_posix]
+        self.listings[relative_dir_posix] = listing
+
+        current_files = set()
+        for walked_file in listing.files:
+            current_files.add(walked_file[1])
+            self._update_file(walked_file, update)
+        for _, relative_path_posix, _ in previous.files:
+            if relative_path_posix not in current_files and relative_path_posix in self._records:
+                self._forget_file(relative_path_posix, update)
+
+        for subdirectory in set(previous.subdirectories).difference(listing.subdirectories):
+            self._forget_directory(subdirectory, update)
+        for subdirectory in listing.subdirectories:
+            if subdirectory not in self.listings:
+                self._walk_new_directory(subdirectory, update)
+
+    def _forget_directory(self, relative_dir_posix: str, update: ScanUpdate) -> None:
+        stack = [relative_dir_posix]
+        while stack:
+            path = stack.pop()
+            listing = self.listings.pop(path, None)
+            if listing is None:
+                continue
+            update.directories_removed.add(path)
+            for _, relative_path_posix, _ in listing.files:
+                if relative_path_posix in self._records:
+                    self._forget_file(relative_path_posix, update)
+            stack.extend(listing.subdirectories)
+
+    def _walk_new_directory(self, relative_dir_posix: str, update: ScanUpdate) -> None:
+        stack = [relative_dir_posix]
+        while stack:
+            path = stack.pop()
+            listing = list_directory(self.repo_root_path, path, self._gitignore_matcher, self._excluded_folders)
+            if listing is None:
+                listing = DirectoryListing((), (), 0) # Unreadable: listed as empty, like a walk skips it
+            self.listings[path] = listing
+            update.directories_added.add(path)
+            for walked_file in listing.files:
+                self._update_file(walked_file, update)
+            stack.extend(listing.subdirectories)
+
+
+def _parent_of(relative_path_posix: str) -> str:
+    return relative_path_posix.rpartition('/')[0]
+
+
+def _signature_of(stat_result: Optional[os.stat_result]) -> Optional[StatSignature]:
+    return stat_signature(stat_result) if stat_result is not None else None
@@ -0,0 +1,46 @@
+# src_mapper/utils/token_utils.py
+
+"""
+Fast token-count estimation for sizing LLM context budgets.
+The default estimator is a character heuristic; a real tokenizer can be plugged
+in through TOKEN_ESTIMATOR in the configuration.
+"""
+
+import importlib
+import sys
+from typing import Callable
+
+# Rough average for source code and English prose with BPE tokenizers
+CHARS_PER_TOKEN_ESTIMATE: int = 4
+
+TokenEstimator = Callable[[str], int]
+
+
+def estimate_tokens_fast(text: str) -> int:
+    """Estimates the token count of text as ceil(chars / CHARS_PER_TOKEN_ESTIMATE)."""
+    return -(-len(text) // CHARS_PER_TOKEN_ESTIMATE)
+
+
+def estimate_tokens_from_bytes(size_bytes: int) -> int:
+    """Estimates the token count of a file from its size, without reading it."""
+    return -(-size_bytes // CHARS_PER_TOKEN_ESTIMATE)
+
+
+def get_token_estimator(config_module) -> TokenEstimator:
+    """
+    Returns the token estimator selected by config TOKEN_ESTIMATOR.
+
+    TOKEN_ESTIMATOR may be None (use estimate_tokens_fast), a callable taking a
+    string and returning an int, or a "package.module:function" import string.
+    """
+    estimator = getattr(config_module, 'TOKEN_ESTIMATOR', None)
+    if estimator is None:
+        return estimate_tokens_fast
+    if callable(estimator):
+        return estimator
+    try:
+        module_name, _, function_name = str(estimator).partition(':')
+        return getattr(importlib.import_module(module_name), function_name)
+    except Exception as e:
+        print(f"Warning: Could not load TOKEN_ESTIMATOR '{estimator}': {e}. Using the fast estimate.", file=sys.stderr)
+        return estimate_tokens_fast
@@ -0,0 +1,184 @@
+# src_mapper/utils/tree_index.py
+
+"""
+Directory tree of the scan results, built once and shared by all generators.
+
+Every directory knows its children in scan order and in display order
+(directories first, then files, case-insensitively by name), its parent, and
+the number of files and directories, bytes and lines of code below it. Nodes
+are looked up by relative path in O(depth) and the tree can be walked in
+pre-order without recursion. The index is not modified after it is built, so
+generators can share it between threads; it pickles as its file records and
+is rebuilt on load.
+"""
+
+import gc
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from .file_record import FileRecord
+
+_NO_CHILDREN: Mapping[str, 'TreeNode'] = MappingProxyType({}) # Shared by all file nodes
+
+
+class TreeNode:
+    """A directory, or a file (with its FileRecord), of the tree index."""
+
+    __slots__ = (
+        'name', 'parent', 'record', 'is_dir', 'children', 'sorted_children', '_child_by_name',
+        'file_count', 'dir_count', 'size_bytes', 'loc',
+    )
+
+    def __init__(self, name: str, parent: Optional['TreeNode'], record: Optional[FileRecord] = None):
+        self.name = name
+        self.parent = parent
+        self.record = record # None for directories
+        self.is_dir = record is None
+        self.children: Tuple['TreeNode', ...] = () # Scan order; empty for files
+        self.sorted_children: Tuple['TreeNode', ...] = () # Directories first, then files, by name.lower()
+        # Totals below this node; a file counts itself
+        if record is None:
+            self._child_by_name: Mapping[str, 'TreeNode'] = {}
+            self.file_count = 0
+            self.size_bytes = 0
+            self.loc = 0
+        else:
+            self._child_by_name = _NO_CHILDREN
+            self.file_count = 1
+            self.size_bytes = record.size_bytes
+            self.loc = record.loc or 0
+        self.dir_count = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of ancestors; 0 for the root."""
+        depth = 0
+        node = self.parent
+        while node is not None:
+            depth += 1
+            node = node.parent
+        return depth
+
+    @property
+    def path(self) -> str:
+        """Relative POSIX path, "" for the root."""
+        parts = []
+        node = self
+        while node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        return '/'.join(reversed(parts))
+
+    def child(self, name: str) -> Optional['TreeNode']:
+        return self._child_by_name.get(name)
+
+    def __repr__(self) -> str:
+        kind = "dir" if self.is_dir else "file"
+        return f"TreeNode({self.path!r}, {kind}, files={self.file_count}, size_bytes={self.size_bytes}, loc={self.loc})"
+
+
+def _display_key(node: TreeNode) -> str:
+    return node.name.lower()
+
+
+class TreeIndex:
+    """
+    Immutable directory tree over a list of FileRecords.
+
+    Args:
+        file_records: Scan results; a later record for the same path replaces an earlier one
+    """
+
+    def __init__(self, file_records: Sequence[FileRecord]):
+        self.records: Tuple[FileRecord, ...] = tuple(file_records)
+        self.root = TreeNode("", None)
+        # One node per file and directory, all kept until the run ends: collection passes
+        # triggered by the allocations would only traverse the growing tree
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._build()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def _build(self) -> None:
+        # Children are collected in lists while building and frozen into tuples below
+        directories: Dict[str, TreeNode] = {"": self.root}
+        child_lists: Dict[TreeNode, List[TreeNode]] = {self.root: []} # Directories in creation order
+        for record in self.records:
+            parent = directories.get(record.directory)
+            if parent is None:
+                parent = self.root
+                path = ""
+                for part in record.directory.split('/'):
+                    path = f"{path}/{part}" if path else part
+                    node = directories.get(path)
+                    if node is None:
+                        node = TreeNode(part, parent)
+                        parent._child_by_name[part] = node
+                        child_lists[parent].append(node)
+                        child_lists[node] = []
+                        directories[path] = node
+                    parent = node
+            node = TreeNode(record.name, parent, record)
+            siblings = child_lists[parent]
+            existing = parent._child_by_name.get(record.name)
+            if existing is not None and not existing.is_dir:
+                siblings[siblings.index(existing)] = node # Keeps its place in scan order
+            else:
+                siblings.append(node)
+            parent._child_by_name[record.name] = node
+
+        # A directory is created after its parent, so in reverse creation order the totals add up bottom-up
+        for directory, children in reversed(child_lists.items()):
+            directory.children = tuple(children)
+            subdirectories = []
+            files = []
+            for child in children:
+                if child.is_dir:
+                    subdirectories.append(child)
+                    directory.dir_count += child.dir_count + 1
+                else:
+                    files.append(child)
+                directory.file_count += child.file_count
+                directory.size_bytes += child.size_bytes
+                directory.loc += child.loc
+            subdirectories.sort(key=_display_key)
+            files.sort(key=_display_key)
+            directory.sorted_children = tuple(subdirectories + files)
+
+    def __reduce__(self):
+        return (TreeIndex, (self.records,))
+
+    def __len__(self) -> int:
+        return self.root.file_count
+
+    def lookup(self, relative_path_posix: str) -> Optional[TreeNode]:
+        """Returns the node at a relative POSIX path ("" for the root), or None."""
+        node = self.root
+        if not relative_path_posix:
+            return node
+        for part in relative_path_posix.split('/'):
+            node = node._child_by_name.get(part)
+            if node is None:
+                return None
+        return node
+
+    def iter_preorder(self, start: Optional[TreeNode] = None, sorted_order: bool = False) -> Iterator[TreeNode]:
+        """
+        Yields start (the root by default) and every node below it, each directory
+        before its children; children in scan order, or in display order if sorted_order.
+        """
+        stack = [start if start is not None else self.root]
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.is_dir:
+                stack.extend(reversed(node.sorted_children if sorted_order else node.children))
+
+    def iter_files(self, start: Optional[TreeNode] = None, sorted_order: bool = False) -> Iterator[FileRecord]:
+        """Yields the FileRecords below start in pre-order (each directory's subtree is contiguous)."""
+        for node in self.iter_preorder(start, sorted_order):
+            if node.record is not None:
+                yield node.record
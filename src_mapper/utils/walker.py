@@ -0,0 +1,206 @@
+# src_mapper/utils/walker.py
+
+"""
+Repository traversal for the scan.
+
+Both walkers yield the files to map in the same order (os.walk top-down order:
+a directory's files, then each subdirectory in listing order), apply folder
+exclusions and .gitignore rules before descending, and load nested .gitignore
+files as directories are entered. list_directory() lists a single directory
+the same way, so watch mode can re-list only the directories that changed.
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import AbstractSet, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .ignore_utils import GitignoreMatcher
+from .profiler import get_profiler
+
+# (absolute_path, relative_path_posix, stat_result_or_None)
+WalkedFile = Tuple[str, str, Optional[os.stat_result]]
+
+WALKERS = ("scandir", "os_walk")
+
+
+class DirectoryListing(NamedTuple):
+    files: Tuple[WalkedFile, ...] # Files that are not ignored, in listing order
+    subdirectories: Tuple[str, ...] # Relative POSIX paths of the subdirectories walked into, in listing order
+    mtime_ns: int # Modification time of the directory itself when it was listed
+
+
+def walk_repository(
+    repo_root_path: Path,
+    gitignore_matcher: GitignoreMatcher,
+    excluded_folders: AbstractSet[str],
+    walker: str = "scandir",
+    listings: Optional[Dict[str, DirectoryListing]] = None
+) -> Iterator[WalkedFile]:
+    """
+    Yields every file of the repository that is not excluded or ignored.
+
+    Args:
+        repo_root_path: Repository root
+        gitignore_matcher: Matcher for the root ignore files; nested .gitignore files are loaded into it
+        excluded_folders: Directory names or relative paths that are never entered
+        walker: "scandir" (default: one stat per file, taken from the directory scan)
+            or "os_walk" (the stat is left to the caller and the third item is None)
+        listings: If given, filled with the DirectoryListing of every directory walked,
+            keyed by relative POSIX path ("" for the root); uses the scandir walker
+    """
+    if walker == "os_walk" and listings is None:
+        return _walk_with_os_walk(repo_root_path, gitignore_matcher, excluded_folders)
+    return _walk_with_scandir(str(repo_root_path), gitignore_matcher, excluded_folders, listings)
+
+
+def list_directory(
+    repo_root_path: Path,
+    relative_dir_posix: str,
+    gitignore_matcher: GitignoreMatcher,
+    excluded_folders: AbstractSet[str]
+) -> Optional[DirectoryListing]:
+    """
+    Lists one directory of the repository as the scandir walker sees it: files that
+    are not ignored and the subdirectories it would walk into. The directory itself
+    is not checked against exclusions. Returns None if it cannot be listed.
+    """
+    directory = os.path.join(str(repo_root_path), relative_dir_posix) if relative_dir_posix else str(repo_root_path)
+    relative_prefix = relative_dir_posix + "/" if relative_dir_posix else ""
+    return _list_directory(directory, relative_prefix, gitignore_matcher, excluded_folders, get_profiler(), True)
+
+
+def _filter_ignored_files(relative_prefix: str, names: List[str], gitignore_matcher: GitignoreMatcher,
+                          profiler) -> List[int]:
+    """Returns the indexes of names that are not ignored by the .gitignore rules."""
+    kept = []
+    for index, name in enumerate(names):
+        if gitignore_matcher.matches(relative_prefix + name, False):
+            # print(f"Debug: Ignoring file {relative_prefix + name} by gitignore", file=sys.stderr) # Optional debug
+            profiler.count("files_ignored")
+            continue
+        kept.append(index)
+    return kept
+
+
+def _is_pruned(relative_dir_posix: str, name: str, gitignore_matcher: GitignoreMatcher,
+               excluded_folders: AbstractSet[str], profiler) -> bool:
+    if name in excluded_folders or relative_dir_posix in excluded_folders:
+        profiler.count("directories_excluded")
+        return True
+    if gitignore_matcher.matches(relative_dir_posix, True):
+        # print(f"Debug: Excluding directory {relative_dir_posix}", file=sys.stderr) # Optional debug
+        profiler.count("directories_ignored")
+        return True
+    return False
+
+
+def _list_directory(
+    directory: str,
+    relative_prefix: str,
+    gitignore_matcher: GitignoreMatcher,
+    excluded_folders: AbstractSet[str],
+    profiler,
+    with_mtime: bool
+) -> Optional[DirectoryListing]:
+    profiler.count("directories_walked")
+    mtime_ns = 0
+    files = []
+    subdirectories = []
+    try:
+        if with_mtime:
+            # Taken before listing, so a change made while listing shows up on the next comparison
+            mtime_ns = os.stat(directory).st_mtime_ns
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    # Symlinked directories are listed but, as with os.walk, not followed
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink():
+                        subdirectories.append(entry.name)
+                else:
+                    files.append(entry)
+    except OSError:
+        return None # Unreadable directory, skipped like os.walk does
+
+    # A nested .gitignore applies to everything below this directory
+    if relative_prefix and any(entry.name == '.gitignore' for entry in files):
+        gitignore_matcher.load_directory(relative_prefix[:-1])
+
+    if profiler.enabled:
+        match_start = time.perf_counter()
+    kept_files = _filter_ignored_files(relative_prefix, [entry.name for entry in files], gitignore_matcher, profiler)
+    walked_subdirectories = tuple(
+        relative_prefix + name for name in subdirectories
+        if not _is_pruned(relative_prefix + name, name, gitignore_matcher, excluded_folders, profiler)
+    )
+    if profiler.enabled:
+        profiler.add_time("ignore_matching", time.perf_counter() - match_start)
+
+    walked_files = []
+    for index in kept_files:
+        entry = files[index]
+        try:
+            stat_result = entry.stat()
+        except OSError:
+            stat_result = None # Vanished or dangling symlink; recorded with zero size
+        walked_files.append((entry.path, relative_prefix + entry.name, stat_result))
+    return DirectoryListing(tuple(walked_files), walked_subdirectories, mtime_ns)
+
+
+def _walk_with_scandir(
+    repo_root: str,
+    gitignore_matcher: GitignoreMatcher,
+    excluded_folders: AbstractSet[str],
+    listings: Optional[Dict[str, DirectoryListing]] = None
+) -> Iterator[WalkedFile]:
+    profiler = get_profiler()
+    # Directories still to visit as (absolute_path, relative_prefix), next one on top
+    stack: List[Tuple[str, str]] = [(repo_root, "")]
+
+    while stack:
+        directory, relative_prefix = stack.pop()
+        listing = _list_directory(
+            directory, relative_prefix, gitignore_matcher, excluded_folders, profiler, listings is not None
+        )
+        if listing is None:
+            continue
+        if listings is not None:
+            listings[relative_prefix[:-1]] = listing
+        # Push in reverse so subdirectories are visited in listing order
+        for relative_dir_posix in reversed(listing.subdirectories):
+            stack.append((os.path.join(directory, relative_dir_posix[len(relative_prefix):]), relative_dir_posix + "/"))
+        yield from listing.files
+
+
+def _walk_with_os_walk(
+    repo_root_path: Path,
+    gitignore_matcher: GitignoreMatcher,
+    excluded_folders: AbstractSet[str]
+) -> Iterator[WalkedFile]:
+    profiler = get_profiler()
+    for root, dirs, files in os.walk(repo_root_path):
+        profiler.count("directories_walked")
+        relative_root_posix = Path(os.path.relpath(root, repo_root_path)).as_posix()
+        relative_prefix = "" if relative_root_posix == "." else relative_root_posix + "/"
+
+        # A nested .gitignore applies to everything below this directory
+        if relative_prefix and '.gitignore' in files:
+            gitignore_matcher.load_directory(relative_root_posix)
+
+        if profiler.enabled:
+            match_start = time.perf_counter()
+        # Filter out directories that should be excluded entirely
+        dirs[:] = [
+            d for d in dirs
+            if not _is_pruned(relative_prefix + d, d, gitignore_matcher, excluded_folders, profiler)
+        ] # Modify dirs in place for os.walk
+        kept_files = _filter_ignored_files(relative_prefix, files, gitignore_matcher, profiler)
+        if profiler.enabled:
+            profiler.add_time("ignore_matching", time.perf_counter() - match_start)
+
+        for index in kept_files:
+            yield os.path.join(root, files[index]), relative_prefix + files[index], None